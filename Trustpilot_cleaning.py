@@ -1,176 +1,225 @@
 import pandas as pd
 import os
-from glob import glob
-import re
+import argparse
+from functools import partial
+
+from cleaning import clean_frame, group_files_by_country, print_summary, run_clean_jobs
+from intermediate import LazyFrame, coerce_messages, drop_country, list_countries, read_messages, write_messages
+from id_index import INDEX_NAME, MessageIdIndex, claim_outputs, drop_seen_ids, id_text
+from paths import PATHS, input_files
+from manifest import MANIFEST_NAME, Manifest, appended_mask, plan_groups, watermark
+from streaming import ExcelChunkWriter, clean_stream
 
 # =========================
 # 📁 INPUT & OUTPUT
 # =========================
-input_folder = r"C:\Users\Moha8550\OneDrive - Lyca Group\Desktop\SocialMedia_datapreprocessing_folder\concatfiles"
-output_folder = r"C:\Users\Moha8550\OneDrive - Lyca Group\Desktop\SocialMedia_datapreprocessing_folder\countrywise_output_message_only"
-os.makedirs(output_folder, exist_ok=True)
+def use_paths(paths):
+    """Point the cleaner at a folder layout from paths.load_paths()."""
+    global input_folder, output_folder, parquet_folder
+    input_folder = paths["input"]
+    output_folder = paths["message_only"]
+    parquet_folder = os.path.join(output_folder, "parquet")
 
-# =========================
-# 🌍 COUNTRY MAP
-# =========================
-country_map = {
-    "BEL":"Belgium","FRA":"France","GER":"Germany","ITA":"Italy",
-    "NLD":"Netherlands","PRT":"Portugal","UGA":"Uganda","GBR":"UK"
-}
 
-# =========================
-# 🌐 LANGUAGE MAP
-# =========================
-language_map = {
-    'Albanian':'albanian','English':'english',None:None,'Afrikaans':'afrikaans',
-    'Català - Catalan (beta)':'catalan','Deutsch - German':'german',
-    'Français - French':'french','বাংলা - Bengali':'bengali',
-    'Dansk - Danish':'danish','Hmong':'hmong','Gaeilge - Irish (beta)':'irish',
-    'Hausa':'hausa','Esperanto':'esperanto','Estonian':'estonian',
-    'Čeština - Czech':'czech','Belarusian':'belarusian',
-    'Azerbaijani':'azerbaijani','Bosnian':'bosnian',
-    'Haitian Creole':'haitiancreole','Bulgarian':'bulgarian',
-    'Galego - Galician (beta)':'galician','Nepali':'nepali',
-    'Português - Portuguese':'portuguese','nan':None,
-    'Italiano - Italian':'italian','Euskara - Basque (beta)':'basque',
-    'Tagalog':'tagalog','Croatian':'croatian',
-    'Bahasa Indonesia - Indonesian':'indonesian',
-    'Nyanja':'nyanja','Igbo':'igbo','العربية - Arabic':'arabic',
-    'Español - Spanish':'spanish','Nederlands - Dutch':'dutch',
-    'Corsican':'corsican','Türkçe - Turkish':'turkish',
-    'Sindhi':'sindhi','Polski - Polish':'polish',
-    'Maltese':'maltese','Latin':'latin','Welsh':'welsh',
-    'Cebuano':'cebuano','Română - Romanian':'romanian',
-    'Kazakh':'kazakh','Hawaiian':'hawaiian',
-    'Swahili':'swahili','Suomi - Finnish':'finnish',
-    'Русский - Russian':'russian','Macedonian':'macedonian',
-    'Luxembourgish':'luxembourgish',
-    'Magyar - Hungarian':'hungarian',
-    'Norsk - Norwegian':'norwegian',
-    'Yoruba':'yoruba','Somali':'somali',
-    'Latvian':'latvian','Lithuanian':'lithuanian',
-    'हिन्दी - Hindi':'hindi',
-    'Українська мова - Ukrainian':'ukrainian',
-    'Icelandic':'icelandic',
-    'Svenska - Swedish':'swedish'
-}
+use_paths(PATHS)
 
-# =========================
-# 😀 EMOJI FILTER
-# =========================
-emoji_pattern = re.compile(
-    "[\U0001F600-\U0001F64F"
-    "\U0001F300-\U0001F5FF"
-    "\U0001F680-\U0001F6FF"
-    "\U0001F1E0-\U0001F1FF"
-    "\U00002700-\U000027BF"
-    "\U0001F900-\U0001F9FF"
-    "\U0001FA00-\U0001FAFF]+",
-    flags=re.UNICODE
-)
+MESSAGE_ONLY_COLUMNS = ['country','platform','title','message','link',
+                        'created_date','language','username','gender','user_rating']
 
 # =========================
-# 🔍 PLATFORM FUNCTION
+# 🧹 ONE COUNTRY
 # =========================
-def get_platform(media_type: str):
-    if not isinstance(media_type,str):
-        return "unknown"
-
-    m = media_type.strip().lower()
-
-    if "twitter" in m:
-        return "X"
-    elif "facebook" in m:
-        return "facebook"
-    elif "linkedin" in m:
-        return "linkedin"
-    elif "tiktok" in m:
-        return "tiktok"
-    elif "instagram" in m:
-        return "instagram"
-    elif "trustpilot" in m:
-        return "trustpilot"
-    else:
-        return "other"
+def to_message_only(df):
 
-# =========================
-# 📄 READ FILES
-# =========================
-files = glob(f"{input_folder}\\*.xlsx")
-
-d2_message_only = {}
-
-for file in files:
-
-    print("\nProcessing:", file)
-
-    df = pd.read_excel(file)
-
-    for col in ['Title','Message','Description','Media Type']:
-        if col not in df.columns:
-            df[col] = ""
-
-    # COUNTRY FROM FILENAME
-    filename = os.path.basename(file)
-    raw = filename.split("(")[0].strip()
-
-    if len(raw) == 3:
-        country = country_map.get(raw.upper(), raw)
-    else:
-        country = raw.title()
-
-    # LINKEDIN FIX
-    df['Message'] = df.apply(
-        lambda x: x['Description']
-        if (
-            isinstance(x['Media Type'], str)
-            and x['Media Type'].strip().lower() == 'linkedin mentions'
-            and isinstance(x['Message'], str)
-            and x['Message'].strip().lower() == '(no comment)'
-            and pd.notna(x['Description'])
-            and str(x['Description']).strip() != ""
-        )
-        else x['Message'],
-        axis=1
-    )
+    # FINAL OUTPUT FORMAT (YOUR REQUIRED ORDER)
+    final_df = df[['country','platform','Title','Message','Link',
+                   'Publish Date','Language','User Name','Gender','Star Rating']]
 
-    # DATE
-    df['Publish Date'] = pd.to_datetime(df['Publish Date'], dayfirst=True, errors='coerce')
+    final_df.columns = MESSAGE_ONLY_COLUMNS
 
-    # REMOVE DUPLICATES
-    df = df.drop_duplicates('Message Id', keep='last')
+    return final_df
 
-    # REMOVE NULL MESSAGE
-    df = df[df.Message.notna()]
 
-    # LANGUAGE STANDARDIZATION
-    df['Language'] = df['Language'].astype(str).str.strip()
-    df['Language'] = df['Language'].replace("nan", None)
-    df['Language'] = df['Language'].map(language_map).fillna(df['Language'])
-    df['Language'] = df['Language'].apply(lambda x: x.title() if isinstance(x,str) else x)
+def excel_path(country):
+    return os.path.join(output_folder, f"{country}_message_only.xlsx")
 
-    # EMOJI FILTER
-    df['msg_length'] = df['Message'].astype(str).apply(len)
-    df["has_emoji"] = df["Message"].astype(str).apply(lambda x: bool(emoji_pattern.search(x)))
-    df = df[~((df.msg_length == 1) & (df.has_emoji == False))]
 
-    # PLATFORM
-    df['platform'] = df['Media Type'].apply(get_platform)
+def message_handle(country):
+    return LazyFrame(read_messages, parquet_folder, columns=MESSAGE_ONLY_COLUMNS, country=country)
 
-    # INSERT COUNTRY
-    df.insert(0,'country',country)
 
-    # FINAL OUTPUT FORMAT (YOUR REQUIRED ORDER)
-    final_df = df[['country','platform','Title','Message','Link',
-                   'Publish Date','Language','User Name','Gender','Star Rating']]
+def message_ids(country):
+    return read_messages(parquet_folder, columns=["message_id"], country=country)["message_id"]
 
-    final_df.columns = ['country','platform','title','message','link',
-                        'created_date','language','username','gender','user_rating']
 
-    d2_message_only[country] = final_df
+def drop_messages(country, ids, excel=False):
+    """Remove the rows with these message ids from the country's partition (and xlsx)."""
+    messages = read_messages(parquet_folder, country=country)
+    messages = messages[~messages["message_id"].map(id_text).isin(ids)]
+
+    drop_country(parquet_folder, country)
+    write_messages(messages, parquet_folder)
+
+    if excel:
+        messages[MESSAGE_ONLY_COLUMNS].to_excel(excel_path(country), index=False)
+
+
+def clean_country(country, country_files, excel=False, stream=False, chunk_size=50_000, since=None, index_path=None):
+    """Returns (LazyFrame of the country's messages, {file: watermark}).
+
+    since[country], when present, holds the previous watermark of each
+    changed file: only its appended rows are cleaned and merged into the
+    country's existing Parquet partition.
+    """
+    plan = (since or {}).get(country)
+
+    if stream:
+        return stream_country(country, country_files, excel, chunk_size, index_path), {}
+
+    raw = {f: pd.read_excel(f) for f in country_files}
+    marks = {f: watermark(df) for f, df in raw.items()}
+
+    if plan is not None:
+        raw = {f: df[appended_mask(df, plan.get(f))] for f, df in raw.items()}
+
+    df = pd.concat(raw.values(), ignore_index=True)
+
+    # LINKEDIN FIX, DATE, DUPLICATES, LANGUAGE, EMOJI FILTER, PLATFORM
+    df = clean_frame(df, country)
+
+    # 🪪 DROP MENTIONS ALREADY IN ANOTHER COUNTRY'S OUTPUT (ANY FILE, ANY RUN)
+    if index_path is not None:
+        df = drop_seen_ids(df, country, index_path, rebuild=plan is None)
+
+    final_df = to_message_only(df)
+    messages = final_df.assign(message_id=df['Message Id'])
+
+    # MERGE NEW ROWS INTO LAST RUN'S PARTITION
+    if plan is not None:
+        previous = read_messages(parquet_folder, country=country)
+        messages = pd.concat([coerce_messages(previous), coerce_messages(messages)], ignore_index=True)
+        messages = messages.drop_duplicates('message_id', keep='last')
+        final_df = messages[MESSAGE_ONLY_COLUMNS]
+        print(f"➕ {country}: {len(df)} new rows merged into {len(previous)}")
+
+    # PARQUET HAND-OFF TO THE CLASSIFIER (keeps Message Id for resume)
+    write_messages(messages, parquet_folder)
+
+    if excel:
+        final_df.to_excel(excel_path(country), index=False)
+
+    # the parent only needs a handle: no frame is pickled back from the worker
+    return message_handle(country), marks
+
+
+def stream_messages(country, country_files, excel=False, chunk_size=50_000, index_path=None):
+    """Yield each cleaned chunk (with message_id) once it is in Parquet.
+
+    The country's partition is rebuilt from scratch; pipeline.py hands the
+    chunks straight on to the classifier while the next one is being read.
+    """
+    drop_country(parquet_folder, country)
+
+    writer = None
+    if excel:
+        writer = ExcelChunkWriter(excel_path(country), MESSAGE_ONLY_COLUMNS)
+
+    if index_path is not None:
+        index = MessageIdIndex(index_path)
+        index.release(country)
+        index.close()
+
+    try:
+        for df in clean_stream(country_files, country, chunk_size):
+
+            if index_path is not None:
+                df = drop_seen_ids(df, country, index_path)
+
+            final_df = to_message_only(df)
+            messages = final_df.assign(message_id=df['Message Id'])
+
+            write_messages(messages, parquet_folder, append=True)
+
+            if writer is not None:
+                writer.write(final_df)
+
+            yield messages
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def stream_country(country, country_files, excel, chunk_size, index_path=None):
+    """Bounded-memory variant: chunks go straight to Parquet (and xlsx)."""
+
+    for _ in stream_messages(country, country_files, excel, chunk_size, index_path):
+        pass
+
+    return message_handle(country)
+
+# =========================
+# 📄 READ FILES
+# =========================
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Clean exports into the message-only Parquet dataset.")
+    parser.add_argument("--excel", action="store_true", help="also export <country>_message_only.xlsx")
+    parser.add_argument("--workers", type=int, default=1, help="parallel worker processes (1 = sequential)")
+    parser.add_argument("--stream", action="store_true", help="read workbooks in bounded-memory chunks")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="rows per chunk with --stream")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rebuild every country")
+    parser.add_argument("--no-id-index", action="store_true",
+                        help="keep mentions already written to another country's output")
+    args = parser.parse_args()
+
+    files = input_files(input_folder)
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    # SKIP UNCHANGED EXPORTS, APPEND-ONLY UPDATES FOR CHANGED ONES
+    manifest = Manifest(os.path.join(output_folder, MANIFEST_NAME))
+    groups = group_files_by_country(files)
+    done = set(list_countries(parquet_folder))
+    since, files, skipped = plan_groups(manifest, groups, lambda c: c in done, args.full)
+    if args.stream:
+        # streamed countries are always rewritten from all of their files
+        since = {}
+        files = [f for country, fs in groups.items() if country not in skipped for f in fs]
+    if skipped:
+        print(f"⏭️ Unchanged since last run: {', '.join(skipped)}")
+
+    d2_message_only = {}
+
+    index_path = None if args.no_id_index else os.path.join(output_folder, INDEX_NAME)
+
+    # parallel workers would claim ids in whatever order they finish
+    parallel_ids = index_path is not None and args.workers > 1
+
+    results = run_clean_jobs(
+        partial(clean_country, excel=args.excel, stream=args.stream, chunk_size=args.chunk_size, since=since,
+                index_path=None if parallel_ids else index_path),
+        files, args.workers,
+    )
+
+    # 🪪 SHARED MESSAGE IDS GO TO THE SAME COUNTRY A SEQUENTIAL RUN PICKS
+    if parallel_ids:
+        cleaned = {country for country, _, _, _, error in results if error is None}
+        claim_outputs(index_path, [
+            (country, country not in since, partial(message_ids, country),
+             partial(drop_messages, country, excel=args.excel))
+            for country in groups if country in cleaned
+        ])
+
+    for country, country_files, _, result, error in results:
+        if error is not None:
+            continue
+        handle, marks = result
+        d2_message_only[country] = handle
+        for f in country_files:
+            manifest.record(os.path.basename(f), f, marks.get(f))
 
-    final_df.to_excel(f"{output_folder}\\{country}_message_only.xlsx", index=False)
+    manifest.save()
 
-    print(f"✅ {country} Done")
+    print_summary(results)
 
-print("\n🎉 All files processed successfully!")
\ No newline at end of file
+    print("\n🎉 All files processed successfully!")
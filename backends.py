@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+# =========================
+# 🔌 CLASSIFIER BACKENDS
+# =========================
+# A backend exposes an instructor-style .client and .async_client
+# (chat.completions.create / create_with_completion). classify_ticket and
+# friends only talk to whatever backend is installed with set_backend().
+
+
+class InstructorBackend:
+    """Real provider via instructor; clients are created on first use."""
+
+    def __init__(self, model_id, base_url=None, api_key=None):
+        self.model_id = model_id
+        self.base_url = base_url
+        self.api_key = api_key
+        self._client = None
+        self._async_client = None
+
+    def _build(self, async_client):
+        import instructor
+
+        if self.base_url is None:
+            # the provider SDK reads its usual env var unless a key is given
+            keys = {"api_key": self.api_key} if self.api_key else {}
+            return instructor.from_provider(model=self.model_id, async_client=async_client, **keys)
+
+        # any OpenAI-compatible endpoint, e.g. fake_llm_server.py
+        import openai
+        model = self.model_id.split("/", 1)[-1]
+        raw = (openai.AsyncOpenAI if async_client else openai.OpenAI)(
+            base_url=self.base_url, api_key=self.api_key or "local",
+        )
+        return instructor.from_openai(raw, model=model)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._build(async_client=False)
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = self._build(async_client=True)
+        return self._async_client
+
+# =========================
+# 🧪 FAKE LLM (OFFLINE)
+# =========================
+class FakeAPIError(Exception):
+
+    def __init__(self, status_code, message, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class RateLimitError(FakeAPIError):
+    """Named like the provider SDKs' class so retry_policy treats it the same."""
+
+
+class APITimeoutError(Exception):
+    """Named like the SDKs' timeout so retry_policy treats it the same."""
+
+
+HANG_SECONDS = 600.0  # a "hung" fake call; only a timeout gets the caller out
+
+
+REVIEW_BLOCK = re.compile(r"^\[REVIEW(?: (\d+))?\]", flags=re.MULTILINE)
+
+
+def _resolve(schema, defs):
+    while "$ref" in schema:
+        schema = defs[schema["$ref"].split("/")[-1]]
+    if "allOf" in schema and len(schema["allOf"]) == 1:
+        return _resolve(schema["allOf"][0], defs)
+    return schema
+
+
+def fake_from_schema(schema, rng, n_reviews=1, defs=None, name=None, index=None):
+    """A random but schema-valid JSON value for a pydantic JSON schema.
+
+    Arrays of objects carrying review_index get one item per review.
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    schema = _resolve(schema, defs)
+
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "anyOf" in schema:
+        return fake_from_schema(schema["anyOf"][0], rng, n_reviews, defs, name, index)
+
+    kind = schema.get("type")
+
+    if kind == "object":
+        return {
+            prop: fake_from_schema(sub, rng, n_reviews, defs, prop, index)
+            for prop, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = _resolve(schema.get("items", {}), defs)
+        if "review_index" in items.get("properties", {}):
+            return [fake_from_schema(items, rng, n_reviews, defs, None, i) for i in range(n_reviews)]
+        return [fake_from_schema(items, rng, n_reviews, defs)]
+    if kind == "integer":
+        if name == "review_index" and index is not None:
+            return index
+        return rng.randint(int(schema.get("minimum", 0)), int(schema.get("maximum", 100)))
+    if kind == "number":
+        low = schema.get("minimum", schema.get("exclusiveMinimum", 0.0))
+        high = schema.get("maximum", schema.get("exclusiveMaximum", 1.0))
+        return round(rng.uniform(low, high), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return f"fake-{rng.randint(0, 9999)}"
+
+
+def count_reviews(messages):
+    user = "\n".join(m["content"] for m in messages if m.get("role") == "user")
+    return max(1, len(REVIEW_BLOCK.findall(user)))
+
+
+class FakeLLM:
+    """Deterministic stand-in: latency, 5xx, 429 and hang injection per call.
+
+    Every draw comes from an RNG seeded with (seed, request text, how many
+    times that text was sent), so runs repeat exactly whatever the
+    concurrency or scheduling.
+    """
+
+    def __init__(self, latency_ms=300.0, latency_dist="lognormal", latency_sigma=0.5,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0, hang_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.hang_rate = hang_rate
+        self.seed = seed
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def _rng(self, messages):
+        text = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self.lock:
+            n = self.calls[digest] = self.calls.get(digest, 0) + 1
+        return random.Random(f"{self.seed}:{digest}:{n}"), random.Random(f"{self.seed}:{digest}")
+
+    def latency(self, rng):
+        mean = self.latency_ms / 1000
+        if self.latency_dist == "fixed":
+            return mean
+        if self.latency_dist == "exponential":
+            return rng.expovariate(1 / mean) if mean > 0 else 0.0
+        return rng.lognormvariate(0, self.latency_sigma) * mean
+
+    def plan(self, messages):
+        """(delay, error or None, answer rng) for one call."""
+        call_rng, answer_rng = self._rng(messages)
+        delay = self.latency(call_rng)
+        roll = call_rng.random()
+
+        if roll < self.rate_limit_rate:
+            return 0.0, RateLimitError(429, "fake rate limit", {
+                "retry-after": str(self.retry_after),
+                "x-ratelimit-reset-requests": f"{self.retry_after}s",
+            }), answer_rng
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, FakeAPIError(500, "fake server error"), answer_rng
+        if roll < self.rate_limit_rate + self.error_rate + self.hang_rate:
+            return HANG_SECONDS, None, answer_rng
+        return delay, None, answer_rng
+
+    def answer(self, messages, response_model, answer_rng):
+        schema = response_model.model_json_schema()
+        data = fake_from_schema(schema, answer_rng, count_reviews(messages))
+        resp = response_model.model_validate(data)
+
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        completion_tokens = len(json.dumps(data)) // 4
+        completion = SimpleNamespace(usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ))
+        return resp, completion
+
+
+class _FakeCompletions:
+
+    def __init__(self, fake, is_async):
+        self.fake = fake
+        self.is_async = is_async
+
+    def create_with_completion(self, messages, response_model, timeout=None, **kwargs):
+        if self.is_async:
+            return self._acreate(messages, response_model, timeout)
+
+        delay, error, answer_rng = self.fake.plan(messages)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise APITimeoutError(f"fake call timed out after {timeout:g}s")
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return self.fake.answer(messages, response_model, answer_rng)
+
+    def create(self, messages, response_model, timeout=None, **kwargs):
+        if self.is_async:
+            return self._acreate(messages, response_model, timeout, with_completion=False)
+        return self.create_with_completion(messages, response_model, timeout)[0]
+
+    async def _acreate(self, messages, response_model, timeout=None, with_completion=True):
+        delay, error, answer_rng = self.fake.plan(messages)
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise APITimeoutError(f"fake call timed out after {timeout:g}s")
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        resp, completion = self.fake.answer(messages, response_model, answer_rng)
+        return (resp, completion) if with_completion else resp
+
+
+class FakeBackend:
+    """In-process offline backend built on FakeLLM."""
+
+    def __init__(self, **fake_options):
+        self.fake = FakeLLM(**fake_options)
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(self.fake, False)))
+        self.async_client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(self.fake, True)))
@@ -0,0 +1,204 @@
+import json
+import math
+import os
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from id_index import id_text
+
+# =========================
+# 💾 PER-FILE CHECKPOINT
+# =========================
+# Append-only JSONL: one line per classified row, flushed and fsynced as soon
+# as the result arrives. A torn last line (crash mid-write) is ignored on load.
+
+
+FLOAT_DIGITS = 6  # float32 keeps ~7 significant digits; scores are given to 2
+
+
+def widen(values):
+    """float32 value(s) back to the float64 they were stored from."""
+    return np.round(np.asarray(values, dtype=np.float64), FLOAT_DIGITS)
+
+
+def json_default(value):
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class Checkpoint:
+    """Results held column-wise in memory, one slot per key.
+
+    dtypes maps a column to its allowed values (kept as int8 codes, -1 for
+    missing) or to "float32"; other columns stay plain lists. A few bytes
+    per label instead of a dict per row keeps long files flat in memory.
+    float32 never leaves this class: record() and to_frame() hand back
+    float64 rounded to FLOAT_DIGITS, so 0.79 stays 0.79 downstream.
+    """
+
+    def __init__(self, path, resume=False, dtypes=None):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.dtypes = dtypes or {}
+        self.codes = {
+            column: {value: code for code, value in enumerate(kind)}
+            for column, kind in self.dtypes.items() if kind != "float32"
+        }
+        self.rows = {}                 # key -> slot
+        self.columns = {"_pos": []}    # column -> values per slot
+
+        if resume:
+            self.load()
+        elif os.path.exists(path):
+            os.remove(path)
+
+        self.fh = open(path, "a", encoding="utf-8")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # keys written before ids were normalised ("id:123.0") merge here
+                self._store(normalize_key(rec.pop("_key")), rec)
+
+    # ---------- column storage ----------
+
+    def _column(self, column, size):
+        kind = self.dtypes.get(column)
+        if kind == "float32":
+            return array("f", [math.nan]) * size
+        if kind is not None:
+            return array("b", [-1]) * size
+        return [None] * size
+
+    def _encode(self, column, value):
+        kind = self.dtypes.get(column)
+        if kind == "float32":
+            return math.nan if value is None else float(value)
+        if kind is not None:
+            return self.codes[column].get(value, -1)
+        return value
+
+    def _decode(self, column, value):
+        kind = self.dtypes.get(column)
+        if kind == "float32":
+            return None if math.isnan(value) else round(value, FLOAT_DIGITS)
+        if kind is not None:
+            return None if value < 0 else kind[value]
+        return value
+
+    def _store(self, key, rec):
+        slot = self.rows.get(key)
+        if slot is None:
+            slot = self.rows[key] = len(self.rows)
+            for column, values in self.columns.items():
+                values.append(self._encode(column, None))
+
+        for column, value in rec.items():
+            if column not in self.columns:
+                self.columns[column] = self._column(column, len(self.rows))
+            self.columns[column][slot] = self._encode(column, value)
+
+    # ---------- public ----------
+
+    def __len__(self):
+        return len(self.rows)
+
+    def done(self, key):
+        return normalize_key(key) in self.rows
+
+    def record(self, key):
+        """Stored result columns of key as a dict."""
+        slot = self.rows[normalize_key(key)]
+        return {
+            column: self._decode(column, values[slot])
+            for column, values in self.columns.items()
+            if not column.startswith("_")
+        }
+
+    def append(self, key, pos, row):
+        key = normalize_key(key)
+        rec = {"_key": key, "_pos": pos, **row}
+        self.fh.write(json.dumps(rec, default=json_default, ensure_ascii=False) + "\n")
+        self.fh.flush()
+        os.fsync(self.fh.fileno())
+        self._store(key, {"_pos": pos, **row})
+
+    def to_frame(self, keep=None):
+        """Rows in input order; keep restricts them to a set of keys."""
+        if not self.rows:
+            return pd.DataFrame()
+
+        slots = np.arange(len(self.rows))
+        if keep is not None:
+            slots = np.fromiter((slot for key, slot in self.rows.items() if key in keep), dtype=np.int64)
+
+        positions = np.asarray(self.columns["_pos"])[slots]
+        order = slots[np.argsort(positions, kind="stable")]
+        data = {}
+
+        for column, values in self.columns.items():
+            if column.startswith("_"):
+                continue
+            kind = self.dtypes.get(column)
+            if kind == "float32":
+                data[column] = widen(np.asarray(values, dtype=np.float32)[order])
+            elif kind is not None:
+                data[column] = pd.Categorical.from_codes(np.asarray(values, dtype=np.int8)[order], categories=kind)
+            else:
+                data[column] = pd.Series(values).to_numpy()[order]
+
+        df = pd.DataFrame(data)
+
+        if "created_date" in df.columns:
+            df["created_date"] = pd.to_datetime(df["created_date"], errors="coerce")
+
+        return df
+
+    def close(self):
+        self.fh.close()
+
+
+def apply_dtypes(df, dtypes):
+    """Cast a re-read result frame to the dtypes to_frame() hands out.
+
+    Labels become categories; float32 columns come back as rounded float64,
+    since float32 is only the checkpoint's in-memory storage.
+    """
+    for column, kind in dtypes.items():
+        if column not in df.columns:
+            continue
+        if kind == "float32":
+            df[column] = widen(pd.to_numeric(df[column], errors="coerce"))
+        else:
+            df[column] = pd.Categorical(df[column], categories=kind)
+    return df
+
+
+def row_key(row, pos):
+    """id:<Message Id> (123, 123.0 and '123' give one key), else row:<pos>."""
+    message_id = row.get("Message Id") or row.get("message_id")
+    if message_id is not None and not pd.isna(message_id):
+        return f"id:{id_text(message_id)}"
+    return f"row:{pos}"
+
+
+def normalize_key(key):
+    """Key in row_key's current form; older checkpoints, dead letters and queue jobs may hold id:123.0."""
+    if key.startswith("id:"):
+        return "id:" + id_text(key[3:])
+    return key
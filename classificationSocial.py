@@ -1,12 +1,30 @@
 import time
 import os
-from glob import glob
+import asyncio
+import argparse
+from collections import Counter, deque
+from functools import partial
+import numpy as np
 import pandas as pd
 from enum import Enum
-from pydantic import BaseModel, Field
-import instructor
+from pydantic import Field, create_model
 from groq import Groq
 from dotenv import load_dotenv
+from llm_cache import ClassificationCache, build_namespace
+from checkpoint import Checkpoint, apply_dtypes, row_key
+from intermediate import LazyFrame, list_countries, partition_path, read_messages
+from paths import PATHS, excel_files
+from manifest import MANIFEST_NAME, UNCHANGED, Manifest, appended_mask, watermark
+from dedup_clusters import cluster_messages, dedup_report
+from fast_path import rule_classify
+from consistency import apply_repair, check, repair_request
+from backends import FakeBackend, InstructorBackend
+from hedging import HedgedBackend
+from metrics import METRICS, labelled
+from prompt_builder import (
+    PromptDocumentedModel, build_prompt, prompt_sections, print_token_report, reduced_model, token_report,
+)
+from retry_policy import ClassificationFailed, DeadLetterQueue, RetryPolicy, RATE_LIMIT, classify_error
 import os
 
 load_dotenv()
@@ -16,7 +34,17 @@ load_dotenv()
 # =========================
 api_key = os.getenv("GROQ_API_KEY")
 MODEL_ID = "groq/openai/gpt-oss-120b"
-client_llama = instructor.from_provider(model=MODEL_ID)
+
+# =========================
+# 🔌 BACKEND
+# =========================
+backend = InstructorBackend(MODEL_ID)
+
+
+def set_backend(new_backend):
+    """Swap the provider behind classify_ticket (e.g. backends.FakeBackend)."""
+    global backend
+    backend = new_backend
 
 # =========================
 # 🌍 COUNTRY MAP
@@ -37,11 +65,23 @@ country_map = {
 # 🤖 ENUMS
 # =========================
 class SentimentLabel(str, Enum):
+    """Polarity toward Lyca.
+
+    negative: clear complaint, anger, threat to leave, strong dissatisfaction
+    neutral: factual, balanced or mixed without strong emotion
+    positive: praise, strong satisfaction, recommendation
+    """
     negative="negative"
     neutral="neutral"
     positive="positive"
 
 class EmotionLabel(str, Enum):
+    """Dominant feeling; if several, the strongest.
+
+    betrayal: cheated, scammed or lied to
+    relief: finally fixed after problems
+    neutral: no clear emotional tone
+    """
     anger = "anger"
     frustration = "frustration"
     disappointment = "disappointment"
@@ -58,6 +98,27 @@ class EmotionLabel(str, Enum):
     neutral = "neutral"
     
 class ReviewMention(str, Enum):
+    """Main topic. Never use IssueType values here.
+
+    customer_service: agent / support quality
+    customer_communications: emails, SMS, clarity of information
+    service_general: generic "service" remark with no detail
+    solution: how the problem was (not) solved
+    delivery_service: SIM or product delivery
+    network_coverage: signal, no service in places
+    data_speed: slow data, throttling
+    call_quality: drops, echo, voice quality
+    pricing_value: price vs benefits
+    plans_bundles: allowances, bundle design
+    roaming_international: roaming, EU / international use
+    sim_activation_porting: activation delays, number porting
+    app_website_experience: app / website usability or bugs
+    account_login_security: login, password, OTP
+    billing_invoicing: bills, overcharges, unexpected fees
+    promotions_discounts: promo codes, offers
+    fraud_scam_concerns: scams, suspicious calls, fraud
+    complaint_handling: formal complaints, escalation
+    """
     customer_service = "customer_service"
     customer_communications = "customer_communications"
     service_general = "service_general"
@@ -85,6 +146,17 @@ class ReviewMention(str, Enum):
 
 
 class JourneyStage(str, Enum):
+    """Main customer-journey stage.
+
+    acquisition: marketing, sign-up decision, before use
+    onboarding_activation: SIM delivery, activation, porting, first setup
+    everyday_usage: calls, data, texts, roaming
+    support_contact: chat, email or call with support
+    payment_billing: paying, top-ups, invoices, auto-renewal
+    cancellation_exit: leaving, switching, closing account
+    post_exit_refund: refunds or issues after leaving
+    other: unclear or mixed
+    """
     acquisition = "acquisition"
     onboarding_activation = "onboarding_activation"
     everyday_usage = "everyday_usage"
@@ -94,6 +166,20 @@ class JourneyStage(str, Enum):
     post_exit_refund = "post_exit_refund"
     other = "other"
 class IssueType(str, Enum):
+    """Main underlying issue.
+
+    no_issue_pure_praise: purely positive, no real problem
+    network_issue: coverage, outages, instability
+    product_plan_issue: wrong plan, allowances, hidden limits
+    billing_payment_issue: charges, payment failures, overbilling
+    account_login_issue: account access, password, security codes
+    app_website_issue: app / website bugs, poor UX
+    process_delay_issue: long waits, slow handling
+    staff_behaviour_issue: rude or unhelpful agents
+    communication_issue: misleading or unclear information, fine print
+    cancellation_refund_issue: hard to cancel, lock-in, refunds
+    delivery_logistics_issue: SIM / product delivery, courier
+    """
     no_issue_pure_praise = "no_issue_pure_praise"
     network_issue = "network_issue"
     product_plan_issue = "product_plan_issue"
@@ -109,6 +195,12 @@ class IssueType(str, Enum):
 
 
 class ResolutionStatus(str, Enum):
+    """Whether the issue is solved.
+
+    partially_resolved: some progress, not fully fixed
+    pending: waiting for a response or outcome
+    not_applicable: no specific problem (praise, general comment)
+    """
     resolved = "resolved"
     partially_resolved = "partially_resolved"
     unresolved = "unresolved"
@@ -116,6 +208,14 @@ class ResolutionStatus(str, Enum):
     not_applicable = "not_applicable"
 
 class ReviewTone(str, Enum):
+    """Overall intent of the review.
+
+    complaint: complain or warn others
+    compliment: praise or thank
+    suggestion: advice for improvement
+    question: asking for clarification
+    mixed: both strong praise and strong complaints
+    """
     complaint = "complaint"
     compliment = "compliment"
     suggestion = "suggestion"
@@ -124,6 +224,15 @@ class ReviewTone(str, Enum):
     other = "other"
 
 class ValueForMoney(str, Enum):
+    """Price vs value as the customer sees it.
+
+    very_poor: totally ripped off
+    poor: too expensive for what they get
+    fair: acceptable, not amazing
+    good: happy with price vs value
+    excellent: extremely happy with pricing
+    not_applicable: price not discussed or inferable
+    """
     very_poor = "very_poor"
     poor = "poor"
     fair = "fair"
@@ -132,14 +241,25 @@ class ValueForMoney(str, Enum):
     not_applicable = "not_applicable"
 
 class ChurnRiskLabel(str, Enum):
+    """How likely they are to leave.
+
+    high: says they are leaving / switching, or strong persistent dissatisfaction
+    medium: unhappy, may leave, not decided
+    low: generally satisfied, minor issues only
+    not_applicable: cannot judge (generic remark, left long ago)
+    """
     high="high"
     medium="medium"
     low="low"
     not_applicable="not_applicable"
 
-class TrustpilotReviewInsights(BaseModel):
+class TrustpilotReviewInsights(PromptDocumentedModel):
     sentiment_label: SentimentLabel
-    sentiment_score: float = Field(..., ge=-1, le=1)
+    sentiment_score: float = Field(
+        ..., ge=-1, le=1,
+        description="Direction and intensity; sign must match sentiment_label, "
+                    "|score|<0.4 weak/neutral, 0.4-0.79 clear, >=0.8 extreme.",
+    )
     primary_emotion: EmotionLabel
     primary_mention: ReviewMention
     journey_stage: JourneyStage
@@ -149,309 +269,1079 @@ class TrustpilotReviewInsights(BaseModel):
     value_for_money: ValueForMoney
     churn_risk: ChurnRiskLabel
 
+class IndexedReviewInsights(TrustpilotReviewInsights):
+    review_index: int = Field(..., ge=0)
+
+class BatchReviewInsights(PromptDocumentedModel):
+    results: list[IndexedReviewInsights]
+
 # =========================
 # PROMPT
 # =========================
-SYSTEM_PROMPT = """
-You analyze public Trustpilot reviews for a telecom MVNO (Lyca Mobile).
-
-Your job is to read a single review and fill all fields of the
-TrustpilotReviewInsights schema:
-
-- sentiment_label: negative | neutral | positive
-- sentiment_score: float in [0, 1]
-- primary_emotion: one dominant emotion
-- primary_mention: one dominant topic / theme
-- journey_stage: main stage of the customer journey
-- primary_issue_type: main underlying issue (or 'no_issue_pure_praise')
-- resolution_status: whether the issue is resolved or not
-- review_tone: overall intent of the review
-- value_for_money: how the customer feels about price vs value
-- churn_risk: how likely they are to leave
-- summary: one-sentence plain-English summary
-
-General rules
--------------
-- Always base your decisions ONLY on what is clearly implied in the review.
-- Do NOT hallucinate specific facts (dates, amounts, names).
-- When several labels could apply, choose the MOST IMPORTANT / DOMINANT one.
-- Every field must have exactly ONE value from its enum (no lists, no nulls).
-- If something is unclear or not mentioned, choose the safest / most neutral label
-  (e.g. 'other', 'not_applicable', 'neutral', 'fair', 'medium').
-
-Sentiment
----------
-sentiment_label:
-- negative: clear complaint, anger, threats to leave, strong dissatisfaction.
-- neutral: mostly factual, balanced, or mixed comments without strong emotion.
-- positive: praise, strong satisfaction, clear recommendation.
-
-sentiment_score (-1 to 1):
-- from -1.0 to -0.80: extremely negative.
-- from -0.79 to -0.40: clearly negative.
-- from -0.39 to +0.39: weak / mixed / neutral (0 means perfectly neutral).
-- from +0.40 to +0.79: clearly positive.
-- from +0.80 to +1.00: extremely positive.
-
-The score reflects BOTH direction and intensity:
-- negative scores = negative sentiment,
-- positive scores = positive sentiment,
-- scores near 0 = neutral or very weak sentiment.
-
-Ensure the sign of sentiment_score is consistent with sentiment_label:
-- if sentiment_label = "negative", sentiment_score should be < 0;
-- if sentiment_label = "neutral", sentiment_score should be close to 0;
-- if sentiment_label = "positive", sentiment_score should be > 0.
-
-
-Primary emotion
----------------
-Choose ONE EmotionLabel that best captures the dominant feeling:
-
-Negative:
-- anger, frustration, disappointment, anxiety, confusion, fear, sadness, betrayal
-  (betrayal = feeling cheated, scammed, or lied to).
-
-Positive:
-- relief (finally fixed after problems), satisfaction, joy, gratitude, pride.
-
-Neutral:
-- neutral (no clear emotional tone).
-
-If there is both weak annoyance and strong disappointment, pick the stronger
-one (e.g. disappointment).
-
-Primary mention (topic)
------------------------
-Choose ONE ReviewMention that best describes what the review is mainly about.
-
-Generic / service:
-- customer_service: interaction with agents / support quality.
-- customer_communications: emails, SMS, clarity of information, notifications.
-- service_general: very generic comments about “service” with no clear detail.
-- solution: focus on how the problem was solved (or not).
-- cancellation, payment, staff, refund, location, delivery_service.
-
-Telco-specific:
-- network_coverage: signal strength, coverage, no service in places.
-- data_speed: data speed, throttling, slow internet.
-- call_quality: call drops, echo, voice quality.
-- pricing_value: value for money, price vs benefits.
-- plans_bundles: bundle structure, allowances, fairness of plans.
-- roaming_international: roaming, international usage, EU usage.
-- sim_activation_porting: activation delays, number porting issues.
-- app_website_experience: usability or bugs in app/website.
-- account_login_security: login, password, security, OTP issues.
-- billing_invoicing: bills, overcharges, unexpected fees.
-- promotions_discounts: promo codes, discounts, special offers.
-- fraud_scam_concerns: scams, suspicious calls, fraud experiences.
-- complaint_handling: formal complaints, escalation handling.
-- other: none of the above fits well.
-IMPORTANT ENUM SAFETY RULES
----------------------------
-- primary_mention MUST ALWAYS be chosen ONLY from the ReviewMention enum.
-- NEVER use IssueType values (e.g. delivery_logistics_issue, billing_payment_issue)
-  as primary_mention.
-- If the issue is about SIM or delivery problems:
-  - Use primary_mention = delivery_service
-  - Use primary_issue_type = delivery_logistics_issue
-
-
-Customer journey stage
-----------------------
-JourneyStage:
-- acquisition: marketing, sign-up decision, first impression before use.
-- onboarding_activation: SIM delivery, activation, number porting, first setup.
-- everyday_usage: regular usage of calls, data, texts, roaming.
-- support_contact: interacting with support/helpdesk (chat, email, call).
-- payment_billing: paying, top-ups, invoices, auto-renewal.
-- cancellation_exit: leaving the service, switching providers, closing account.
-- post_exit_refund: refunds or issues after leaving.
-- other: unclear or mixed.
-
-Primary issue type
-------------------
-IssueType:
-- no_issue_pure_praise: purely positive praise with no real problem.
-- network_issue: coverage, outages, network instability.
-- product_plan_issue: wrong plan, allowances, plan design, hidden limits.
-- billing_payment_issue: charges, refunds, payment failures, overbilling.
-- account_login_issue: login, account access, password, security codes.
-- app_website_issue: website or app bugs, poor UX, technical errors.
-- process_delay_issue: very long waiting times, delays in handling.
-- staff_behaviour_issue: rude staff, unhelpful agents, attitude.
-- communication_issue: misleading or unclear information, fine print issues.
-- cancellation_refund_issue: difficulty cancelling, contract lock-in, refunds.
-- delivery_logistics_issue: SIM or product delivery problems, courier issues.
-- other: something different or unclear.
-
-Resolution status
------------------
-ResolutionStatus:
-- resolved: the review clearly says the issue is solved.
-- partially_resolved: some progress but not fully resolved.
-- unresolved: the issue is still not fixed.
-- pending: the customer is waiting for a response or outcome.
-- not_applicable: no specific problem to resolve (pure praise or general comment).
-
-Review tone
------------
-ReviewTone:
-- complaint: mainly to complain or warn others.
-- compliment: mainly to praise or thank the company/staff.
-- suggestion: mainly advice or ideas for improvement.
-- question: mainly asking questions or seeking clarification.
-- mixed: clearly includes both strong praise and strong complaints.
-- other: does not fit any of the above.
-
-Value for money
----------------
-ValueForMoney:
-- very_poor: feels totally ripped off, extremely bad value.
-- poor: bad value, too expensive for what they get.
-- fair: average, acceptable but not amazing.
-- good: clearly happy with price vs value.
-- excellent: extremely happy with pricing and value.
-- not_applicable: price/value is not discussed or cannot be inferred.
-
-Churn risk
+PROMPT_PREAMBLE = """
+Classify one public review of Lyca Mobile (telecom MVNO). Give every field
+exactly one value from its list; judge from Lyca's perspective.
+"""
+
+PROMPT_RULES = [
+    "Use only what the review clearly implies; never invent facts.",
+    "Several labels fit: pick the dominant one. Unclear: the safest one (other, not_applicable, neutral).",
+    "SIM or delivery problems: primary_mention=delivery_service, primary_issue_type=delivery_logistics_issue.",
+    "Mainly praises a competitor: negative toward Lyca unless Lyca is also clearly praised.",
+]
+
+SYSTEM_PROMPT = build_prompt(TrustpilotReviewInsights, PROMPT_PREAMBLE, PROMPT_RULES)
+
+BATCH_INSTRUCTIONS = """
+Batch mode
 ----------
-ChurnRiskLabel:
-- high: clear statements about leaving / switching, or very strong persistent
-  dissatisfaction (“I will never use them again”, “last time with Lyca”).
-- medium: unhappy and may leave, but not explicitly decided.
-- low: generally satisfied, minor issues only.
-- not_applicable: cannot reasonably judge (e.g. generic remark or ex-customer
-  already left long ago and is just describing history).
-
-Summary
--------
-summary:
-- One concise sentence in plain English.
-- Capture who the customer is (if implied), what happened, and how they feel.
-- Do not add marketing language or apologise; just describe.
-
-## Competitor Praise Note
-If the review primarily praises or recommends a competitor instead of Lyca Mobile,
-treat this as negative sentiment toward Lyca unless Lyca is also clearly praised.
-Classify all fields from Lyca’s perspective.
-
-In such cases, the summary must clearly state that the customer is praising a
-competitor and implicitly or explicitly comparing Lyca unfavorably.
-Do not invent competitor details beyond what is mentioned in the review.
-
-Output format
--------------
-You MUST produce values that exactly match the enums defined in the
-TrustpilotReviewInsights Pydantic model and obey all constraints above.
-Do NOT output lists or arrays for any field; each field must be a single value.
+You will receive several reviews, each introduced by [REVIEW i].
+Classify every review independently, exactly as if it were sent alone, and
+return one result per review with review_index set to i.
+Return exactly one result for every index; never merge or skip reviews.
 """
 
+# =========================
+# 🎛️ FIELD SELECTION
+# =========================
+# output column per TrustpilotReviewInsights field
+RESULT_COLUMNS = {
+    "sentiment_label": "sentiment",   # 🔴 UPDATED NAME
+    "sentiment_score": "sentiment_score",
+    "primary_emotion": "emotion",
+    "primary_mention": "primary_mention",
+    "journey_stage": "journey_stage",
+    "primary_issue_type": "issue_type",
+    "resolution_status": "resolution_status",
+    "review_tone": "review_tone",
+    "value_for_money": "value_for_money",
+    "churn_risk": "churn_risk",
+}
+
+
+def result_dtypes(model):
+    """Compact result columns: enum labels as categories (int8 codes), floats as float32."""
+    dtypes = {}
+    for name, field in model.model_fields.items():
+        if isinstance(field.annotation, type) and issubclass(field.annotation, Enum):
+            dtypes[RESULT_COLUMNS[name]] = [m.value for m in field.annotation]
+        elif field.annotation is float:
+            dtypes[RESULT_COLUMNS[name]] = "float32"
+    return dtypes
+
+
+RESULT_DTYPES = result_dtypes(TrustpilotReviewInsights)
+
+MAX_TOKENS_PER_FIELD = 100
+
+
+class FieldProfile:
+    """Response models, prompts and token budget for the fields asked for."""
+
+    def __init__(self, fields=None):
+        self.fields = [f for f in TrustpilotReviewInsights.model_fields if fields is None or f in fields]
+
+        if len(self.fields) == len(TrustpilotReviewInsights.model_fields):
+            self.model = TrustpilotReviewInsights
+            self.batch_model = BatchReviewInsights
+            self.prompt = SYSTEM_PROMPT
+        else:
+            self.model = reduced_model(TrustpilotReviewInsights, self.fields)
+            indexed = create_model(
+                "IndexedReviewInsightsSubset", __base__=self.model, review_index=(int, Field(..., ge=0)),
+            )
+            self.batch_model = create_model(
+                "BatchReviewInsightsSubset", __base__=PromptDocumentedModel, results=(list[indexed], ...),
+            )
+            self.prompt = build_prompt(TrustpilotReviewInsights, PROMPT_PREAMBLE, PROMPT_RULES, self.fields)
+
+        self.batch_prompt = self.prompt + BATCH_INSTRUCTIONS
+        self.max_tokens = MAX_TOKENS_PER_FIELD * len(self.fields)
+        self.namespace = build_namespace(self.prompt, MODEL_ID, self.model)
+
+
+profile = FieldProfile()
+
+
+def set_fields(fields=None):
+    """Ask the model only for these TrustpilotReviewInsights fields (None = all)."""
+    global profile
+    profile = FieldProfile(fields)
+    return profile
+
+
+def parse_fields(spec):
+    """'sentiment,churn_risk' (field or output column names) -> ordered field names."""
+    by_column = {column: field for field, column in RESULT_COLUMNS.items()}
+    wanted = set()
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        field = name if name in RESULT_COLUMNS else by_column.get(name)
+        if field is None:
+            raise ValueError(f"unknown field {name!r}; choose from {', '.join(RESULT_COLUMNS)}")
+        wanted.add(field)
+    return [f for f in RESULT_COLUMNS if f in wanted]
+
+
+def missing_fields(record, fields):
+    """Fields whose output column is absent or empty in a stored result row."""
+    return [f for f in fields if record.get(RESULT_COLUMNS[f]) is None]
+
+
+def stored_values(record):
+    """Field values of a stored result row, for checking rules across runs."""
+    return {f: record[column] for f, column in RESULT_COLUMNS.items() if record.get(column) is not None}
+
 def build_user_message(review_text: str):
     return {
         "role": "user",
         "content": f"[REVIEW]\n{review_text}"
     }
 
+# =========================
+# ⚖️ CONSISTENCY REPAIR
+# =========================
+REPAIR = True
+
+
+def set_repair(enabled):
+    global REPAIR
+    REPAIR = enabled
+
+
+def check_consistency(ai, stored=None):
+    """Broken cross-field rules of ai (merged into stored), counted per rule."""
+    broken = check(ai, stored)
+    METRICS.inc("consistency_checked_total")
+    if broken:
+        METRICS.inc("consistency_violating_total")
+        for name, _, _ in broken:
+            METRICS.inc("consistency_violations_total", rule=name)
+    return broken
+
+
+def apply_repaired(ai, repaired, completion, start, stored=None):
+    METRICS.observe("llm_repair_seconds", time.perf_counter() - start)
+    usage = getattr(completion, "usage", None)
+    if usage is not None:
+        METRICS.record_usage(usage, histogram=False)
+
+    fixed = apply_repair(ai, repaired)
+    METRICS.inc("consistency_repairs_total", outcome="unfixed" if check(fixed, stored) else "fixed")
+    return fixed
+
+
+def repair_ticket(ticket_text, ai, stored=None):
+    """ai with the fields behind any broken rule re-asked in one small call.
+
+    stored are the field values of the checkpoint row ai fills in, if any.
+    A failed repair keeps the original answer; it is never retried.
+    """
+    broken = check_consistency(ai, stored)
+    if not broken or not REPAIR:
+        return ai
+
+    messages, model, fields = repair_request(TrustpilotReviewInsights, ai, ticket_text, broken, stored)
+    start = time.perf_counter()
+    try:
+        repaired, completion = backend.client.chat.completions.create_with_completion(
+            messages=messages,
+            temperature=0.0,
+            max_tokens=MAX_TOKENS_PER_FIELD * len(fields),
+            response_model=model,
+        )
+    except Exception:
+        METRICS.inc("consistency_repairs_total", outcome="error")
+        return ai
+
+    return apply_repaired(ai, repaired, completion, start, stored)
+
+
+async def repair_ticket_async(ticket_text, ai):
+    broken = check_consistency(ai)
+    if not broken or not REPAIR:
+        return ai
+
+    messages, model, fields = repair_request(TrustpilotReviewInsights, ai, ticket_text, broken)
+    start = time.perf_counter()
+    try:
+        repaired, completion = await backend.async_client.chat.completions.create_with_completion(
+            messages=messages,
+            temperature=0.0,
+            max_tokens=MAX_TOKENS_PER_FIELD * len(fields),
+            response_model=model,
+        )
+    except Exception:
+        METRICS.inc("consistency_repairs_total", outcome="error")
+        return ai
+
+    return apply_repaired(ai, repaired, completion, start)
+
 # =========================
 # RETRY CLASSIFIER
 # =========================
-def classify_ticket(ticket_text: str):
+RETRY_POLICY = RetryPolicy()
+
+
+def classify_ticket(ticket_text: str, policy=None):
+    """Classify one review, retrying per error class.
 
-    for attempt in range(3):
+    Raises ClassificationFailed once the retry budget for an error class
+    (rate limit, transport, validation, fatal) is spent.
+    """
+    policy = policy or RETRY_POLICY
+    failures = Counter()
+
+    while True:
+
+        start = time.perf_counter()
 
         try:
             messages = [
-                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "system", "content": profile.prompt},
                 build_user_message(ticket_text),
             ]
 
-            resp = client_llama.chat.completions.create(
+            resp, completion = backend.client.chat.completions.create_with_completion(
                 messages=messages,
                 temperature=0.0,
-                max_tokens=1000,
-                response_model=TrustpilotReviewInsights,
+                max_tokens=profile.max_tokens,
+                response_model=profile.model,
             )
 
-            time.sleep(0.5)
-            return resp
+            METRICS.record_call(time.perf_counter() - start, "ok", getattr(completion, "usage", None))
+            METRICS.sleep(0.5, "throttle")
+            return repair_ticket(ticket_text, resp)
+
+        except Exception as exc:
+            kind = classify_error(exc)
+            failures[kind] += 1
+            METRICS.record_call(time.perf_counter() - start, kind)
+
+            delay = policy.next_delay(kind, failures[kind], exc)
+            if delay is None:
+                METRICS.inc("llm_failures_total", kind=kind)
+                raise ClassificationFailed(kind, sum(failures.values()), exc) from exc
+
+            METRICS.inc("llm_retries_total", kind=kind)
+            METRICS.sleep(delay, "backoff")
+
+# =========================
+# ⚡ ASYNC CLASSIFIER
+# =========================
+def estimate_tokens(text: str):
+    # rough ~4 chars per token, prompt + review + response budget
+    return (len(profile.prompt) + len(text)) // 4 + profile.max_tokens
+
+
+class RateLimiter:
+    """Sliding one-minute budget for requests (rpm) and tokens (tpm)."""
+
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = deque()
+        self.lock = asyncio.Lock()
+        self.paused_until = 0.0
+
+    def pause(self, seconds):
+        """Hold every caller back, e.g. after a 429 with a reset header."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int):
+        while (wait := self.paused_until - time.monotonic()) > 0:
+            await METRICS.sleep_async(wait, "rate_limit_pause")
+
+        if not self.rpm and not self.tpm:
+            return
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.window and now - self.window[0][0] >= 60:
+                    self.window.popleft()
+
+                used = sum(t for _, t in self.window)
+                rpm_ok = not self.rpm or len(self.window) < self.rpm
+                tpm_ok = not self.tpm or not self.window or used + tokens <= self.tpm
+
+                if rpm_ok and tpm_ok:
+                    self.window.append((now, tokens))
+                    return
+
+                await METRICS.sleep_async(60 - (now - self.window[0][0]), "rate_limiter")
+
+
+async def classify_ticket_async(ticket_text: str, semaphore, limiter, policy=None):
+
+    client = backend.async_client
+    policy = policy or RETRY_POLICY
+    failures = Counter()
+
+    while True:
+
+        async with semaphore:
+            await limiter.acquire(estimate_tokens(ticket_text))
+
+            start = time.perf_counter()
+
+            try:
+                messages = [
+                    {"role": "system", "content": profile.prompt},
+                    build_user_message(ticket_text),
+                ]
+
+                resp, completion = await client.chat.completions.create_with_completion(
+                    messages=messages,
+                    temperature=0.0,
+                    max_tokens=profile.max_tokens,
+                    response_model=profile.model,
+                )
+
+                METRICS.record_call(time.perf_counter() - start, "ok", getattr(completion, "usage", None))
+                return await repair_ticket_async(ticket_text, resp)
+
+            except Exception as exc:
+                last_exc = exc
+                kind = classify_error(exc)
+                failures[kind] += 1
+                METRICS.record_call(time.perf_counter() - start, kind)
+                delay = policy.next_delay(kind, failures[kind], exc)
+
+        if delay is None:
+            METRICS.inc("llm_failures_total", kind=kind)
+            raise ClassificationFailed(kind, sum(failures.values()), last_exc) from last_exc
+
+        if kind == RATE_LIMIT:
+            limiter.pause(delay)
+
+        METRICS.inc("llm_retries_total", kind=kind)
+        await METRICS.sleep_async(delay, "backoff")
+
+
+async def classify_many_async(texts, concurrency=8, rpm=None, tpm=None, on_result=None, labels=None):
+    """Classify texts concurrently; results come back in input order.
+
+    on_result(i, ai, failure) is called as soon as each individual result
+    arrives; failure is the ClassificationFailed when ai is None.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rpm, tpm)
+
+    async def run(i, text):
+        ai, failure = None, None
+        with labelled(**(labels[i] if labels else {})):
+            try:
+                ai = await classify_ticket_async(text, semaphore, limiter)
+            except ClassificationFailed as exc:
+                failure = exc
+            if on_result is not None:
+                on_result(i, ai, failure)
+        return ai
 
-        except Exception:
-            time.sleep(1.5)
+    return await asyncio.gather(*(run(i, t) for i, t in enumerate(texts)))
+
+
+# =========================
+# 📦 BATCH CLASSIFIER
+# =========================
+def build_batch_user_message(review_texts):
+    blocks = [f"[REVIEW {i}]\n{text}" for i, text in enumerate(review_texts)]
+    return {
+        "role": "user",
+        "content": "\n\n".join(blocks)
+    }
+
+
+def batch_platform(labels):
+    platforms = {l.get("platform") for l in labels}
+    return platforms.pop() if len(platforms) == 1 else "mixed"
+
+
+def classify_batch(review_texts, labels=None):
+    """One request for several reviews.
+
+    Returns (results, total_tokens); results is aligned with review_texts and
+    holds None for every index the model dropped, duplicated or misnumbered.
+    labels are per-review metric labels; the call itself is booked under the
+    batch's platform (or 'mixed') and its tokens are split across reviews.
+    """
+    labels = labels or [{}] * len(review_texts)
+    failures = Counter()
+
+    while True:
+
+        start = time.perf_counter()
+
+        try:
+            messages = [
+                {"role": "system", "content": profile.batch_prompt},
+                build_batch_user_message(review_texts),
+            ]
+
+            resp, completion = backend.client.chat.completions.create_with_completion(
+                messages=messages,
+                temperature=0.0,
+                max_tokens=profile.max_tokens * 2 // 5 * len(review_texts) + 200,
+                response_model=profile.batch_model,
+            )
+
+            usage = getattr(completion, "usage", None)
+            tokens = getattr(usage, "total_tokens", 0) or 0
+
+            with labelled(platform=batch_platform(labels)):
+                METRICS.record_call(time.perf_counter() - start, "ok")
+            if usage is not None:
+                for review_labels in labels:
+                    METRICS.record_usage(usage, 1 / len(review_texts), histogram=False, **review_labels)
+
+            counts = Counter(item.review_index for item in resp.results)
+
+            results = [None] * len(review_texts)
+            for item in resp.results:
+                i = item.review_index
+                if i < len(review_texts) and counts[i] == 1:
+                    with labelled(**labels[i]):
+                        results[i] = repair_ticket(
+                            review_texts[i], profile.model(**item.model_dump(exclude={"review_index"})),
+                        )
+
+            METRICS.sleep(0.5, "throttle")
+            return results, tokens
+
+        except Exception as exc:
+            kind = classify_error(exc)
+            failures[kind] += 1
+            with labelled(platform=batch_platform(labels)):
+                METRICS.record_call(time.perf_counter() - start, kind)
+
+            delay = RETRY_POLICY.next_delay(kind, failures[kind], exc)
+            if delay is None:
+                return [None] * len(review_texts), 0
+
+            METRICS.inc("llm_retries_total", kind=kind)
+            METRICS.sleep(delay, "backoff")
+
+
+def classify_batched(texts, batch_size=10, stats=None, on_result=None, labels=None):
+    """Classify texts K at a time, retrying only the items a batch failed on.
+
+    A batch that fails completely is split in half; a partial batch re-sends
+    just the missing reviews. Single reviews fall back to classify_ticket.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("batch_calls", 0)
+    stats.setdefault("batch_tokens", 0)
+    stats.setdefault("batch_reviews", 0)
+    stats.setdefault("single_calls", 0)
+
+    results = [None] * len(texts)
+    queue = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+
+    while queue:
+        idx = queue.pop(0)
+
+        if len(idx) == 1:
+            failure = None
+            with labelled(**(labels[idx[0]] if labels else {})):
+                try:
+                    results[idx[0]] = classify_ticket(texts[idx[0]])
+                except ClassificationFailed as exc:
+                    failure = exc
+            stats["single_calls"] += 1
+            if on_result is not None:
+                on_result(idx[0], results[idx[0]], failure)
+            continue
+
+        batch_results, tokens = classify_batch(
+            [texts[i] for i in idx], [labels[i] for i in idx] if labels else None
+        )
+        stats["batch_calls"] += 1
+        stats["batch_tokens"] += tokens
+
+        failed = []
+        for i, ai in zip(idx, batch_results):
+            if ai is None:
+                failed.append(i)
+            else:
+                results[i] = ai
+                stats["batch_reviews"] += 1
+                if on_result is not None:
+                    on_result(i, ai, None)
+
+        if len(failed) == len(idx):
+            half = len(idx) // 2
+            queue.extend([idx[:half], idx[half:]])
+        elif failed:
+            queue.append(failed)
+
+    return results
+
+
+def classify_many(texts, mode="sequential", concurrency=8, rpm=None, tpm=None, cache=None,
+                  batch_size=10, stats=None, on_result=None, rules=False, local=None, labels=None):
+    """Classify texts with the chosen engine, serving rule hits, cache hits
+    and confident local-model predictions first.
+
+    on_result(i, ai, failure, source) fires once per text, in completion
+    order, as soon as its result is known; source is 'rules', 'cache',
+    'local' or 'llm'. On failure ai is None and failure is the ClassificationFailed
+    that ended its retries. labels, if given, holds per-text metric labels
+    (e.g. {"platform": ...}).
+    """
+    results = [None] * len(texts)
+    todo = []
+
+    def count(i, source):
+        METRICS.inc("reviews_total", source=source, **(labels[i] if labels else {}))
+
+    for i, text in enumerate(texts):
+        fields = rule_classify(text) if rules else None
+        if fields is not None:
+            results[i] = profile.model(**fields)
+            count(i, "rules")
+            if on_result is not None:
+                on_result(i, results[i], None, "rules")
             continue
 
-    return None
+        hit = cache.get(text, profile.model) if cache is not None else None
+        if hit is not None:
+            results[i] = hit
+            count(i, "cache")
+            if on_result is not None:
+                on_result(i, hit, None, "cache")
+        else:
+            todo.append(i)
+
+    if local is not None:
+        routed = local.route([texts[i] for i in todo])
+        remaining = []
+        for i, fields in zip(todo, routed):
+            if fields is None:
+                remaining.append(i)
+                continue
+            results[i] = profile.model(**fields)
+            count(i, "local")
+            if on_result is not None:
+                on_result(i, results[i], None, "local")
+        todo = remaining
+
+    def deliver(j, ai, failure=None):
+        i = todo[j]
+        results[i] = ai
+        count(i, "llm" if ai is not None else "failed")
+        if cache is not None and ai is not None:
+            cache.put(texts[i], ai)
+            cache.commit()
+        if on_result is not None:
+            on_result(i, ai, failure, "llm")
+
+    todo_texts = [texts[i] for i in todo]
+    todo_labels = [labels[i] for i in todo] if labels else None
+
+    if mode == "async":
+        asyncio.run(classify_many_async(todo_texts, concurrency, rpm, tpm, on_result=deliver, labels=todo_labels))
+    elif mode == "batch":
+        classify_batched(todo_texts, batch_size, stats, on_result=deliver, labels=todo_labels)
+    else:
+        for j, text in enumerate(todo_texts):
+            with labelled(**(todo_labels[j] if todo_labels else {})):
+                try:
+                    deliver(j, classify_ticket(text))
+                except ClassificationFailed as failure:
+                    deliver(j, None, failure)
+
+    return results
+
+# =========================
+# 🧾 RESULT ROW
+# =========================
+def build_result_row(country, row, message, ai):
+    result = {
+        "country": country,
+        "message_id": row.get("message_id") or row.get("Message Id"),
+        "platform": row.get("platform") or row.get("Media Type"),
+        "title": row.get("title") or row.get("Title"),
+        "message": message,
+        "link": row.get("link") or row.get("Link"),
+        "created_date": row.get("created_date") or row.get("Publish Date"),
+        "language": row.get("language") or row.get("Language"),
+        "username": row.get("username") or row.get("User Name"),
+        "gender": row.get("gender") or row.get("Gender"),
+        "user_rating": row.get("user_rating") or row.get("Star Rating"),
+    }
+
+    # only the fields this run asked for (--fields)
+    for field, value in ai:
+        result[RESULT_COLUMNS[field]] = value.value if isinstance(value, Enum) else value
+
+    return result
+
+# =========================
+# ⚙️ CLI
+# =========================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Classify cleaned social/Trustpilot messages with the LLM.")
+    parser.add_argument("--mode", choices=["sequential", "async", "batch"], default="sequential")
+    parser.add_argument("--concurrency", type=int, default=8, help="max in-flight requests in async mode")
+    parser.add_argument("--rpm", type=int, default=None, help="requests per minute budget (async mode)")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens per minute budget (async mode)")
+    parser.add_argument("--batch-size", type=int, default=10, help="reviews per request in batch mode")
+    parser.add_argument("--cache", default=CACHE_PATH, help="sqlite cache file for classifications")
+    parser.add_argument("--no-cache", action="store_true", help="always call the model")
+    parser.add_argument("--cache-max-entries", type=int, default=500_000)
+    parser.add_argument("--cache-max-age-days", type=int, default=90)
+    parser.add_argument("--resume", action="store_true",
+                        help="keep existing checkpoints and skip rows already classified")
+    parser.add_argument("--input-format", choices=["auto", "parquet", "excel"], default="auto",
+                        help="auto reads the Parquet dataset when present, else the xlsx files")
+    parser.add_argument("--no-rules", action="store_true",
+                        help="send trivial messages (emoji-only, 'thanks', bare links) to the model too")
+    parser.add_argument("--local-model", default=None,
+                        help="distilled model (local_model.py train); confident reviews skip the LLM")
+    parser.add_argument("--dedup", choices=["off", "exact", "minhash"], default="off",
+                        help="classify one representative per near-duplicate cluster")
+    parser.add_argument("--similarity", type=float, default=0.85,
+                        help="minhash Jaccard threshold for --dedup minhash")
+    parser.add_argument("--backend", choices=["groq", "openai", "fake"], default="groq",
+                        help="groq = MODEL_ID via instructor; openai = any OpenAI-compatible --base-url; fake = offline")
+    parser.add_argument("--base-url", default=None, help="endpoint for --backend openai (e.g. fake_llm_server.py)")
+    parser.add_argument("--no-repair", action="store_true",
+                        help="only count consistency-rule violations, do not re-ask the offending fields")
+    parser.add_argument("--endpoints", default=None,
+                        help="JSON list of provider/key/model endpoints to load-balance over (router.py)")
+    parser.add_argument("--deadline", type=float, default=60.0,
+                        help="seconds before a single LLM call is given up (retried as a transport error)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="send a duplicate of calls slower than the observed p95; first answer wins")
+    parser.add_argument("--hedge-budget", type=float, default=5.0,
+                        help="max hedged calls, as a percentage of all calls")
+    parser.add_argument("--fake-latency-ms", type=float, default=300.0)
+    parser.add_argument("--fake-latency-sigma", type=float, default=0.5)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--fake-429-rate", type=float, default=0.0)
+    parser.add_argument("--fake-hang-rate", type=float, default=0.0)
+    parser.add_argument("--fake-seed", type=int, default=0)
+    parser.add_argument("--metrics-dir", default=None,
+                        help="where classifier_metrics.json/.prom are written (default: output folder)")
+    parser.add_argument("--fields", default=None,
+                        help="comma-separated subset of fields to ask for, e.g. sentiment,sentiment_score; "
+                             "with --resume, rows already stored only get their missing fields")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the manifest: re-read every input and start fresh checkpoints")
+    parser.add_argument("--prompt-report", action="store_true",
+                        help="print the generated prompt's token count per section and exit")
+    parser.add_argument("--dead-letter", default=DEAD_LETTER_PATH, help="jsonl file for reviews that failed every retry")
+    parser.add_argument("--redrive", action="store_true", help="re-classify the dead-letter queue instead of the input folder")
+    return parser.parse_args(argv)
 
 # =========================
 # INPUT / OUTPUT
 # =========================
-input_folder = r"C:\Users\Moha8550\OneDrive - Lyca Group\Desktop\SocialMedia_datapreprocessing_folder\countrywise_output_message_only"
-output_folder = r"C:\Users\Moha8550\OneDrive - Lyca Group\Desktop\SocialMedia_datapreprocessing_folder\countrywisetrustpilot_output_message_only"
-os.makedirs(output_folder, exist_ok=True)
+def use_paths(paths):
+    """Point the classifier at a folder layout from paths.load_paths()."""
+    global input_folder, output_folder, CACHE_PATH, CHECKPOINT_FOLDER, DEAD_LETTER_PATH, PARQUET_INPUT
+    input_folder = paths["message_only"]
+    output_folder = paths["classified"]
+    CACHE_PATH = os.path.join(output_folder, "llm_cache.sqlite")
+    CHECKPOINT_FOLDER = os.path.join(output_folder, "checkpoints")
+    DEAD_LETTER_PATH = os.path.join(output_folder, "dead_letter.jsonl")
+    PARQUET_INPUT = os.path.join(input_folder, "parquet")
 
-files = glob(f"{input_folder}\\*.xlsx")
 
-d2_llm = {}
+use_paths(PATHS)
 
-for file in files:
+CLASSIFIER_COLUMNS = [
+    "message_id", "platform", "title", "message", "link",
+    "created_date", "language", "username", "gender", "user_rating",
+]
 
-    print("\nProcessing:", file)
 
-    filename = os.path.basename(file)
+def country_from_filename(filename):
     raw = filename.split("(")[0].strip()
 
     if len(raw) == 3:
-        country = country_map.get(raw.upper(), raw)
+        return country_map.get(raw.upper(), raw)
+    return raw.title()
+
+
+def checkpoint_path(filename):
+    return os.path.join(CHECKPOINT_FOLDER, os.path.splitext(filename)[0] + ".jsonl")
+
+
+def iter_inputs(input_format="auto"):
+    """Yield (name, country, path, load) per input unit; load() reads its rows.
+
+    Parquet (one unit per country partition, projected to CLASSIFIER_COLUMNS)
+    is preferred; the legacy *_message_only.xlsx files are the fallback.
+    """
+    use_parquet = input_format == "parquet" or (
+        input_format == "auto" and list_countries(PARQUET_INPUT)
+    )
+
+    if use_parquet:
+        for country in list_countries(PARQUET_INPUT):
+            print("\nProcessing:", f"{PARQUET_INPUT} [country={country}]")
+            yield (
+                f"{country}.parquet", country, partition_path(PARQUET_INPUT, country),
+                partial(read_messages, PARQUET_INPUT, CLASSIFIER_COLUMNS, country),
+            )
+        return
+
+    for file in excel_files(input_folder):
+        print("\nProcessing:", file)
+        filename = os.path.basename(file)
+        yield filename, country_from_filename(filename), file, partial(pd.read_excel, file)
+
+
+def row_platform(row):
+    platform = row.get("platform") or row.get("Media Type")
+    return "unknown" if pd.isna(platform) else platform
+
+
+def classify_pending(pending, filename, country, checkpoint, dead_letter, args, cache):
+    """Classify (key, pos, row, message) tuples into the checkpoint;
+    reviews that exhaust their retries go to the dead-letter queue.
+
+    With --dedup, only one representative per near-duplicate cluster is sent
+    to the model and its labels are copied to every member.
+    """
+    stats = {}
+    messages = [message for _, _, _, message in pending]
+
+    if args.dedup != "off":
+        cluster_ids, members = cluster_messages(messages, args.dedup, args.similarity)
+        print(dedup_report(len(messages), len(members)))
     else:
-        country = raw.title()
+        cluster_ids, members = None, {i: [i] for i in range(len(messages))}
+
+    representatives = list(members)
+    labels = [{"platform": row_platform(pending[r][2])} for r in representatives]
+
+    def save(j, ai, failure=None, source="llm"):
+        for i in members[representatives[j]]:
+            key, pos, row, message = pending[i]
+            if ai is None:
+                print(f"☠️ Dead-lettered ({failure.kind}):", message[:40])
+                dead_letter.append({
+                    "source_file": filename,
+                    "country": country,
+                    "key": key,
+                    "pos": pos,
+                    "message": message,
+                    "row": dict(row),
+                }, failure)
+                continue
+            stored = checkpoint.record(key) if checkpoint.done(key) else None
+            answer = ai
+            if stored is not None:
+                # filling in fields a previous --fields run left out: rules
+                # spanning a stored field and a new one are checked here
+                answer = repair_ticket(message, ai, stored_values(stored))
+            result = build_result_row(country, row, message, answer)
+            result["classified_by"] = source
+            if stored is not None:
+                result = {**stored, **{k: v for k, v in result.items() if k in RESULT_COLUMNS.values()}}
+            if cluster_ids is not None:
+                result["cluster_id"] = cluster_ids[i]
+                if i != representatives[j]:
+                    METRICS.inc("dedup_copies_total", platform=row_platform(row))
+            checkpoint.append(key, pos, result)
+
+    classify_many(
+        [messages[r] for r in representatives],
+        mode=args.mode,
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        cache=cache,
+        batch_size=args.batch_size,
+        stats=stats,
+        on_result=save,
+        rules=not args.no_rules,
+        local=args.local,
+        labels=labels,
+    )
+
+    if args.mode == "batch" and stats["batch_reviews"]:
+        print(
+            f"📦 Batch: {stats['batch_reviews']} reviews in {stats['batch_calls']} calls, "
+            f"{stats['batch_tokens'] / stats['batch_reviews']:.0f} tokens/review, "
+            f"{stats['single_calls']} single fallbacks"
+        )
+
+
+def output_path(country):
+    return os.path.join(output_folder, f"{country}_trustpilot_llm.xlsx")
+
+
+def read_output(country):
+    return apply_dtypes(pd.read_excel(output_path(country)), RESULT_DTYPES)
+
+
+def write_output(country, checkpoint, keep=None):
+    """Write the country's xlsx; returns a handle that re-reads it on demand."""
+    checkpoint.to_frame(keep).to_excel(output_path(country), index=False)
+    return LazyFrame(read_output, country)
+
+
+def redrive(args, cache, dead_letter):
+    """Re-classify every dead-lettered review into its file's checkpoint."""
+    entries = dead_letter.drain()
+    print(f"\n↪️ Re-driving {len(entries)} dead-lettered reviews")
+
+    by_file = {}
+    for entry in entries:
+        by_file.setdefault(entry["source_file"], []).append(entry)
+
+    for filename, items in by_file.items():
+        country = items[0]["country"]
+        checkpoint = Checkpoint(checkpoint_path(filename), resume=True, dtypes=RESULT_DTYPES)
+
+        pending = [
+            (e["key"], e["pos"], e["row"], e["message"])
+            for e in items
+            if not checkpoint.done(e["key"])
+        ]
+
+        with labelled(country=country):
+            classify_pending(pending, filename, country, checkpoint, dead_letter, args, cache)
+
+        checkpoint.close()
+        write_output(country, checkpoint)
+
+        print(f"✅ {country} re-driven")
+
+    dead_letter.done_draining()
+
+
+def build_backend(args):
+    if args.endpoints:
+        from router import RoutedBackend
+        backend = RoutedBackend.from_config(args.endpoints, seed=args.fake_seed)
+    elif args.backend == "fake":
+        backend = FakeBackend(
+            latency_ms=args.fake_latency_ms,
+            latency_sigma=args.fake_latency_sigma,
+            error_rate=args.fake_error_rate,
+            rate_limit_rate=args.fake_429_rate,
+            hang_rate=args.fake_hang_rate,
+            seed=args.fake_seed,
+        )
+    elif args.backend == "openai":
+        backend = InstructorBackend(MODEL_ID, base_url=args.base_url, api_key=api_key)
+    else:
+        backend = InstructorBackend(MODEL_ID)
+
+    # every call gets a deadline; hedging on top when asked
+    return HedgedBackend(backend, deadline=args.deadline, hedge=args.hedge, budget=args.hedge_budget / 100)
+
+
+def use_fields(fields, cache):
+    """Switch the active field profile; the cache follows its namespace."""
+    active = set_fields(fields)
+    if cache is not None:
+        cache.namespace = active.namespace
+    return active
+
+
+def prepare(args, active, shared=False):
+    """Backend, local model, cache and dead-letter queue for a run; returns (cache, dead_letter).
+
+    shared: the cache file is used from several hosts (rollback journal instead of WAL).
+    """
+    set_backend(build_backend(args))
+    set_repair(not args.no_repair)
+
+    args.local = None
+    if args.local_model:
+        from local_model import LocalClassifier
+        args.local = LocalClassifier.load(args.local_model)
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    cache = None
+    if not args.no_cache:
+        cache = ClassificationCache(
+            args.cache,
+            active.namespace,
+            max_entries=args.cache_max_entries,
+            max_age_days=args.cache_max_age_days,
+            shared=shared,
+        )
+        cache.evict()
 
-    df = pd.read_excel(file)
+    return cache, DeadLetterQueue(args.dead_letter)
 
-    rows = []
 
-    for _, row in df.iterrows():
+def pending_rows(df, checkpoint, fields, new_rows=None, offset=0, seen=None):
+    """Rows still needing labels, grouped by the fields they miss.
+
+    Returns {missing fields: [(key, pos, row, message)]}; offset shifts the
+    positions of a chunk that starts part-way into its file and seen, when
+    given, collects the key of every classifiable row.
+    """
+    pending = {}
+
+    for i, (_, row) in enumerate(df.iterrows()):
 
         message = str(row.get("message") or row.get("Message")).strip()
 
         if not message or message.lower() == "nan":
             continue
 
-        ai = classify_ticket(message)
+        pos = offset + i
+        key = row_key(row, pos)
+        if seen is not None:
+            seen.add(key)
+        if new_rows is not None and not new_rows[i]:
+            continue
+        missing = missing_fields(checkpoint.record(key), fields) if checkpoint.done(key) else fields
+        if not missing:
+            continue
+
+        pending.setdefault(tuple(missing), []).append((key, pos, row, message))
+
+    return pending
+
+
+def complete_fields(checkpoint, keys, fields):
+    """The fields none of keys is missing in the checkpoint: all a manifest may vouch for."""
+    gaps = set()
+    for key in keys:
+        gaps.update(missing_fields(checkpoint.record(key), fields) if checkpoint.done(key) else fields)
+    return [f for f in fields if f not in gaps]
+
+
+def classify_groups(pending, fields, filename, country, checkpoint, dead_letter, args, cache):
+    """classify_pending for each missing-fields group of pending_rows()."""
+    for missing, group in pending.items():
+        if len(missing) < len(fields):
+            print(f"🧩 Filling {len(group)} rows missing: {', '.join(missing)}")
+        use_fields(missing, cache)
+        with labelled(country=country):
+            classify_pending(group, filename, country, checkpoint, dead_letter, args, cache)
+
+
+def finish(cache, dead_letter, metrics_dir):
+    """Close the cache and print the run's cache, metrics and dead-letter summary."""
+    if cache is not None:
+        print(f"🗄️ Cache: {cache.hits} hits, {cache.misses} misses")
+        cache.close()
+
+    json_path, _ = METRICS.write(metrics_dir)
+    totals = METRICS.summary()["totals"]
+    if totals["calls"]:
+        print(
+            f"📈 Metrics: p50 {totals['latency_p50_s']}s, p95 {totals['latency_p95_s']}s, "
+            f"{totals['prompt_tokens_per_review']} in / {totals['completion_tokens_per_review']} out tokens per review, "
+            f"{totals['retries_per_success']} retries per success → {json_path}"
+        )
+    hedging = totals["hedging"]
+    if hedging["hedges"] or hedging["deadline_exceeded"]:
+        print(
+            f"⏱️ {hedging['hedges']} hedged calls (hedge won {hedging['hedge_win_rate']}), "
+            f"{hedging['deadline_exceeded']} calls past the deadline"
+        )
+
+    if hasattr(backend, "print_report"):
+        backend.print_report()
+
+    failed = len(dead_letter.load())
+    if failed:
+        print(f"\n☠️ {failed} reviews in {dead_letter.path}; re-run with --redrive")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        fields = parse_fields(args.fields) if args.fields else list(RESULT_COLUMNS)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+    active = set_fields(fields)
+
+    if args.prompt_report:
+        print(active.prompt)
+        print_token_report(token_report(
+            prompt_sections(TrustpilotReviewInsights, PROMPT_PREAMBLE, PROMPT_RULES, active.fields),
+            active.model.model_json_schema(),
+        ))
+        return
+
+    cache, dead_letter = prepare(args, active)
+
+    if args.redrive:
+        redrive(args, cache, dead_letter)
+        inputs = []
+    else:
+        inputs = iter_inputs(args.input_format)
+
+    d2_llm = {}
+
+    metrics_dir = args.metrics_dir or output_folder
+    manifest = Manifest(os.path.join(output_folder, MANIFEST_NAME))
+
+    for filename, country, path, load in inputs:
+
+        started = time.perf_counter()
 
-        if ai is None:
-            print("Skipped:", message[:40])
+        # 🧾 UNCHANGED INPUTS ARE SKIPPED, CHANGED ONES ONLY SEND APPENDED ROWS
+        status, entry = (None, None) if args.full else manifest.check(filename, path)
+        stored = os.path.exists(checkpoint_path(filename)) and os.path.exists(output_path(country))
+        same_fields = entry is not None and set(fields) <= set(entry.get("fields", []))
+
+        if stored and status == UNCHANGED and same_fields:
+            print(f"⏭️ {filename} unchanged since last run")
             continue
 
-        rows.append({
-            "country": country,
-            "platform": row.get("platform") or row.get("Media Type"),
-            "title": row.get("title") or row.get("Title"),
-            "message": message,
-            "link": row.get("link") or row.get("Link"),
-            "created_date": row.get("created_date") or row.get("Publish Date"),
-            "language": row.get("language") or row.get("Language"),
-            "username": row.get("username") or row.get("User Name"),
-            "gender": row.get("gender") or row.get("Gender"),
-            "user_rating": row.get("user_rating") or row.get("Star Rating"),
-
-            "sentiment": ai.sentiment_label.value,   # 🔴 UPDATED NAME
-            "sentiment_score": ai.sentiment_score,
-            "emotion": ai.primary_emotion.value,
-            "primary_mention": ai.primary_mention.value,
-            "journey_stage": ai.journey_stage.value,
-            "issue_type": ai.primary_issue_type.value,
-            "resolution_status": ai.resolution_status.value,
-            "review_tone": ai.review_tone.value,
-            "value_for_money": ai.value_for_money.value,
-            "churn_risk": ai.churn_risk.value,
+        incremental = stored and entry is not None and not args.full
+        df = load()
+        new_rows = (
+            appended_mask(df, entry, "created_date", "message_id") if incremental and same_fields
+            else np.ones(len(df), dtype=bool)
+        )
+
+        resumed = args.resume or incremental
+        checkpoint = Checkpoint(checkpoint_path(filename), resume=resumed, dtypes=RESULT_DTYPES)
+
+        if incremental and same_fields:
+            print(f"➕ {int(new_rows.sum())} new rows since last run")
+
+        keys = set()
+        pending = pending_rows(df, checkpoint, fields, new_rows, seen=keys)
+
+        if args.resume:
+            todo = sum(len(group) for group in pending.values())
+            print(f"↩️ Resume: {len(checkpoint)} rows already classified, {todo} to go")
+
+        classify_groups(pending, fields, filename, country, checkpoint, dead_letter, args, cache)
+
+        checkpoint.close()
+
+        d2_llm[country] = write_output(country, checkpoint)
+
+        # the manifest only vouches for fields every row now holds: appended
+        # rows got this run's fields alone and failed rows got none
+        earlier = entry.get("fields", []) if resumed and entry is not None else []
+        complete = complete_fields(checkpoint, keys, list(dict.fromkeys([*fields, *earlier])))
+        manifest.record(filename, path, {
+            **watermark(df, "created_date", "message_id"),
+            "fields": sorted(complete),
         })
+        manifest.save()
+
+        METRICS.inc("rows_total", len(df), country=country)
+        METRICS.inc("file_seconds_total", time.perf_counter() - started, country=country)
+        METRICS.write(metrics_dir)
 
-    final_df = pd.DataFrame(rows)
+        print(f"✅ {country} Done")
 
-    d2_llm[country] = final_df
+    finish(cache, dead_letter, metrics_dir)
 
-    final_df.to_excel(f"{output_folder}\\{country}_trustpilot_llm.xlsx", index=False)
+    print("\n🎉 ALL FILES CLASSIFIED SUCCESSFULLY")
 
-    print(f"✅ {country} Done")
 
-print("\n🎉 ALL FILES CLASSIFIED SUCCESSFULLY")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
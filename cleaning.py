@@ -0,0 +1,268 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
+
+# =========================
+# 🌍 COUNTRY MAP
+# =========================
+country_map = {
+    "BEL": "Belgium",
+    "FRA": "France",
+    "GER": "Germany",
+    "ITA": "Italy",
+    "NLD": "Netherlands",
+    "PRT": "Portugal",
+    "UGA": "Uganda",
+    "GBR": "UK"
+}
+
+# =========================
+# 🌐 LANGUAGE MAP
+# =========================
+language_map = {
+    'Albanian':'albanian','English':'english',None:None,'Afrikaans':'afrikaans',
+    'Català - Catalan (beta)':'catalan','Deutsch - German':'german',
+    'Français - French':'french','বাংলা - Bengali':'bengali',
+    'Dansk - Danish':'danish','Hmong':'hmong','Gaeilge - Irish (beta)':'irish',
+    'Hausa':'hausa','Esperanto':'esperanto','Estonian':'estonian',
+    'Čeština - Czech':'czech','Belarusian':'belarusian',
+    'Azerbaijani':'azerbaijani','Bosnian':'bosnian',
+    'Haitian Creole':'haitiancreole','Bulgarian':'bulgarian',
+    'Galego - Galician (beta)':'galician','Nepali':'nepali',
+    'Português - Portuguese':'portuguese','nan':None,
+    'Italiano - Italian':'italian','Euskara - Basque (beta)':'basque',
+    'Tagalog':'tagalog','Croatian':'croatian',
+    'Bahasa Indonesia - Indonesian':'indonesian',
+    'Nyanja':'nyanja','Igbo':'igbo','العربية - Arabic':'arabic',
+    'Español - Spanish':'spanish','Nederlands - Dutch':'dutch',
+    'Corsican':'corsican','Türkçe - Turkish':'turkish',
+    'Sindhi':'sindhi','Polski - Polish':'polish',
+    'Maltese':'maltese','Latin':'latin','Welsh':'welsh',
+    'Cebuano':'cebuano','Română - Romanian':'romanian',
+    'Kazakh':'kazakh','Hawaiian':'hawaiian',
+    'Swahili':'swahili','Suomi - Finnish':'finnish',
+    'Русский - Russian':'russian','Macedonian':'macedonian',
+    'Luxembourgish':'luxembourgish',
+    'Magyar - Hungarian':'hungarian',
+    'Norsk - Norwegian':'norwegian',
+    'Yoruba':'yoruba','Somali':'somali',
+    'Latvian':'latvian','Lithuanian':'lithuanian',
+    'हिन्दी - Hindi':'hindi',
+    'Українська мова - Ukrainian':'ukrainian',
+    'Icelandic':'icelandic',
+    'Svenska - Swedish':'swedish'
+}
+
+# =========================
+# 😀 EMOJI PATTERN
+# =========================
+emoji_pattern = re.compile(
+    "[\U0001F600-\U0001F64F"
+    "\U0001F300-\U0001F5FF"
+    "\U0001F680-\U0001F6FF"
+    "\U0001F1E0-\U0001F1FF"
+    "\U00002700-\U000027BF"
+    "\U0001F900-\U0001F9FF"
+    "\U0001FA00-\U0001FAFF]+",
+    flags=re.UNICODE
+)
+
+# =========================
+# 🔍 PLATFORM FUNCTION
+# =========================
+def get_platform(media_type: str):
+    if not isinstance(media_type, str):
+        return "unknown"
+
+    m = media_type.strip().lower()
+
+    if "twitter" in m:
+        return "X"
+    elif "facebook" in m:
+        return "facebook"
+    elif "linkedin" in m:
+        return "linkedin"
+    elif "tiktok" in m:
+        return "tiktok"
+    elif "instagram" in m:
+        return "instagram"
+    elif "trustpilot" in m:
+        return "trustpilot"
+    else:
+        return "other"
+
+# =========================
+# 🔤 SAFE CONCAT
+# =========================
+def safe_concat(*args):
+    return " ".join([str(a).strip() for a in args if pd.notna(a) and str(a).strip() != ""])
+
+# =========================
+# ⚡ VECTORIZED HELPERS
+# =========================
+def map_unique(series: pd.Series, func):
+    """Apply func once per distinct value (factorize + lookup) instead of per row.
+
+    Every missing value is mapped through func(np.nan).
+    """
+    codes, uniques = pd.factorize(series)
+    lookup = np.empty(len(uniques) + 1, dtype=object)
+    lookup[:len(uniques)] = [func(u) for u in uniques]
+    lookup[-1] = func(np.nan)
+    return pd.Series(lookup[codes], index=series.index, name=series.name)
+
+
+def _strip_lower(series: pd.Series):
+    """str.strip().lower() for string cells, NaN for everything else."""
+    if not (is_object_dtype(series) or is_string_dtype(series)):
+        return pd.Series(np.nan, index=series.index, dtype=object)
+    return series.str.strip().str.lower()
+
+
+def country_from_filename(filename: str):
+    raw = os.path.splitext(filename)[0].split("(")[0].strip()
+
+    if len(raw) == 3:
+        return country_map.get(raw.upper(), raw)
+    return raw.title()
+
+
+def fix_linkedin_messages(df: pd.DataFrame):
+    """LinkedIn '(no comment)' posts carry their text in Description."""
+    desc = df['Description']
+
+    mask = (
+        _strip_lower(df['Media Type']).eq('linkedin mentions')
+        & _strip_lower(df['Message']).eq('(no comment)')
+        & desc.notna()
+        & desc.astype(str).str.strip().ne("")
+    )
+
+    return df['Message'].mask(mask, desc)
+
+
+def concat_text(*columns: pd.Series):
+    """Column-wise safe_concat: join the non-blank stripped values with a space."""
+    out = pd.Series("", index=columns[0].index, dtype=object)
+
+    for col in columns:
+        part = col.astype(str).str.strip()
+        part = part.where(col.notna() & part.ne(""), "")
+        sep = np.where(out.eq("") | part.eq(""), "", " ")
+        out = out + sep + part
+
+    return out
+
+
+def standardize_language(series: pd.Series):
+    lang = series.astype(str).str.strip()
+    lang = lang.replace("nan", None)
+    lang = lang.map(language_map).fillna(lang)
+    return map_unique(lang, lambda x: x.title() if isinstance(x, str) else x).where(lang.notna(), lang)
+
+# =========================
+# 🧹 SHARED CLEANING STEPS
+# =========================
+def clean_frame(df: pd.DataFrame, country: str, with_text: bool = False):
+    """Every cleaning step both scripts share, in their original order.
+
+    with_text adds the concatenated Message/Description/Title 'text' column.
+    """
+    for col in ['Title','Message','Description','Media Type']:
+        if col not in df.columns:
+            df[col] = ""
+
+    # 🔁 LINKEDIN FIX
+    df['Message'] = fix_linkedin_messages(df)
+
+    # 📝 TEXT
+    if with_text:
+        df['text'] = concat_text(df['Message'], df['Description'], df['Title'])
+
+    # 📅 DATE
+    df['Publish Date'] = pd.to_datetime(df['Publish Date'], dayfirst=True, errors='coerce')
+
+    # ❌ DUPLICATES
+    df = df.drop_duplicates('Message Id', keep='last')
+
+    # ❌ NULL MESSAGE
+    df = df[df.Message.notna()].copy()
+
+    # 🌐 LANGUAGE STANDARDIZATION
+    df['Language'] = standardize_language(df['Language'])
+
+    # 📏 LENGTH + EMOJI
+    msg = df['Message'].astype(str)
+    df['msg_length'] = msg.str.len()
+    df['has_emoji'] = msg.str.contains(emoji_pattern, regex=True)
+    df = df[~((df.msg_length == 1) & (df.has_emoji == False))].copy()
+
+    # 🟣 PLATFORM
+    df['platform'] = map_unique(df['Media Type'], get_platform)
+
+    # 🌍 INSERT COUNTRY
+    df.insert(0,'country',country)
+
+    return df
+
+# =========================
+# 🚀 FILE RUNNER (SEQUENTIAL / PROCESS POOL)
+# =========================
+def group_files_by_country(files):
+    """Sorted files grouped by country, so BEL(1)/BEL(2) clean together
+    into one deterministic output instead of overwriting each other."""
+    groups = {}
+    for file in sorted(files):
+        groups.setdefault(country_from_filename(os.path.basename(file)), []).append(file)
+    return groups
+
+
+def _timed_job(func, country, files):
+    start = time.perf_counter()
+    try:
+        result = func(country, files)
+        return country, files, time.perf_counter() - start, result, None
+    except Exception as exc:
+        return country, files, time.perf_counter() - start, None, f"{type(exc).__name__}: {exc}"
+
+
+def run_clean_jobs(func, files, workers=1):
+    """Run func(country, files) per country group.
+
+    workers > 1 uses a process pool (func must be a module-level function or
+    a functools.partial of one). A failing group is reported, not raised.
+    Returns (country, files, seconds, result, error) tuples sorted by country.
+    """
+    groups = group_files_by_country(files)
+    results = []
+
+    if workers <= 1:
+        for country, country_files in groups.items():
+            print(f"\nProcessing: {', '.join(country_files)}")
+            results.append(_timed_job(func, country, country_files))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_timed_job, func, c, fs) for c, fs in groups.items()]
+            for future in as_completed(futures):
+                country, country_files, seconds, _, error = result = future.result()
+                print(f"{'❌' if error else '✅'} {country} finished in {seconds:.1f}s")
+                results.append(result)
+
+    return sorted(results, key=lambda r: r[0])
+
+
+def print_summary(results):
+    print("\n⏱️ Summary")
+    for country, files, seconds, _, error in results:
+        names = ", ".join(os.path.basename(f) for f in files)
+        status = f"❌ {error}" if error else "✅"
+        print(f"  {country:<15} {seconds:7.1f}s  {status}  [{names}]")
+
+    failed = [r for r in results if r[4]]
+    if failed:
+        print(f"\n⚠️ {len(failed)} of {len(results)} countries failed")
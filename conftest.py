@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+import classificationSocial as classifier
+from paths import FOLDERS, PATHS
+
+FAKE = ["--backend", "fake", "--fake-latency-ms", "0", "--mode", "async", "--no-cache", "--no-repair"]
+
+
+def make_messages(n, country="Belgium", start=0):
+    """n message-only rows with increasing dates and ids, long enough to reach the model."""
+    return pd.DataFrame({
+        "country": country,
+        "platform": "Trustpilot",
+        "message_id": [str(1000 + i) for i in range(start, start + n)],
+        "title": "review",
+        "message": [f"Review {i}: my bundle ran out early and support never called back" for i in range(start, start + n)],
+        "link": None,
+        "created_date": pd.date_range("2026-01-01", periods=start + n, freq="h")[start:],
+        "language": "en",
+        "username": "someone",
+        "gender": None,
+        "user_rating": 2.0,
+    })
+
+
+@pytest.fixture
+def data_root(tmp_path):
+    """Classifier folders under tmp_path; the default layout is restored afterwards."""
+    paths = {"data_root": str(tmp_path), **{name: str(tmp_path / folder) for name, folder in FOLDERS.items()}}
+    classifier.use_paths(paths)
+    yield paths
+    classifier.use_paths(PATHS)
@@ -0,0 +1,126 @@
+from enum import Enum
+from functools import lru_cache
+
+from prompt_builder import prompt_sections, reduced_model
+
+# =========================
+# ⚖️ CROSS-FIELD CONSISTENCY
+# =========================
+# Rules the prompt asks for but the schema cannot express. check() runs on
+# every answer; a broken rule names the fields to re-ask, and
+# repair_request() builds a short prompt with a response model holding just
+# those fields, instead of re-sending the whole classification.
+#
+# A rule is (name, fields it reads, fields to repair, text, test); test gets
+# the answer's values and returns True when they agree. Rules whose fields
+# were not asked for (--fields) are skipped, unless a --resume fill-in run
+# merges the answer into a stored row that holds them: then the rules are
+# checked against the merged row and only the fields asked for now are
+# repaired.
+
+NEUTRAL_SCORE = 0.4  # |score| < 0.4 is weak / neutral (see sentiment_score)
+
+
+def _score_matches_label(v):
+    score, label = v["sentiment_score"], v["sentiment_label"]
+    if label == "positive":
+        return score > 0
+    if label == "negative":
+        return score < 0
+    return abs(score) < NEUTRAL_SCORE
+
+
+RULES = [
+    (
+        "score_sign",
+        ("sentiment_label", "sentiment_score"), ("sentiment_score",),
+        "sentiment_score must be > 0 for positive, < 0 for negative and within -0.4..0.4 for neutral.",
+        _score_matches_label,
+    ),
+    (
+        "praise_resolution",
+        ("primary_issue_type", "resolution_status"), ("resolution_status",),
+        "primary_issue_type=no_issue_pure_praise means resolution_status=not_applicable.",
+        lambda v: v["primary_issue_type"] != "no_issue_pure_praise" or v["resolution_status"] == "not_applicable",
+    ),
+    (
+        "praise_polarity",
+        ("primary_issue_type", "sentiment_label"), ("primary_issue_type", "sentiment_label"),
+        "no_issue_pure_praise is only for reviews that are not negative.",
+        lambda v: v["primary_issue_type"] != "no_issue_pure_praise" or v["sentiment_label"] != "negative",
+    ),
+    (
+        "compliment_polarity",
+        ("review_tone", "sentiment_label"), ("review_tone", "sentiment_label"),
+        "review_tone=compliment is only for reviews that are not negative.",
+        lambda v: v["review_tone"] != "compliment" or v["sentiment_label"] != "negative",
+    ),
+    (
+        "praise_churn",
+        ("primary_issue_type", "churn_risk"), ("churn_risk",),
+        "no_issue_pure_praise cannot have churn_risk=high.",
+        lambda v: v["primary_issue_type"] != "no_issue_pure_praise" or v["churn_risk"] != "high",
+    ),
+]
+
+REPAIR_PREAMBLE = """
+A classification of the review below breaks a consistency rule. Re-judge
+only the fields listed here from the review text and return them.
+"""
+
+
+def values(ai):
+    return {k: v.value if isinstance(v, Enum) else v for k, v in ai}
+
+
+def check(ai, stored=None):
+    """[(rule name, text, fields to repair)] for every rule ai breaks.
+
+    stored holds the values of an earlier run that ai is merged into; only
+    rules reading both a stored field and one of ai's are checked then (the
+    rest ran when ai was answered), and only ai's fields are repaired.
+    """
+    v = values(ai)
+    if stored is None:
+        return [
+            (name, text, repair)
+            for name, reads, repair, text, test in RULES
+            if all(f in v for f in reads) and not test(v)
+        ]
+
+    merged = {**{k: x for k, x in stored.items() if x is not None}, **v}
+    return [
+        (name, text, tuple(f for f in repair if f in v) or tuple(f for f in reads if f in v))
+        for name, reads, repair, text, test in RULES
+        if all(f in merged for f in reads)
+        and any(f in v for f in reads) and not all(f in v for f in reads)
+        and not test(merged)
+    ]
+
+
+@lru_cache(maxsize=None)
+def repair_model(model, fields):
+    return reduced_model(model, list(fields), "RepairInsights")
+
+
+def repair_request(model, ai, text, broken, stored=None):
+    """(messages, response model, fields) for a repair call; fields keep model order."""
+    wanted = {f for _, _, repair in broken for f in repair}
+    fields = tuple(f for f in model.model_fields if f in wanted)
+
+    # the broken rules name fields outside the repair set, so they are added
+    # here rather than through prompt_sections' rule filter
+    sections = prompt_sections(model, REPAIR_PREAMBLE, fields=fields)
+    rules = "Rules:\n" + "\n".join(f"- {rule}" for _, rule, _ in broken)
+    labels = {**{k: v for k, v in (stored or {}).items() if v is not None}, **values(ai)}
+    current = "\n".join(f"{k}={v}" for k, v in labels.items())
+
+    messages = [
+        {"role": "system", "content": "\n".join([*sections.values(), rules]) + "\n"},
+        {"role": "user", "content": f"[REVIEW]\n{text}\n\n[CURRENT LABELS]\n{current}"},
+    ]
+    return messages, repair_model(model, fields), fields
+
+
+def apply_repair(ai, repaired):
+    return ai.model_copy(update=dict(repaired))
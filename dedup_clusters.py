@@ -0,0 +1,138 @@
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+from cleaning import emoji_pattern
+
+# =========================
+# 🧬 NEAR-DUPLICATE CLUSTERING
+# =========================
+# Retweets, copy-pasted complaints and templated comments differ only by
+# @mentions, links, emojis or punctuation. They are grouped so that only one
+# representative per cluster is sent to the model.
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+", flags=re.IGNORECASE)
+MENTION_PATTERN = re.compile(r"@\w+")
+RETWEET_PATTERN = re.compile(r"^\s*rt\b:?", flags=re.IGNORECASE)
+PUNCT_PATTERN = re.compile(r"[^\w\s]")
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_for_dedup(text: str):
+    text = str(text).lower()
+    text = RETWEET_PATTERN.sub(" ", text)
+    text = URL_PATTERN.sub(" ", text)
+    text = MENTION_PATTERN.sub(" ", text)
+    text = emoji_pattern.sub(" ", text)
+    text = PUNCT_PATTERN.sub(" ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def shingles(text: str, k=5):
+    if len(text) <= k:
+        return {text}
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+class MinHasher:
+
+    def __init__(self, num_perm=128, seed=7):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, MERSENNE_PRIME, num_perm).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, num_perm).astype(np.uint64)
+
+    def signature(self, text: str):
+        hv = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+        return ((np.outer(hv, self.a) + self.b) % MERSENNE_PRIME).min(axis=0)
+
+
+def lsh_bands(num_perm, threshold):
+    """(bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        gap = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or gap < best[0]:
+            best = (gap, bands, rows)
+    return best[1], best[2]
+
+
+class _UnionFind:
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def cluster_messages(texts, method="minhash", threshold=0.85, num_perm=128):
+    """Group near-identical messages.
+
+    method 'exact' merges only identical normalized texts; 'minhash' also
+    merges texts whose estimated Jaccard similarity (char 5-gram shingles)
+    is at least threshold. Returns (cluster_ids, clusters): a stable cluster
+    id per text, and {representative index: member indices} where the
+    representative is the cluster's first member.
+    """
+    n = len(texts)
+    uf = _UnionFind(n)
+    norm = [normalize_for_dedup(t) for t in texts]
+
+    # exact stage: identical normalized text (emoji-only texts keep their raw form)
+    first_seen = {}
+    for i, t in enumerate(norm):
+        key = t or "\x00" + str(texts[i]).strip()
+        if key in first_seen:
+            uf.union(first_seen[key], i)
+        else:
+            first_seen[key] = i
+
+    if method == "minhash":
+        hasher = MinHasher(num_perm)
+        bands, rows = lsh_bands(num_perm, threshold)
+
+        candidates = sorted(i for i in first_seen.values() if norm[i])
+        sigs = {i: hasher.signature(norm[i]) for i in candidates}
+
+        for band in range(bands):
+            buckets = {}
+            for i in candidates:
+                buckets.setdefault(sigs[i][band * rows:(band + 1) * rows].tobytes(), []).append(i)
+
+            for members in buckets.values():
+                head = members[0]
+                for other in members[1:]:
+                    if uf.find(head) != uf.find(other) and np.mean(sigs[head] == sigs[other]) >= threshold:
+                        uf.union(head, other)
+
+    roots = [uf.find(i) for i in range(n)]
+    cluster_ids = [
+        hashlib.sha1((norm[r] or str(texts[r]).strip()).encode("utf-8")).hexdigest()[:12]
+        for r in roots
+    ]
+    clusters = {}
+    for i, r in enumerate(roots):
+        clusters.setdefault(r, []).append(i)
+
+    return cluster_ids, clusters
+
+
+def dedup_report(n_messages, n_representatives):
+    saved = n_messages - n_representatives
+    pct = 100 * saved / n_messages if n_messages else 0.0
+    return f"🧬 Dedup: {n_messages} messages → {n_representatives} clusters, {saved} API calls saved ({pct:.1f}%)"
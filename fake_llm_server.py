@@ -0,0 +1,126 @@
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backends import FakeLLM, RateLimitError, count_reviews, fake_from_schema
+
+# =========================
+# 🧪 FAKE OPENAI-COMPATIBLE SERVER
+# =========================
+# POST /v1/chat/completions answers with schema-valid JSON built from the
+# request's tool / response_format schema, after a simulated latency, with
+# injected 5xx and 429s. Point the classifier at it with
+#   --backend openai --base-url http://127.0.0.1:8000/v1
+
+
+def request_schema(body):
+    for tool in body.get("tools") or []:
+        return tool["function"]["name"], tool["function"].get("parameters", {})
+
+    fmt = body.get("response_format") or {}
+    if fmt.get("type") == "json_schema":
+        spec = fmt["json_schema"]
+        return spec.get("name", "response"), spec.get("schema", {})
+
+    return None, {"type": "object", "properties": {}}
+
+
+def completion_body(body, name, data, messages):
+    content = json.dumps(data)
+    message = {"role": "assistant", "content": None if name and body.get("tools") else content}
+
+    if name and body.get("tools"):
+        message["tool_calls"] = [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": name, "arguments": content},
+        }]
+
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    completion_tokens = len(content) // 4
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def make_handler(fake: FakeLLM):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, headers=None):
+            raw = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            messages = body.get("messages", [])
+
+            delay, error, answer_rng = fake.plan(messages)
+            time.sleep(delay)
+
+            if error is not None:
+                kind = "rate_limit_exceeded" if isinstance(error, RateLimitError) else "server_error"
+                self._send(error.status_code, {"error": {"message": str(error), "type": kind}},
+                           error.response.headers)
+                return
+
+            name, schema = request_schema(body)
+            data = fake_from_schema(schema, answer_rng, count_reviews(messages))
+            self._send(200, completion_body(body, name, data, messages))
+
+    return Handler
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stand-in for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-dist", choices=["fixed", "exponential", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds advertised on 429s")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of calls that never answer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fake = FakeLLM(
+        latency_ms=args.latency_ms, latency_dist=args.latency_dist, latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, hang_rate=args.hang_rate, seed=args.seed,
+    )
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake))
+    print(f"🧪 Fake LLM listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
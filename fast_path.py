@@ -0,0 +1,113 @@
+import re
+
+from cleaning import emoji_pattern
+
+# =========================
+# ⚡ RULE-BASED FAST PATH
+# =========================
+# Emoji-only replies, "thanks", single-word tags and bare links carry no
+# topic, journey stage or issue, so they are labelled locally instead of
+# paying a full SYSTEM_PROMPT round trip. A tag that carries a verdict
+# ("#scam", "#worstservice") is not a bare tag and goes to the model.
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+", flags=re.IGNORECASE)
+MENTION_PATTERN = re.compile(r"[@#]\w+")
+TAG_PATTERN = re.compile(r"#(\w+)")
+EXTRA_EMOJI_PATTERN = re.compile("[\u2600-\u26FF\u2B00-\u2BFF\uFE0F\u200D\u20E3]")
+WORD_PATTERN = re.compile(r"\w+")
+
+POSITIVE_EMOJI = set("👍👌👏🙏😀😃😄😁😊🙂😍🥰😘🤩😎😂🤗❤♥💯🎉✅💙💚💛💜🧡⭐🌟")
+NEGATIVE_EMOJI = set("👎😡😠🤬😞😢😭💔😤🙄😒☹🙁😩😫🤮❌😔😟")
+
+POSITIVE_WORDS = {
+    "thanks", "thank", "thx", "ty", "cheers", "merci", "danke", "gracias",
+    "grazie", "obrigado", "obrigada", "bedankt", "dank", "tak",
+    "great", "super", "perfect", "awesome", "excellent", "amazing", "nice",
+    "good", "love", "brilliant", "fantastic", "top", "bravo", "best",
+}
+NEGATIVE_WORDS = {
+    "scam", "scammers", "worst", "terrible", "useless", "awful", "rubbish",
+    "shame", "disgusting", "fraud", "horrible", "pathetic", "joke", "thieves",
+}
+FILLER_WORDS = {
+    "you", "so", "much", "very", "a", "lot", "lyca", "lycamobile", "team",
+    "guys", "again", "for", "it", "je", "wel", "beaucoup", "vielen", "mille",
+    "service", "the", "is", "really",
+}
+
+LEXICON = POSITIVE_WORDS | NEGATIVE_WORDS
+
+MAX_TRIVIAL_WORDS = 5
+
+
+def _verdict(sentiment, score, emotion):
+    """Full TrustpilotReviewInsights field values for a trivial message."""
+    return {
+        "sentiment_label": sentiment,
+        "sentiment_score": score,
+        "primary_emotion": emotion,
+        "primary_mention": "other",
+        "journey_stage": "other",
+        "primary_issue_type": "no_issue_pure_praise" if sentiment == "positive" else "other",
+        "resolution_status": "not_applicable",
+        "review_tone": {"positive": "compliment", "negative": "complaint"}.get(sentiment, "other"),
+        "value_for_money": "not_applicable",
+        "churn_risk": "low" if sentiment == "positive" else "not_applicable",
+    }
+
+
+POSITIVE = _verdict("positive", 0.6, "gratitude")
+POSITIVE_EMOJI_ONLY = _verdict("positive", 0.5, "joy")
+NEGATIVE = _verdict("negative", -0.6, "frustration")
+NEUTRAL = _verdict("neutral", 0.0, "neutral")
+
+
+def strip_emoji(text: str):
+    return EXTRA_EMOJI_PATTERN.sub("", emoji_pattern.sub("", text))
+
+
+def tag_has_verdict(text: str):
+    """True if a #tag holds a lexicon word, joined or not (#scam, #worstservice)."""
+    return any(word in tag.lower() for tag in TAG_PATTERN.findall(text) for word in LEXICON)
+
+
+def rule_classify(text: str):
+    """Field values for a trivially decidable message, or None for the LLM."""
+    text = str(text).strip()
+
+    if tag_has_verdict(URL_PATTERN.sub(" ", text)):
+        return None
+
+    rest = MENTION_PATTERN.sub(" ", URL_PATTERN.sub(" ", text))
+    emojis = [ch for ch in rest if ch not in strip_emoji(ch)]
+    words = [w.lower() for w in WORD_PATTERN.findall(strip_emoji(rest))]
+
+    # 🔗 bare links, @mentions and #tags only
+    if not words and not emojis:
+        return NEUTRAL
+
+    # 😀 emoji-only
+    if not words:
+        pos = sum(ch in POSITIVE_EMOJI for ch in emojis)
+        neg = sum(ch in NEGATIVE_EMOJI for ch in emojis)
+        if pos > neg:
+            return POSITIVE_EMOJI_ONLY
+        if neg > pos:
+            return NEGATIVE
+        return NEUTRAL
+
+    if len(words) > MAX_TRIVIAL_WORDS:
+        return None
+
+    # 🙏 "thanks", "great service 👍", "scam"
+    lexical = [w for w in words if w not in FILLER_WORDS]
+    if lexical and all(w in POSITIVE_WORDS for w in lexical) and not any(ch in NEGATIVE_EMOJI for ch in emojis):
+        return POSITIVE
+    if lexical and all(w in NEGATIVE_WORDS for w in lexical) and not any(ch in POSITIVE_EMOJI for ch in emojis):
+        return NEGATIVE
+
+    # 🏷️ single filler word / tag, e.g. "lyca"
+    if not lexical and not emojis:
+        return NEUTRAL
+
+    return None
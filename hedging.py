@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+from metrics import METRICS
+
+# =========================
+# ⏱️ DEADLINES + HEDGED CALLS
+# =========================
+# Wraps any backend (single provider, fake, router). Every call gets a
+# deadline: the SDK is given it as its timeout and the caller stops waiting
+# when it passes, so one hung request can no longer stall the run.
+#
+# With hedging on, a call still running after the observed p95 latency of
+# its response model gets a duplicate and whichever answers first wins
+# (behind a router the duplicate usually lands on another endpoint). Hedges
+# are capped at budget x calls so a slow provider is not hit with twice the
+# traffic.
+
+SAMPLES = 500        # recent latencies kept per response model
+MIN_SAMPLES = 20     # no hedging before the p95 means something
+
+
+class DeadlineExceeded(TimeoutError):
+    """No answer within the call's deadline (a transport error for the retry policy)."""
+
+
+class HedgedBackend:
+
+    def __init__(self, inner, deadline=60.0, hedge=False, budget=0.05, quantile=0.95, min_samples=MIN_SAMPLES):
+        self.inner = inner
+        self.deadline = deadline
+        self.hedge = hedge
+        self.budget = budget
+        self.quantile = quantile
+        self.min_samples = min_samples
+
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.calls = 0
+        self.hedges = 0
+        self.pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-call")
+
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=_HedgedCompletions(self, False)))
+        self.async_client = SimpleNamespace(chat=SimpleNamespace(completions=_HedgedCompletions(self, True)))
+
+    def __getattr__(self, name):
+        # print_report() and friends of the wrapped backend
+        return getattr(self.inner, name)
+
+    # ---------- bookkeeping ----------
+
+    def hedge_after(self, key):
+        """Seconds before this call may be hedged, or None (off, too few samples, budget spent)."""
+        if not self.hedge:
+            return None
+        with self.lock:
+            self.calls += 1
+            samples = sorted(self.samples.get(key, ()))
+            if len(samples) < self.min_samples or self.hedges + 1 > self.budget * self.calls:
+                return None
+            return samples[min(int(self.quantile * len(samples)), len(samples) - 1)]
+
+    def hedged(self):
+        with self.lock:
+            self.hedges += 1
+        METRICS.inc("llm_hedges_total")
+
+    def finished(self, key, seconds, hedge_won):
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=SAMPLES)).append(seconds)
+        if hedge_won:
+            METRICS.inc("llm_hedge_wins_total")
+
+    def expired(self):
+        METRICS.inc("llm_deadline_exceeded_total")
+        return DeadlineExceeded(f"no answer within {self.deadline:g}s")
+
+
+class _HedgedCompletions:
+
+    def __init__(self, owner, is_async):
+        self.owner = owner
+        self.is_async = is_async
+
+    def _inner(self):
+        backend = self.owner.inner
+        return (backend.async_client if self.is_async else backend.client).chat.completions
+
+    def create_with_completion(self, **kwargs):
+        if self.is_async:
+            return self._acreate(**kwargs)
+
+        owner = self.owner
+        key = getattr(kwargs.get("response_model"), "__name__", "")
+        kwargs.setdefault("timeout", owner.deadline)
+        inner = self._inner()
+
+        start = time.perf_counter()
+        ends = start + owner.deadline
+        first = owner.pool.submit(inner.create_with_completion, **kwargs)
+        running = [first]
+        hedge_at = owner.hedge_after(key)
+        error = None
+
+        while running:
+            now = time.perf_counter()
+            if now >= ends:
+                break
+            wait_for = ends - now
+            if hedge_at is not None and len(running) == 1 and error is None:
+                wait_for = min(wait_for, max(start + hedge_at - now, 0))
+
+            done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if hedge_at is not None and len(running) == 1 and time.perf_counter() < ends:
+                    owner.hedged()
+                    running.append(owner.pool.submit(inner.create_with_completion, **kwargs))
+                    hedge_at = None
+                continue
+
+            for future in done:
+                running.remove(future)
+                if future.exception() is None:
+                    owner.finished(key, time.perf_counter() - start, future is not first)
+                    return future.result()
+                error = future.exception()
+
+        # calls still running here finish (or hit the SDK timeout) on their own
+        if error is not None and not running:
+            raise error
+        raise owner.expired()
+
+    async def _acreate(self, **kwargs):
+        owner = self.owner
+        key = getattr(kwargs.get("response_model"), "__name__", "")
+        kwargs.setdefault("timeout", owner.deadline)
+        inner = self._inner()
+
+        start = time.perf_counter()
+        ends = start + owner.deadline
+        first = asyncio.ensure_future(inner.create_with_completion(**kwargs))
+        running = {first}
+        hedge_at = owner.hedge_after(key)
+        error = None
+
+        try:
+            while running:
+                now = time.perf_counter()
+                if now >= ends:
+                    break
+                wait_for = ends - now
+                if hedge_at is not None and len(running) == 1 and error is None:
+                    wait_for = min(wait_for, max(start + hedge_at - now, 0))
+
+                done, running = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if hedge_at is not None and len(running) == 1 and time.perf_counter() < ends:
+                        owner.hedged()
+                        running.add(asyncio.ensure_future(inner.create_with_completion(**kwargs)))
+                        hedge_at = None
+                    continue
+
+                for task in done:
+                    if task.exception() is None:
+                        owner.finished(key, time.perf_counter() - start, task is not first)
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in running:
+                task.cancel()
+
+        if error is not None:
+            raise error
+        raise owner.expired()
+
+    def create(self, **kwargs):
+        if self.is_async:
+            async def first():
+                return (await self._acreate(**kwargs))[0]
+            return first()
+        return self.create_with_completion(**kwargs)[0]
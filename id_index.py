@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+# =========================
+# 🪪 CROSS-FILE / CROSS-RUN MESSAGE ID INDEX
+# =========================
+# drop_duplicates('Message Id') only sees one country's files in one run.
+# This on-disk set (a SQLite B-tree, so memory stays at one batch of ids)
+# remembers which country's output each Message Id went into: a mention that
+# shows up again in another country's exports is dropped instead of being
+# cleaned and classified twice.
+#
+# Ownership is first come, first served, so it must not depend on timing:
+# sequential runs claim inside each country's job in group order, and
+# parallel runs clean without the index and settle ownership afterwards in
+# the same order (claim_outputs), dropping the rows a country lost.
+
+INDEX_NAME = "message_ids.sqlite"
+BATCH = 900  # below SQLite's default bound-parameter limit
+
+
+def id_text(value):
+    """Stable text key: 123, 123.0 (int column with NaNs) and '123' all match."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value)
+    if text.endswith(".0") and text[:-2].isdigit():
+        return text[:-2]  # float id written out as text (Parquet message_id)
+    return text
+
+
+class MessageIdIndex:
+
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=120, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS message_ids (
+                   message_id TEXT PRIMARY KEY,
+                   owner TEXT NOT NULL,
+                   first_seen REAL NOT NULL
+               ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_message_ids_owner ON message_ids(owner)")
+
+    def release(self, owner):
+        """Forget owner's ids, before its output is rebuilt from scratch."""
+        self.conn.execute("DELETE FROM message_ids WHERE owner = ?", (owner,))
+
+    def claim(self, ids, owner):
+        """Claim unseen ids for owner; returns {id: owner} for all of ids.
+
+        Insert and lookup run in one write transaction, so two workers racing
+        for the same id agree on a single owner.
+        """
+        ids = list(dict.fromkeys(ids))
+        owners = {}
+        now = time.time()
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for start in range(0, len(ids), BATCH):
+                batch = ids[start:start + BATCH]
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO message_ids (message_id, owner, first_seen) VALUES (?, ?, ?)",
+                    [(i, owner, now) for i in batch],
+                )
+                marks = ",".join("?" * len(batch))
+                owners.update(self.conn.execute(
+                    f"SELECT message_id, owner FROM message_ids WHERE message_id IN ({marks})", batch,
+                ))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return owners
+
+    def drop_seen(self, df, owner, id_column="Message Id"):
+        """Rows of df whose id is new or already owner's; claims the new ones.
+
+        Rows without an id are always kept.
+        """
+        if df.empty or id_column not in df.columns:
+            return df, 0
+
+        ids = df[id_column]
+        present = ids.notna()
+        keys = ids[present].map(id_text)
+
+        owners = self.claim(keys.tolist(), owner)
+        foreign = keys.map(owners) != owner
+
+        keep = pd.Series(True, index=df.index)
+        keep[foreign[foreign].index] = False
+
+        return df[keep.to_numpy()], int((~keep).sum())
+
+    def close(self):
+        self.conn.close()
+
+
+def drop_seen_ids(df, owner, index_path, rebuild=False, id_column="Message Id"):
+    """One-shot drop_seen for a worker process; rebuild releases owner's old ids first."""
+    index = MessageIdIndex(index_path)
+    try:
+        if rebuild:
+            index.release(owner)
+        df, dropped = index.drop_seen(df, owner, id_column)
+    finally:
+        index.close()
+
+    if dropped:
+        print(f"🪪 {owner}: {dropped} rows already in another country's output")
+    return df
+
+
+def claim_outputs(index_path, outputs):
+    """Settle ownership of outputs cleaned in parallel, in a fixed order.
+
+    outputs: (owner, rebuilt, read_ids, drop) per country, in the order a
+    sequential run would have cleaned them. read_ids() returns the ids now
+    in the owner's output and drop(ids) removes those rows from it; rebuilt
+    owners give up their old ids at their turn, as drop_seen_ids(rebuild=True) does.
+    """
+    index = MessageIdIndex(index_path)
+    try:
+        for owner, rebuilt, read_ids, drop in outputs:
+            if rebuilt:
+                index.release(owner)
+            keys = [id_text(i) for i in read_ids() if not pd.isna(i)]
+            owners = index.claim(keys, owner)
+            foreign = {k for k in keys if owners[k] != owner}
+            if foreign:
+                drop(foreign)
+                print(f"🪪 {owner}: {len(foreign)} rows already in another country's output")
+    finally:
+        index.close()
@@ -0,0 +1,129 @@
+import os
+import shutil
+import uuid
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# =========================
+# 🧱 MESSAGE-ONLY SCHEMA
+# =========================
+# Hand-off between Trustpilot_cleaning.py and classificationSocial.py,
+# stored as Parquet partitioned by country/platform (hive style).
+MESSAGE_SCHEMA = pa.schema([
+    ("country", pa.string()),
+    ("platform", pa.string()),
+    ("message_id", pa.string()),
+    ("title", pa.string()),
+    ("message", pa.string()),
+    ("link", pa.string()),
+    ("created_date", pa.timestamp("ns")),
+    ("language", pa.string()),
+    ("username", pa.string()),
+    ("gender", pa.string()),
+    ("user_rating", pa.float64()),
+])
+
+PARTITION_COLUMNS = ["country", "platform"]
+
+PARTITIONING = ds.partitioning(
+    pa.schema([(c, MESSAGE_SCHEMA.field(c).type) for c in PARTITION_COLUMNS]),
+    flavor="hive",
+)
+
+
+def _as_string(series: pd.Series):
+    return series.where(series.isna(), series.astype(str)).astype(object)
+
+
+def coerce_messages(df: pd.DataFrame):
+    """Cast a message-only frame to MESSAGE_SCHEMA column by column."""
+    out = pd.DataFrame(index=df.index)
+
+    for field in MESSAGE_SCHEMA:
+        col = df[field.name] if field.name in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+        if pa.types.is_timestamp(field.type):
+            out[field.name] = pd.to_datetime(col, errors="coerce").astype("datetime64[ns]")
+        elif pa.types.is_floating(field.type):
+            out[field.name] = pd.to_numeric(col, errors="coerce").astype("float64")
+        else:
+            out[field.name] = _as_string(col)
+
+    out["platform"] = out["platform"].fillna("unknown")
+    return out
+
+
+def partition_path(root: str, country: str):
+    return os.path.join(root, f"country={quote(str(country), safe='')}")
+
+
+def drop_country(root: str, country: str):
+    shutil.rmtree(partition_path(root, country), ignore_errors=True)
+
+
+def write_messages(df: pd.DataFrame, root: str, append: bool = False):
+    """Write one country's messages.
+
+    By default the country's partitions are replaced; append=True adds new
+    part files next to the existing ones (used for streamed chunks).
+    """
+    table = pa.Table.from_pandas(coerce_messages(df), schema=MESSAGE_SCHEMA, preserve_index=False)
+
+    if not append:
+        for country in table.column("country").unique().to_pylist():
+            drop_country(root, country)
+
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=PARTITIONING,
+        existing_data_behavior="overwrite_or_ignore",
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+    )
+
+
+def list_countries(root: str):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        unquote(d.split("=", 1)[1])
+        for d in os.listdir(root)
+        if d.startswith("country=")
+    )
+
+
+def read_messages(root: str, columns=None, country=None):
+    """Read messages with column projection and an optional country filter."""
+    dataset = ds.dataset(root, format="parquet", schema=MESSAGE_SCHEMA, partitioning=PARTITIONING)
+
+    flt = ds.field("country") == country if country is not None else None
+    table = dataset.to_table(columns=columns, filter=flt)
+
+    return table.to_pandas()
+
+
+# =========================
+# 💤 LAZY FRAME HANDLE
+# =========================
+class LazyFrame:
+    """A country's output left on disk; load() reads it when it is needed.
+
+    The d2 / d2_message_only / d2_llm dicts hold these instead of whole
+    DataFrames, so memory does not grow with the number of countries.
+    """
+
+    def __init__(self, read, *args, **kwargs):
+        self.read = read
+        self.args = args
+        self.kwargs = kwargs
+
+    def load(self):
+        return self.read(*self.args, **self.kwargs)
+
+    def __repr__(self):
+        args = [repr(a) for a in self.args] + [f"{k}={v!r}" for k, v in self.kwargs.items()]
+        return f"LazyFrame({getattr(self.read, '__name__', self.read)}({', '.join(args)}))"
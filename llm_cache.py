@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+# =========================
+# 🗄️ LLM CLASSIFICATION CACHE
+# =========================
+# Content-addressed on-disk cache: key = sha256(namespace + normalized text).
+# The namespace hashes the prompt, model id and response schema, so editing
+# SYSTEM_PROMPT or any enum changes every key and old entries are never hit.
+#
+# Several processes may share one cache file (queue_worker.py): every
+# statement commits on its own, waits up to BUSY_TIMEOUT for a lock, and a
+# cache that still cannot be read or written only costs a miss. Workers on
+# several hosts open it with shared=True (rollback journal, like the queue).
+
+BUSY_TIMEOUT = 60
+
+
+def normalize_text(text: str):
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def build_namespace(system_prompt: str, model_id: str, response_model):
+    schema = json.dumps(response_model.model_json_schema(), sort_keys=True)
+    raw = "\x1f".join([system_prompt, model_id, schema])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+
+    def __init__(self, path, namespace, max_entries=500_000, max_age_days=90, shared=False):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.execute(f"PRAGMA journal_mode={'DELETE' if shared else 'WAL'}")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                   key TEXT PRIMARY KEY,
+                   namespace TEXT NOT NULL,
+                   payload TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   last_used REAL NOT NULL
+               )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache(last_used)")
+
+    def key(self, text: str):
+        raw = self.namespace + "\x1f" + normalize_text(text)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _failed(self, exc):
+        if not self.errors:
+            print(f"⚠️ LLM cache unavailable ({exc}); carrying on without it")
+        self.errors += 1
+
+    def get(self, text: str, response_model):
+        key = self.key(text)
+        try:
+            found = self.conn.execute("SELECT payload FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if found is not None:
+                self.conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            found = None
+
+        if found is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return response_model.model_validate_json(found[0])
+
+    def put(self, text: str, result):
+        now = time.time()
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, namespace, payload, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self.key(text), self.namespace, result.model_dump_json(), now, now),
+            )
+        except sqlite3.Error as exc:
+            self._failed(exc)
+
+    def commit(self):
+        """Statements commit as they run; kept for callers that batch puts."""
+
+    def evict(self):
+        """Drop entries older than max_age_days, then the least recently used
+        ones above max_entries. Stale namespaces age out the same way."""
+        cutoff = time.time() - self.max_age_days * 86400
+        try:
+            self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff,))
+            self.conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                       SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+        except sqlite3.Error as exc:
+            self._failed(exc)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import time
+from glob import glob
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+# =========================
+# 🧠 DISTILLED LOCAL CLASSIFIER
+# =========================
+# TF-IDF features + one linear head per TrustpilotReviewInsights enum field,
+# trained on the *_trustpilot_llm.xlsx rows the model already labelled.
+
+# output column -> TrustpilotReviewInsights field
+FIELD_COLUMNS = {
+    "sentiment": "sentiment_label",
+    "emotion": "primary_emotion",
+    "primary_mention": "primary_mention",
+    "journey_stage": "journey_stage",
+    "issue_type": "primary_issue_type",
+    "resolution_status": "resolution_status",
+    "review_tone": "review_tone",
+    "value_for_money": "value_for_money",
+    "churn_risk": "churn_risk",
+}
+
+
+def load_labels(pattern):
+    frames = [pd.read_excel(f) for f in sorted(glob(pattern))]
+    if not frames:
+        raise FileNotFoundError(f"no labelled files match {pattern}")
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df[df["message"].notna()]
+    if "classified_by" in df.columns:
+        df = df[df["classified_by"].fillna("llm").isin(["llm", "cache"])]
+    return df.drop_duplicates("message", keep="last").reset_index(drop=True)
+
+
+def pick_threshold(confidence, correct, target):
+    """Lowest confidence cut whose kept predictions agree with the LLM >= target."""
+    order = np.argsort(-confidence)
+    hits = np.cumsum(correct[order])
+    precision = hits / np.arange(1, len(order) + 1)
+
+    ok = np.where(precision >= target)[0]
+    if len(ok) == 0:
+        return 1.01
+    return float(confidence[order][ok[-1]])
+
+
+def consistent_score(label, score):
+    """Keep the regressed score's sign in line with the predicted label."""
+    if label == "positive":
+        return abs(score)
+    if label == "negative":
+        return -abs(score)
+    return float(np.clip(score, -0.39, 0.39))
+
+
+class LocalClassifier:
+
+    def __init__(self, thresholds=None):
+        self.vectorizer = TfidfVectorizer(
+            analyzer="char_wb", ngram_range=(2, 5), min_df=2,
+            sublinear_tf=True, max_features=200_000,
+        )
+        self.heads = {}
+        self.score_head = None
+        self.thresholds = thresholds or {}
+
+    def fit(self, texts, labels: pd.DataFrame, scores=None):
+        X = self.vectorizer.fit_transform(texts)
+
+        for column in FIELD_COLUMNS:
+            y = labels[column].astype(str).to_numpy()
+            if len(set(y)) == 1:
+                self.heads[column] = y[0]
+                continue
+            head = LogisticRegression(max_iter=2000, C=4.0)
+            head.fit(X, y)
+            self.heads[column] = head
+
+        if scores is not None:
+            self.score_head = Ridge(alpha=1.0).fit(X, np.asarray(scores, dtype=float))
+
+        return self
+
+    def predict_proba(self, texts):
+        """{column: (labels, confidence)} for every head."""
+        X = self.vectorizer.transform(texts)
+        out = {}
+
+        for column, head in self.heads.items():
+            if isinstance(head, str):
+                out[column] = (np.full(X.shape[0], head, dtype=object), np.ones(X.shape[0]))
+                continue
+            proba = head.predict_proba(X)
+            out[column] = (head.classes_[proba.argmax(axis=1)], proba.max(axis=1))
+
+        return out, X
+
+    def calibrate(self, texts, labels: pd.DataFrame, target=0.95):
+        preds, _ = self.predict_proba(texts)
+        for column, (pred, conf) in preds.items():
+            correct = (pred == labels[column].astype(str).to_numpy()).astype(float)
+            self.thresholds[column] = pick_threshold(conf, correct, target)
+        return self.thresholds
+
+    def route(self, texts):
+        """Field values for reviews every head is confident about, else None."""
+        if not texts:
+            return []
+
+        preds, X = self.predict_proba(texts)
+        scores = (
+            np.clip(self.score_head.predict(X), -1, 1)
+            if self.score_head is not None else np.zeros(len(texts))
+        )
+
+        confident = np.ones(len(texts), dtype=bool)
+        for column, (_, conf) in preds.items():
+            confident &= conf >= self.thresholds.get(column, 1.01)
+
+        results = []
+        for i in range(len(texts)):
+            if not confident[i]:
+                results.append(None)
+                continue
+            fields = {FIELD_COLUMNS[c]: str(preds[c][0][i]) for c in preds}
+            fields["sentiment_score"] = consistent_score(fields["sentiment_label"], float(scores[i]))
+            results.append(fields)
+
+        return results
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        joblib.dump({
+            "vectorizer": self.vectorizer,
+            "heads": self.heads,
+            "score_head": self.score_head,
+            "thresholds": self.thresholds,
+        }, path)
+
+    @staticmethod
+    def load(path):
+        state = joblib.load(path)
+        model = LocalClassifier(state["thresholds"])
+        model.vectorizer = state["vectorizer"]
+        model.heads = state["heads"]
+        model.score_head = state["score_head"]
+        return model
+
+# =========================
+# 📊 EVALUATION
+# =========================
+def evaluate(model, texts, labels: pd.DataFrame):
+    """Per-field agreement with the LLM, overall and on the routed subset."""
+    preds, _ = model.predict_proba(texts)
+    report = {}
+
+    for column, (pred, conf) in preds.items():
+        truth = labels[column].astype(str).to_numpy()
+        kept = conf >= model.thresholds.get(column, 1.01)
+        report[column] = {
+            "accuracy": round(float(accuracy_score(truth, pred)), 4),
+            "macro_f1": round(float(f1_score(truth, pred, average="macro", zero_division=0)), 4),
+            "threshold": round(model.thresholds.get(column, 1.01), 4),
+            "coverage": round(float(kept.mean()), 4),
+            "accuracy_when_confident": round(float((pred[kept] == truth[kept]).mean()), 4) if kept.any() else None,
+        }
+
+    routed = sum(r is not None for r in model.route(list(texts)))
+    report["_routed_locally"] = round(routed / len(texts), 4) if len(texts) else 0.0
+    return report
+
+
+def print_report(report):
+    print(f"\n{'field':<20}{'acc':>8}{'f1':>8}{'thr':>8}{'cover':>8}{'acc@thr':>9}")
+    for column, r in report.items():
+        if column.startswith("_"):
+            continue
+        acc_thr = "-" if r["accuracy_when_confident"] is None else f"{r['accuracy_when_confident']:.3f}"
+        print(f"{column:<20}{r['accuracy']:>8.3f}{r['macro_f1']:>8.3f}{r['threshold']:>8.3f}{r['coverage']:>8.3f}{acc_thr:>9}")
+    print(f"\n🏠 Reviews served locally at these thresholds: {100 * report['_routed_locally']:.1f}%")
+
+# =========================
+# ⚙️ CLI
+# =========================
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Train / evaluate the distilled local classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_p = sub.add_parser("train", help="fit on LLM-labelled workbooks")
+    train_p.add_argument("--labels", required=True, help="glob of *_trustpilot_llm.xlsx files")
+    train_p.add_argument("--model", required=True, help="output .joblib path")
+    train_p.add_argument("--target-agreement", type=float, default=0.95,
+                         help="per-field thresholds keep predictions at this LLM agreement")
+    train_p.add_argument("--holdout", type=float, default=0.2)
+
+    eval_p = sub.add_parser("evaluate", help="agreement report on labelled workbooks")
+    eval_p.add_argument("--labels", required=True)
+    eval_p.add_argument("--model", required=True)
+
+    args = parser.parse_args()
+    df = load_labels(args.labels)
+
+    if args.command == "train":
+        train_df, test_df = train_test_split(df, test_size=args.holdout, random_state=42)
+
+        start = time.perf_counter()
+        model = LocalClassifier().fit(train_df["message"].astype(str), train_df, train_df["sentiment_score"])
+        model.calibrate(test_df["message"].astype(str), test_df, args.target_agreement)
+        print(f"🧠 Trained on {len(train_df)} reviews in {time.perf_counter() - start:.1f}s")
+
+        report = evaluate(model, test_df["message"].astype(str), test_df)
+        model.save(args.model)
+    else:
+        model = LocalClassifier.load(args.model)
+        report = evaluate(model, df["message"].astype(str), df)
+
+    print_report(report)
+
+    with open(os.path.splitext(args.model)[0] + "_report.json", "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
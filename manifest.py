@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# 🧾 PROCESSED-INPUT MANIFEST
+# =========================
+# One JSON file per consumer (cleaner / classifier) recording, per input:
+# size, mtime and sha256 (to skip unchanged files) plus a watermark of the
+# rows already processed (row count, max date, ids at that date, max id) so
+# a re-export that only appended rows is processed incrementally.
+
+MANIFEST_NAME = "manifest.json"
+
+NEW, CHANGED, UNCHANGED = "new", "changed", "unchanged"
+
+DATE_COLUMN = "Publish Date"
+ID_COLUMN = "Message Id"
+
+
+def _files(path):
+    """Files making up path; a path that does not exist (nothing written) has none."""
+    if not os.path.exists(path):
+        return
+    if os.path.isdir(path):
+        for folder, _, names in sorted(os.walk(path)):
+            for name in sorted(names):
+                yield os.path.join(folder, name)
+    else:
+        yield path
+
+
+def fingerprint(path):
+    """Total size and newest mtime of a file or a dataset directory."""
+    stats = [os.stat(f) for f in _files(path)]
+    return {
+        "size": sum(s.st_size for s in stats),
+        "mtime": max((s.st_mtime for s in stats), default=0.0),
+    }
+
+
+def content_hash(path, block=1 << 20):
+    digest = hashlib.sha256()
+    for f in _files(path):
+        digest.update(os.path.relpath(f, path).encode("utf-8") if f != path else b"")
+        with open(f, "rb") as fh:
+            while chunk := fh.read(block):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dates(df, date_column):
+    return pd.to_datetime(df[date_column], dayfirst=True, errors="coerce")
+
+
+def watermark(df, date_column=DATE_COLUMN, id_column=ID_COLUMN):
+    """What has been seen of a raw input: rows, max date, ids at that date, max id."""
+    mark = {"rows": len(df), "max_date": None, "ids_at_max": [], "max_id": None}
+
+    if id_column in df.columns and df[id_column].notna().any():
+        mark["max_id"] = str(df[id_column].dropna().astype(str).max())
+
+    if date_column in df.columns:
+        dates = _dates(df, date_column)
+        if dates.notna().any():
+            top = dates.max()
+            mark["max_date"] = top.isoformat()
+            if id_column in df.columns:
+                mark["ids_at_max"] = sorted(df.loc[dates == top, id_column].dropna().astype(str).unique())
+
+    return mark
+
+
+def appended_mask(df, mark, date_column=DATE_COLUMN, id_column=ID_COLUMN):
+    """Boolean mask of the rows added since mark.
+
+    Rows dated after the watermark, or at it with an unseen id, are new;
+    undated rows are new when they sit past the previous row count. Without
+    a usable watermark (new file, rows removed) every row is new.
+    """
+    everything = np.ones(len(df), dtype=bool)
+
+    if not mark or mark.get("rows") is None or len(df) < mark["rows"]:
+        return everything
+
+    past_end = np.arange(len(df)) >= mark["rows"]
+
+    if mark.get("max_date") is None or date_column not in df.columns:
+        return past_end
+
+    dates = _dates(df, date_column)
+    top = pd.Timestamp(mark["max_date"])
+    ids = (
+        df[id_column].astype(str) if id_column in df.columns
+        else pd.Series("", index=df.index)
+    )
+
+    new = (dates > top) | ((dates == top) & ~ids.isin(set(mark["ids_at_max"])))
+    return (new | (dates.isna() & past_end)).to_numpy()
+
+
+class Manifest:
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                self.entries = json.load(fh)
+
+    def check(self, name, path):
+        """(status, previous entry): new, changed or unchanged."""
+        entry = self.entries.get(name)
+        if entry is None:
+            return NEW, None
+
+        fp = fingerprint(path)
+        if fp["size"] == entry["size"] and fp["mtime"] == entry["mtime"]:
+            return UNCHANGED, entry
+
+        if content_hash(path) == entry["sha256"]:
+            entry["mtime"] = fp["mtime"]  # touched or copied, not edited
+            return UNCHANGED, entry
+
+        return CHANGED, entry
+
+    def record(self, name, path, mark=None):
+        self.entries[name] = {
+            **fingerprint(path),
+            "sha256": content_hash(path),
+            **(mark or {"rows": None}),
+            "processed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.entries, fh, indent=2)
+        os.replace(tmp, self.path)
+
+
+def plan_groups(manifest, groups, has_output, full=False):
+    """Split country groups into work and skips.
+
+    Returns (since, files, skipped): since maps country -> {file: previous
+    watermark or None} for groups that can be updated in place (None = all
+    rows of a file not seen before); groups missing from since are rebuilt
+    from scratch. files lists the inputs to read and skipped the countries
+    whose inputs are all unchanged.
+    """
+    since, files, skipped = {}, [], []
+
+    for country, country_files in groups.items():
+
+        if full or not has_output(country):
+            files.extend(country_files)
+            continue
+
+        states = {f: manifest.check(os.path.basename(f), f) for f in country_files}
+
+        changed = {f: entry for f, (status, entry) in states.items() if status != UNCHANGED}
+        if not changed:
+            skipped.append(country)
+            continue
+
+        since[country] = changed
+        files.extend(changed)
+
+    return since, files, skipped
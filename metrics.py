@@ -0,0 +1,297 @@
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# =========================
+# 📈 RUN METRICS
+# =========================
+# Counters and fixed-bucket histograms keyed by label set (country, platform,
+# ...). Labels come from the labelled() context, so classify_ticket records
+# under whatever country/platform the file loop is working on, including
+# inside asyncio tasks.
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+PREFIX = "classifier_"
+
+_labels = contextvars.ContextVar("metric_labels", default=())
+
+
+@contextmanager
+def labelled(**labels):
+    """Attach labels to every metric recorded inside the block."""
+    merged = dict(_labels.get())
+    merged.update({k: str(v) for k, v in labels.items() if v is not None})
+    token = _labels.set(tuple(sorted(merged.items())))
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def _number(value):
+    """Exact sample value; :g would round token and second totals past 1e6."""
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """Linear interpolation inside the bucket, like histogram_quantile()."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                low = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return low
+                return low + (self.buckets[i] - low) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+
+class RunMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def _key(self, name, labels):
+        merged = dict(_labels.get())
+        merged.update({k: str(v) for k, v in labels.items() if v is not None})
+        return name, tuple(sorted(merged.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def sleep(self, seconds, reason):
+        """time.sleep that books the wall time under sleep_seconds_total{reason}."""
+        if seconds > 0:
+            time.sleep(seconds)
+            self.inc("sleep_seconds_total", seconds, reason=reason)
+
+    async def sleep_async(self, seconds, reason):
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+            self.inc("sleep_seconds_total", seconds, reason=reason)
+
+    def record_call(self, seconds, outcome, usage=None):
+        """One provider round trip: latency, outcome and token usage."""
+        self.observe("llm_call_seconds", seconds)
+        self.inc("llm_calls_total", outcome=outcome)
+        if usage is not None:
+            self.record_usage(usage)
+
+    def record_usage(self, usage, share=1.0, histogram=True, **labels):
+        """Token usage; share splits a batch call's tokens across its reviews."""
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        if histogram:
+            self.observe("llm_prompt_tokens", prompt, TOKEN_BUCKETS, **labels)
+            self.observe("llm_completion_tokens", completion, TOKEN_BUCKETS, **labels)
+        self.inc("llm_prompt_tokens_total", prompt * share, **labels)
+        self.inc("llm_completion_tokens_total", completion * share, **labels)
+
+    # ---------- summary ----------
+
+    def _section(self, keep):
+        counters = {}
+        for (name, labels), value in self.counters.items():
+            labels = dict(labels)
+            if keep(labels):
+                extra = tuple((k, v) for k, v in sorted(labels.items()) if k not in ("country", "platform"))
+                counters[name, extra] = counters.get((name, extra), 0) + value
+
+        hists = {}
+        for (name, labels), hist in self.histograms.items():
+            if keep(dict(labels)):
+                merged = hists.setdefault(name, Histogram(hist.buckets))
+                merged.merge(hist)
+
+        def total(name, **match):
+            return sum(
+                v for (n, extra), v in counters.items()
+                if n == name and all(dict(extra).get(k) == m for k, m in match.items())
+            )
+
+        def by(name, label):
+            out = {}
+            for (n, extra), v in counters.items():
+                if n == name and label in dict(extra):
+                    out[dict(extra)[label]] = out.get(dict(extra)[label], 0) + v
+            return out
+
+        calls = by("llm_calls_total", "outcome")
+        successes = calls.get("ok", 0)
+        reviews = by("reviews_total", "source")
+        llm_reviews = reviews.get("llm", 0)
+        latency = hists.get("llm_call_seconds")
+
+        def per(value, count):
+            return round(value / count, 2) if count else None
+
+        def q(hist, p):
+            value = hist.quantile(p) if hist is not None else None
+            return None if value is None else round(value, 3)
+
+        return {
+            "reviews": reviews,
+            "calls": calls,
+            "retries": by("llm_retries_total", "kind"),
+            "retries_per_success": per(total("llm_retries_total"), successes),
+            "latency_p50_s": q(latency, 0.5),
+            "latency_p95_s": q(latency, 0.95),
+            "latency_mean_s": per(latency.sum, latency.count) if latency else None,
+            "prompt_tokens_per_review": per(total("llm_prompt_tokens_total"), llm_reviews),
+            "completion_tokens_per_review": per(total("llm_completion_tokens_total"), llm_reviews),
+            "sleep_seconds": {k: round(v, 2) for k, v in by("sleep_seconds_total", "reason").items()},
+            "hedging": {
+                "hedges": total("llm_hedges_total"),
+                "hedge_win_rate": per(total("llm_hedge_wins_total"), total("llm_hedges_total")),
+                "deadline_exceeded": total("llm_deadline_exceeded_total"),
+            },
+            "consistency": {
+                "checked": total("consistency_checked_total"),
+                "violation_rate": per(total("consistency_violating_total"), total("consistency_checked_total")),
+                "by_rule": by("consistency_violations_total", "rule"),
+                "repairs": by("consistency_repairs_total", "outcome"),
+            },
+            "rows": total("rows_total"),
+            "file_seconds": round(total("file_seconds_total"), 2),
+        }
+
+    def _endpoints(self):
+        """Per-endpoint calls by outcome, latency quantiles and failovers (router.py)."""
+        out = {}
+        for (name, labels), value in self.counters.items():
+            labels = dict(labels)
+            if "endpoint" not in labels:
+                continue
+            e = out.setdefault(labels["endpoint"], {"calls": {}, "failovers": 0})
+            if name == "llm_endpoint_calls_total":
+                e["calls"][labels["outcome"]] = e["calls"].get(labels["outcome"], 0) + value
+            elif name == "llm_failovers_total":
+                e["failovers"] += value
+
+        hists = {}
+        for (name, labels), hist in self.histograms.items():
+            labels = dict(labels)
+            if name == "llm_endpoint_seconds":
+                hists.setdefault(labels["endpoint"], Histogram(hist.buckets)).merge(hist)
+
+        for endpoint, hist in hists.items():
+            e = out.setdefault(endpoint, {"calls": {}, "failovers": 0})
+            for p in (0.5, 0.95):
+                value = hist.quantile(p)
+                e[f"latency_p{int(p * 100)}_s"] = None if value is None else round(value, 3)
+
+        return out
+
+    def summary(self):
+        with self.lock:
+            label_sets = [dict(labels) for _, labels in list(self.counters) + list(self.histograms)]
+            countries = sorted({l["country"] for l in label_sets if "country" in l})
+            pairs = sorted({(l["country"], l["platform"]) for l in label_sets if "country" in l and "platform" in l})
+
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "wall_seconds": round(time.time() - self.started, 2),
+                "totals": self._section(lambda l: True),
+                "by_country": {
+                    c: self._section(lambda l, c=c: l.get("country") == c) for c in countries
+                },
+                "by_country_platform": {
+                    f"{c}/{p}": self._section(lambda l, c=c, p=p: l.get("country") == c and l.get("platform") == p)
+                    for c, p in pairs
+                },
+                "by_endpoint": self._endpoints(),
+            }
+
+    # ---------- export ----------
+
+    def prometheus(self):
+        """Prometheus text exposition format (node_exporter textfile collector)."""
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+        lines = []
+        with self.lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{PREFIX}{name}{fmt(labels)} {_number(value)}")
+
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (n, labels), hist in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, c in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                        cumulative += c
+                        lines.append(f"{PREFIX}{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{fmt(labels)} {_number(hist.sum)}")
+                    lines.append(f"{PREFIX}{name}_count{fmt(labels)} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, folder, name="classifier_metrics"):
+        """Write <name>.json and <name>.prom into folder; returns both paths."""
+        os.makedirs(folder, exist_ok=True)
+        json_path = os.path.join(folder, f"{name}.json")
+        prom_path = os.path.join(folder, f"{name}.prom")
+
+        for path, text in ((json_path, json.dumps(self.summary(), indent=2)), (prom_path, self.prometheus())):
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(text)
+            os.replace(tmp, path)  # textfile collectors must never see a half-written file
+
+        return json_path, prom_path
+
+
+METRICS = RunMetrics()
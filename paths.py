@@ -0,0 +1,73 @@
+import json
+import os
+from glob import glob
+
+# =========================
+# 📁 DATA FOLDERS (CONFIG-DRIVEN)
+# =========================
+# Every script takes its folders from here instead of hard-coding Windows
+# paths. Relative folders live under data_root; both can be overridden by a
+# JSON file (PIPELINE_CONFIG, or pipeline.json next to the scripts):
+#
+#   {"data_root": "/srv/social", "classified": "/mnt/out/classified"}
+#
+# and SOCIAL_DATA_ROOT overrides data_root alone. Without either, data_root
+# is the data/ folder next to the scripts.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.path.join(HERE, "data")
+
+FOLDERS = {
+    "input": "concatfiles",                                       # raw exports
+    "cleaned": "countrywise_output",                              # social_cleaning.py
+    "message_only": "countrywise_output_message_only",            # Trustpilot_cleaning.py
+    "classified": "countrywisetrustpilot_output_message_only",    # classificationSocial.py
+}
+
+CONFIG_NAME = "pipeline.json"
+
+
+def config_path():
+    return os.getenv("PIPELINE_CONFIG") or os.path.join(HERE, CONFIG_NAME)
+
+
+def load_paths(path=None):
+    """{"data_root": ..., <folder>: absolute path} from defaults, config and env."""
+    config = {}
+    path = path or config_path()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            config = json.load(fh)
+
+    unknown = set(config) - set(FOLDERS) - {"data_root"}
+    if unknown:
+        raise ValueError(f"unknown keys in {path}: {', '.join(sorted(unknown))}")
+
+    root = os.path.expanduser(os.getenv("SOCIAL_DATA_ROOT") or config.get("data_root") or DEFAULT_ROOT)
+
+    paths = {"data_root": root}
+    for name, default in FOLDERS.items():
+        paths[name] = os.path.join(root, os.path.expanduser(config.get(name, default)))
+
+    return paths
+
+
+def excel_files(folder):
+    """*.xlsx in folder, sorted; Excel lock files (~$...) are skipped."""
+    return sorted(
+        f for f in glob(os.path.join(folder, "*.xlsx"))
+        if not os.path.basename(f).startswith("~$")
+    )
+
+
+def input_files(folder):
+    """excel_files of a folder that must exist: a missing one is a setup error, not an empty run."""
+    if not os.path.isdir(folder):
+        raise SystemExit(
+            f"❌ Input folder not found: {folder}\n"
+            f"   Set data_root in {config_path()} or the SOCIAL_DATA_ROOT environment variable."
+        )
+    return excel_files(folder)
+
+
+PATHS = load_paths()
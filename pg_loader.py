@@ -0,0 +1,221 @@
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import time
+from glob import glob
+
+import pandas as pd
+
+# =========================
+# 🗃️ TARGET TABLES
+# =========================
+# source column -> (table column, SQL type); message_id is the upsert key.
+TABLES = {
+    "social_cleaned": {
+        "country": ("country", "TEXT"),
+        "platform": ("platform", "TEXT"),
+        "Message Id": ("message_id", "TEXT"),
+        "Message": ("message", "TEXT"),
+        "text": ("text", "TEXT"),
+        "Link": ("link", "TEXT"),
+        "Publish Date": ("publish_date", "TIMESTAMP"),
+        "Language": ("language", "TEXT"),
+        "User Name": ("username", "TEXT"),
+        "Gender": ("gender", "TEXT"),
+    },
+    "social_classified": {
+        "country": ("country", "TEXT"),
+        "platform": ("platform", "TEXT"),
+        "message_id": ("message_id", "TEXT"),
+        "title": ("title", "TEXT"),
+        "message": ("message", "TEXT"),
+        "link": ("link", "TEXT"),
+        "created_date": ("created_date", "TIMESTAMP"),
+        "language": ("language", "TEXT"),
+        "username": ("username", "TEXT"),
+        "gender": ("gender", "TEXT"),
+        "user_rating": ("user_rating", "DOUBLE PRECISION"),
+        "sentiment": ("sentiment", "TEXT"),
+        "sentiment_score": ("sentiment_score", "DOUBLE PRECISION"),
+        "emotion": ("emotion", "TEXT"),
+        "primary_mention": ("primary_mention", "TEXT"),
+        "journey_stage": ("journey_stage", "TEXT"),
+        "issue_type": ("issue_type", "TEXT"),
+        "resolution_status": ("resolution_status", "TEXT"),
+        "review_tone": ("review_tone", "TEXT"),
+        "value_for_money": ("value_for_money", "TEXT"),
+        "churn_risk": ("churn_risk", "TEXT"),
+    },
+}
+
+KEY = "message_id"
+NULL = "\\N"
+
+
+def table_columns(table):
+    return [col for col, _ in TABLES[table].values()]
+
+
+def is_sqlite(conn):
+    return isinstance(conn, sqlite3.Connection)
+
+
+def ensure_table(conn, table):
+    cols = ",\n    ".join(
+        f"{col} {sql_type}{' PRIMARY KEY' if col == KEY else ''}"
+        for col, sql_type in TABLES[table].values()
+    )
+    cur = conn.cursor()
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {table} (\n    {cols}\n)")
+    conn.commit()
+
+
+def prepare_frame(df: pd.DataFrame, table):
+    """Rename to table columns, stringify ids, drop rows with no key."""
+    mapping = TABLES[table]
+    out = pd.DataFrame(index=df.index)
+
+    for source, (col, sql_type) in mapping.items():
+        values = df[source] if source in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+        if sql_type == "TIMESTAMP":
+            values = pd.to_datetime(values, errors="coerce")
+        elif sql_type == "DOUBLE PRECISION":
+            values = pd.to_numeric(values, errors="coerce")
+        else:
+            values = values.where(values.isna(), values.astype(str))
+            if col == KEY:
+                values = values.str.removesuffix(".0")
+
+        out[col] = values
+
+    return out[out[KEY].notna()]
+
+# =========================
+# 🐘 POSTGRES: COPY + STAGING UPSERT
+# =========================
+def _copy_buffer(df: pd.DataFrame):
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep=NULL, date_format="%Y-%m-%d %H:%M:%S",
+              quoting=csv.QUOTE_MINIMAL)
+    buf.seek(0)
+    return buf
+
+
+def _upsert_sql(table, cols, staging, order):
+    col_list = ", ".join(cols)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols if c != KEY)
+    return (
+        f"INSERT INTO {table} ({col_list}) "
+        f"SELECT {col_list} FROM {staging} {order} "
+        f"ON CONFLICT ({KEY}) DO UPDATE SET {updates}"
+    )
+
+
+def _load_postgres(conn, df, table, cols):
+    cur = conn.cursor()
+    staging = f"{table}_staging"
+
+    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS)")
+    cur.execute(f"ALTER TABLE {staging} ADD COLUMN IF NOT EXISTS _seq BIGSERIAL")
+    cur.execute(f"TRUNCATE {staging}")
+
+    cur.copy_expert(
+        f"COPY {staging} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')",
+        _copy_buffer(df),
+    )
+
+    # last row per key wins, like drop_duplicates(keep='last')
+    latest = (
+        f"(SELECT DISTINCT ON ({KEY}) * FROM {staging} ORDER BY {KEY}, _seq DESC) AS latest"
+    )
+    cur.execute(_upsert_sql(table, cols, latest, ""))
+    conn.commit()
+
+# =========================
+# 🪶 SQLITE STAND-IN (CI / LOCAL)
+# =========================
+def _load_sqlite(conn, df, table, cols):
+    staging = f"{table}_staging"
+    cur = conn.cursor()
+
+    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS SELECT * FROM {table} WHERE 0")
+    cur.execute(f"DELETE FROM {staging}")
+
+    rows = df.astype(object).where(df.notna(), None)
+    for col in rows.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            rows[col] = df[col].dt.strftime("%Y-%m-%d %H:%M:%S").astype(object).where(df[col].notna(), None)
+
+    cur.executemany(
+        f"INSERT INTO {staging} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+        rows.itertuples(index=False, name=None),
+    )
+
+    # sqlite applies the rows in rowid order, so the last duplicate wins
+    cur.execute(_upsert_sql(table, cols, staging, "WHERE true ORDER BY rowid"))
+    conn.commit()
+
+# =========================
+# 🚚 LOADER
+# =========================
+def load_frame(conn, df: pd.DataFrame, table, batch_size=50_000):
+    """Upsert df into table on message_id in batches; returns rows loaded."""
+    ensure_table(conn, table)
+
+    prepared = prepare_frame(df, table)
+    cols = table_columns(table)
+    load = _load_sqlite if is_sqlite(conn) else _load_postgres
+
+    for start in range(0, len(prepared), batch_size):
+        load(conn, prepared.iloc[start:start + batch_size], table, cols)
+
+    return len(prepared)
+
+
+def connect(dsn=None, sqlite_path=None):
+    if sqlite_path:
+        return sqlite3.connect(sqlite_path)
+
+    import psycopg2
+    return psycopg2.connect(dsn or os.getenv("DATABASE_URL"))
+
+
+def load_folder(conn, pattern, table, batch_size):
+    total = 0
+
+    for file in sorted(glob(pattern)):
+        start = time.perf_counter()
+        df = pd.read_excel(file)
+        n = load_frame(conn, df, table, batch_size)
+        seconds = time.perf_counter() - start
+        total += n
+        print(f"✅ {os.path.basename(file)} → {table}: {n} rows in {seconds:.1f}s")
+
+    return total
+
+# =========================
+# ⚙️ CLI
+# =========================
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Bulk-load cleaned and classified workbooks into Postgres.")
+    parser.add_argument("--dsn", default=None, help="Postgres DSN (default: $DATABASE_URL)")
+    parser.add_argument("--sqlite", default=None, help="load into this SQLite file instead (CI stand-in)")
+    parser.add_argument("--cleaned", default=None, help="glob of *_cleaned.xlsx files")
+    parser.add_argument("--classified", default=None, help="glob of *_trustpilot_llm.xlsx files")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    conn = connect(args.dsn, args.sqlite)
+
+    if args.cleaned:
+        load_folder(conn, args.cleaned, "social_cleaned", args.batch_size)
+    if args.classified:
+        load_folder(conn, args.classified, "social_classified", args.batch_size)
+
+    conn.close()
+
+    print("\n🎉 LOAD COMPLETE")
@@ -0,0 +1,209 @@
+import argparse
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+import Trustpilot_cleaning as cleaner
+import classificationSocial as classifier
+from checkpoint import Checkpoint
+from cleaning import group_files_by_country
+from id_index import INDEX_NAME
+from intermediate import list_countries, partition_path, read_messages
+from manifest import MANIFEST_NAME, Manifest, plan_groups, watermark
+from metrics import METRICS
+from paths import input_files, load_paths
+
+# =========================
+# 🚰 CLEAN → CLASSIFY PIPELINE
+# =========================
+# One entry point for raw exports -> classified workbooks. Three stages run
+# at once, joined by bounded queues:
+#
+#   clean thread   reads and cleans chunks, writes them to the Parquet hand-off
+#   main thread    classifies each chunk as soon as it arrives
+#   write thread   writes a country's workbook and manifests once it is done
+#
+# A full chunk queue blocks the cleaner, so memory stays at a few chunks
+# while the first results land in seconds instead of after every country has
+# been cleaned. Options not listed below are passed to the classifier, e.g.
+#
+#   python pipeline.py --config pipeline.json --mode async --concurrency 16
+
+DONE = object()   # after a country's last chunk
+STOP = object()   # after the last country
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Clean exports and classify them in one streaming run "
+                    "(other options go to classificationSocial.py).",
+    )
+    parser.add_argument("--config", default=None, help="JSON file with data_root / folder overrides")
+    parser.add_argument("--chunk-size", type=int, default=5_000, help="rows per cleaned chunk")
+    parser.add_argument("--queue-size", type=int, default=4, help="cleaned chunks buffered ahead of the classifier")
+    parser.add_argument("--excel", action="store_true", help="also export <country>_message_only.xlsx")
+    parser.add_argument("--no-id-index", action="store_true",
+                        help="keep mentions already written to another country's output")
+    return parser.parse_known_args(argv)
+
+
+def clean_stage(groups, chunks, args, index_path):
+    """Producer: every country's cleaned chunks, then DONE, then STOP."""
+    try:
+        for country, files in groups.items():
+            print(f"\n🧹 Cleaning: {', '.join(os.path.basename(f) for f in files)}")
+            for chunk in cleaner.stream_messages(country, files, args.excel, args.chunk_size, index_path):
+                chunks.put((country, chunk))
+            chunks.put((country, DONE))
+    except Exception as exc:
+        chunks.put((None, exc))
+        return
+    chunks.put((None, STOP))
+
+
+def write_stage(jobs, fields, groups, clean_manifest, classify_manifest, metrics_dir, d2_llm, errors):
+    """Consumer: workbook, manifests and metrics of each finished country."""
+    while (job := jobs.get()) is not None:
+        country, checkpoint, keys, started = job
+        try:
+            checkpoint.close()
+            d2_llm[country] = classifier.write_output(country, checkpoint, keys)
+
+            # same manifest entries the standalone scripts write, so either
+            # can pick up where the pipeline left off
+            for f in groups[country]:
+                clean_manifest.record(os.path.basename(f), f)
+            clean_manifest.save()
+
+            # a country whose rows were all dropped has no partition at all
+            partition = partition_path(classifier.PARQUET_INPUT, country)
+            marks = (
+                read_messages(classifier.PARQUET_INPUT, ["created_date", "message_id"], country)
+                if os.path.isdir(partition) else pd.DataFrame(columns=["created_date", "message_id"])
+            )
+            classify_manifest.record(
+                f"{country}.parquet", partition,
+                {**watermark(marks, "created_date", "message_id"),
+                 "fields": sorted(classifier.complete_fields(checkpoint, keys, fields))},
+            )
+            classify_manifest.save()
+
+            METRICS.inc("file_seconds_total", time.perf_counter() - started, country=country)
+            METRICS.write(metrics_dir)
+            if keys:
+                print(f"✅ {country} Done ({len(keys)} rows)")
+            else:
+                print(f"⏭️ {country}: no rows left after cleaning (empty workbook written)")
+        except Exception as exc:
+            errors.append((country, exc))
+
+
+def main():
+    args, rest = parse_args()
+
+    paths = load_paths(args.config)
+    cleaner.use_paths(paths)
+    classifier.use_paths(paths)
+
+    cargs = classifier.parse_args(rest)
+    if cargs.redrive or cargs.prompt_report:
+        raise SystemExit("--redrive / --prompt-report: run classificationSocial.py directly")
+
+    try:
+        fields = classifier.parse_fields(cargs.fields) if cargs.fields else list(classifier.RESULT_COLUMNS)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+    files = input_files(cleaner.input_folder)
+
+    active = classifier.set_fields(fields)
+    cache, dead_letter = classifier.prepare(cargs, active)
+
+    os.makedirs(cleaner.output_folder, exist_ok=True)
+    metrics_dir = cargs.metrics_dir or classifier.output_folder
+
+    # 🧾 COUNTRIES WHOSE EXPORTS ARE UNCHANGED AND ALREADY CLASSIFIED ARE SKIPPED
+    clean_manifest = Manifest(os.path.join(cleaner.output_folder, MANIFEST_NAME))
+    classify_manifest = Manifest(os.path.join(classifier.output_folder, MANIFEST_NAME))
+
+    groups = group_files_by_country(files)
+    cleaned = set(list_countries(cleaner.parquet_folder))
+    _, _, skipped = plan_groups(
+        clean_manifest, groups,
+        lambda c: c in cleaned and os.path.exists(classifier.output_path(c)),
+        cargs.full,
+    )
+    if skipped:
+        print(f"⏭️ Unchanged since last run: {', '.join(skipped)}")
+    groups = {c: fs for c, fs in groups.items() if c not in skipped}
+
+    index_path = None if args.no_id_index else os.path.join(cleaner.output_folder, INDEX_NAME)
+
+    chunks = queue.Queue(maxsize=args.queue_size)
+    jobs = queue.Queue()
+    d2_llm, errors = {}, []
+
+    producer = threading.Thread(target=clean_stage, args=(groups, chunks, args, index_path), daemon=True)
+    writer = threading.Thread(
+        target=write_stage,
+        args=(jobs, fields, groups, clean_manifest, classify_manifest, metrics_dir, d2_llm, errors),
+    )
+    producer.start()
+    writer.start()
+
+    started = time.perf_counter()
+    first_result = None
+    current = {}  # country -> (checkpoint, keys seen, rows so far, started)
+
+    try:
+        while True:
+            country, item = chunks.get()
+
+            if item is STOP:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            if country not in current:
+                # rows classified by an earlier run (or the standalone classifier) are reused
+                checkpoint = Checkpoint(
+                    classifier.checkpoint_path(f"{country}.parquet"),
+                    resume=not cargs.full, dtypes=classifier.RESULT_DTYPES,
+                )
+                current[country] = (checkpoint, set(), 0, time.perf_counter())
+
+            if item is DONE:
+                checkpoint, keys, _, country_started = current.pop(country)
+                jobs.put((country, checkpoint, keys, country_started))
+                continue
+
+            checkpoint, keys, offset, country_started = current[country]
+
+            pending = classifier.pending_rows(item, checkpoint, fields, offset=offset, seen=keys)
+            classifier.classify_groups(
+                pending, fields, f"{country}.parquet", country, checkpoint, dead_letter, cargs, cache,
+            )
+
+            current[country] = (checkpoint, keys, offset + len(item), country_started)
+            METRICS.inc("rows_total", len(item), country=country)
+
+            if first_result is None and len(checkpoint):
+                first_result = time.perf_counter() - started
+                print(f"⚡ First results after {first_result:.1f}s")
+    finally:
+        jobs.put(None)
+        writer.join()
+
+    for country, exc in errors:
+        print(f"❌ {country}: {type(exc).__name__}: {exc}")
+
+    classifier.finish(cache, dead_letter, metrics_dir)
+
+    print("\n🎉 PIPELINE FINISHED" if not errors else f"\n⚠️ {len(errors)} countries failed to write")
+
+
+if __name__ == "__main__":
+    main()
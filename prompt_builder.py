@@ -0,0 +1,158 @@
+import inspect
+import json
+import re
+from enum import Enum
+
+from pydantic import BaseModel, create_model
+from pydantic.json_schema import GenerateJsonSchema
+
+# =========================
+# 🧱 PROMPT FROM SCHEMA
+# =========================
+# The label guidance lives in the enum docstrings:
+#
+#   class ReviewTone(str, Enum):
+#       """Overall intent of the review.
+#
+#       complaint: mainly to complain or warn others
+#       ...
+#       """
+#
+# The first paragraph is the field's headline and "value: description" lines
+# explain individual values; values without a line are listed bare. Numeric
+# ranges come from the Field constraints, so prompt and schema cannot drift.
+
+VALUE_LINE = re.compile(r"^(\w+):\s*(.*)$")
+
+
+def enum_docs(enum_cls):
+    """(headline, {value: description}) parsed from an Enum docstring."""
+    doc = inspect.cleandoc(enum_cls.__doc__ or "")
+    values = {m.value for m in enum_cls}
+
+    headline, docs, current = [], {}, None
+    for line in doc.splitlines():
+        match = VALUE_LINE.match(line.strip())
+        if match and match.group(1) in values:
+            current = match.group(1)
+            docs[current] = match.group(2)
+        elif current is not None and line.strip():
+            docs[current] += " " + line.strip()
+        elif current is None and line.strip():
+            headline.append(line.strip())
+
+    return " ".join(headline), docs
+
+
+def _bounds(field):
+    low = high = None
+    for meta in field.metadata:
+        low = getattr(meta, "ge", low)
+        high = getattr(meta, "le", high)
+    return low, high
+
+
+def describe_field(name, field):
+    annotation = field.annotation
+
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        headline, docs = enum_docs(annotation)
+        lines = [f"{name}: {headline}".rstrip(": ")]
+        lines += [f" {m.value}: {docs[m.value]}" for m in annotation if m.value in docs]
+        bare = [m.value for m in annotation if m.value not in docs]
+        if bare:
+            lines.append(" " + "|".join(bare))
+        return "\n".join(lines)
+
+    low, high = _bounds(field)
+    kind = getattr(annotation, "__name__", str(annotation))
+    span = f" {low:g}..{high:g}" if low is not None and high is not None else ""
+    return f"{name}: {kind}{span}. {field.description or ''}".rstrip()
+
+
+def prompt_sections(model, preamble, rules=(), fields=None):
+    """Ordered {section: text}; fields restricts which model fields appear.
+
+    Rules that name a field left out of fields are dropped as well.
+    """
+    sections = {"preamble": inspect.cleandoc(preamble)}
+
+    for name, field in model.model_fields.items():
+        if fields is None or name in fields:
+            sections[name] = describe_field(name, field)
+
+    if fields is not None:
+        left_out = [name for name in model.model_fields if name not in fields]
+        rules = [rule for rule in rules if not any(name in rule for name in left_out)]
+
+    if rules:
+        sections["rules"] = "Rules:\n" + "\n".join(f"- {rule}" for rule in rules)
+
+    return sections
+
+
+def build_prompt(model, preamble, rules=(), fields=None):
+    return "\n".join(prompt_sections(model, preamble, rules, fields).values()) + "\n"
+
+
+def reduced_model(model, fields, name=None):
+    """model restricted to fields, keeping each field's type, constraints and docs."""
+    return create_model(
+        name or f"{model.__name__}Subset",
+        __base__=PromptDocumentedModel,
+        **{f: (model.model_fields[f].annotation, model.model_fields[f]) for f in fields},
+    )
+
+# =========================
+# 🪶 COMPACT JSON SCHEMA
+# =========================
+def strip_docs(node, names=False):
+    """Drop title/description keys; the prompt already carries the docs.
+
+    names=True marks a mapping of property / $defs names, whose keys are kept.
+    """
+    if isinstance(node, dict):
+        return {
+            k: strip_docs(v, k in ("properties", "$defs") and not names)
+            for k, v in node.items()
+            if names or k not in ("title", "description")
+        }
+    if isinstance(node, list):
+        return [strip_docs(v) for v in node]
+    return node
+
+
+class PromptDocumentedModel(BaseModel):
+    """Base for response models whose docs are sent in the prompt, not the schema."""
+
+    @classmethod
+    def model_json_schema(cls, by_alias=True, ref_template="#/$defs/{model}",
+                          schema_generator=GenerateJsonSchema, mode="validation", **kwargs):
+        schema = super().model_json_schema(by_alias, ref_template, schema_generator, mode, **kwargs)
+        # instructor names the tool / response format after the top-level title
+        return {"title": schema["title"], **strip_docs(schema)}
+
+# =========================
+# 🔢 TOKEN REPORT
+# =========================
+def count_tokens(text):
+    """Tokens with tiktoken's o200k_base when installed, else ~4 chars per token."""
+    try:
+        import tiktoken
+    except ImportError:
+        return len(text) // 4
+    return len(tiktoken.get_encoding("o200k_base").encode(text))
+
+
+def token_report(sections, schema=None):
+    rows = [(name, count_tokens(text)) for name, text in sections.items()]
+    rows.append(("TOTAL prompt", count_tokens("\n".join(sections.values()))))
+    if schema is not None:
+        rows.append(("response schema", count_tokens(json.dumps(schema, separators=(",", ":")))))
+    return rows
+
+
+def print_token_report(rows):
+    print(f"\n{'section':<24}{'tokens':>8}")
+    for name, tokens in rows:
+        print(f"{name:<24}{tokens:>8}")
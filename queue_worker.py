@@ -0,0 +1,229 @@
+import argparse
+import os
+import socket
+import threading
+import time
+
+import classificationSocial as classifier
+from checkpoint import Checkpoint
+from manifest import MANIFEST_NAME, Manifest, watermark
+from metrics import METRICS
+from paths import load_paths
+from work_queue import FAILED, LEASED, QUEUE_NAME, QUEUED, WorkQueue, worker_id
+
+# =========================
+# 👷 SHARED-QUEUE CLASSIFICATION
+# =========================
+# Scale classification out over processes and hosts that share one queue
+# file (work_queue.py):
+#
+#   python queue_worker.py enqueue            # one per-message job per row still to classify
+#   python queue_worker.py work  (xN hosts)   # lease, classify, heartbeat, complete
+#   python queue_worker.py collect            # results -> checkpoints, workbooks, manifest
+#   python queue_worker.py status
+#
+# Options not listed below (--mode, --fields, --backend, ...) go to the
+# classifier, so every worker classifies exactly like classificationSocial.py.
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Classify through a shared leased work queue "
+                    "(other options go to classificationSocial.py).",
+    )
+    parser.add_argument("command", choices=["enqueue", "work", "collect", "status"])
+    parser.add_argument("--config", default=None, help="JSON file with data_root / folder overrides")
+    parser.add_argument("--queue", default=None, help=f"queue file (default: <classified folder>/{QUEUE_NAME})")
+    parser.add_argument("--shared-volume", action="store_true",
+                        help="workers on several hosts: use a rollback journal instead of WAL")
+    parser.add_argument("--lease-seconds", type=float, default=120, help="how long a leased job stays reserved")
+    parser.add_argument("--lease-batch", type=int, default=20, help="jobs leased per round trip")
+    parser.add_argument("--max-attempts", type=int, default=3, help="leases before a job is marked failed")
+    parser.add_argument("--poll", type=float, default=5, help="seconds between polls of an empty queue")
+    parser.add_argument("--wait", action="store_true", help="keep polling when the queue is empty")
+    return parser.parse_known_args(argv)
+
+
+def open_queue(args):
+    return WorkQueue(
+        args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts, shared=args.shared_volume,
+    )
+
+
+# =========================
+# 🔌 CLASSIFY_PENDING ADAPTERS
+# =========================
+class QueueSink:
+    """Checkpoint stand-in: each result completes its job in the queue."""
+
+    def __init__(self, queue, worker, source_file):
+        self.queue = queue
+        self.worker = worker
+        self.source_file = source_file
+        self.lost = 0
+
+    def done(self, key):
+        return False
+
+    def append(self, key, pos, row):
+        if not self.queue.complete(self.worker, self.source_file, key, pos, row):
+            self.lost += 1  # lease expired and went to another worker
+
+
+class QueueDeadLetter:
+    """Dead-letter stand-in: a job that failed every retry goes back to the queue."""
+
+    def __init__(self, queue, worker):
+        self.queue = queue
+        self.worker = worker
+
+    def append(self, entry, failure):
+        self.queue.fail(self.worker, entry["source_file"], entry["key"], f"{failure.kind}: {failure.cause!r}")
+
+
+# =========================
+# 📥 ENQUEUE
+# =========================
+def enqueue(args, cargs, fields):
+    queue = open_queue(args)
+    total = 0
+
+    for filename, country, path, load in classifier.iter_inputs(cargs.input_format):
+        df = load()
+
+        checkpoint = Checkpoint(classifier.checkpoint_path(filename), resume=True, dtypes=classifier.RESULT_DTYPES)
+        pending = classifier.pending_rows(df, checkpoint, fields)
+        checkpoint.close()
+
+        added = queue.enqueue(
+            (filename, key, country, pos, message, row.to_dict(), missing)
+            for missing, group in pending.items()
+            for key, pos, row, message in group
+        )
+        total += added
+        print(f"📥 {country}: {added} jobs queued")
+
+    print(f"\n📬 {total} jobs queued; {queue.counts()}")
+    queue.close()
+
+
+# =========================
+# 👷 WORK
+# =========================
+def heartbeat(args, worker, stop):
+    """Keep this worker's leases alive from a connection of its own."""
+    queue = open_queue(args)
+    while not stop.wait(args.lease_seconds / 3):
+        queue.heartbeat(worker)
+    queue.close()
+
+
+def work(args, cargs, fields):
+    active = classifier.set_fields(fields)
+    cache, _ = classifier.prepare(cargs, active, shared=args.shared_volume)
+
+    queue = open_queue(args)
+    worker = worker_id()
+    print(f"👷 Worker {worker} on {queue.path}")
+
+    stop = threading.Event()
+    beat = threading.Thread(target=heartbeat, args=(args, worker, stop), daemon=True)
+    beat.start()
+
+    metrics_dir = cargs.metrics_dir or classifier.output_folder
+    metrics_name = f"classifier_metrics_{socket.gethostname()}_{os.getpid()}"
+    done = lost = 0
+
+    try:
+        while True:
+            jobs = queue.lease(worker, args.lease_batch)
+
+            if not jobs:
+                counts = queue.counts()
+                if not args.wait and not counts.get(QUEUED) and not counts.get(LEASED):
+                    break
+                time.sleep(args.poll)
+                continue
+
+            # same grouping classify_groups expects: per file, per missing fields
+            units = {}
+            for job in jobs:
+                pending = units.setdefault((job["source_file"], job["country"]), {})
+                pending.setdefault(job["fields"], []).append((job["key"], job["pos"], job["row"], job["message"]))
+
+            for (source_file, country), pending in units.items():
+                sink = QueueSink(queue, worker, source_file)
+                classifier.classify_groups(
+                    pending, fields, source_file, country, sink, QueueDeadLetter(queue, worker), cargs, cache,
+                )
+                lost += sink.lost
+
+            done += len(jobs)
+            METRICS.write(metrics_dir, metrics_name)
+    finally:
+        stop.set()
+        if cache is not None:
+            cache.close()
+        queue.close()
+
+    print(f"\n✅ Worker {worker}: {done} jobs leased, {lost} results dropped after a lost lease")
+
+
+# =========================
+# 📤 COLLECT
+# =========================
+def collect(args, cargs, fields):
+    queue = open_queue(args)
+    waiting = set(queue.source_files())
+    manifest = Manifest(os.path.join(classifier.output_folder, MANIFEST_NAME))
+
+    for filename, country, path, load in classifier.iter_inputs(cargs.input_format):
+        if filename not in waiting:
+            continue
+
+        results = queue.results(filename)
+        checkpoint = Checkpoint(classifier.checkpoint_path(filename), resume=True, dtypes=classifier.RESULT_DTYPES)
+        for key, pos, result in results:
+            checkpoint.append(key, pos, result)
+        checkpoint.close()
+        queue.mark_collected(filename, [key for key, _, _ in results])
+
+        df = load()
+        classifier.write_output(country, checkpoint)
+
+        # the manifest only vouches for fields every row now has
+        if not classifier.pending_rows(df, checkpoint, fields):
+            manifest.record(filename, path, {**watermark(df, "created_date", "message_id"), "fields": sorted(fields)})
+            manifest.save()
+
+        print(f"📤 {country}: {len(results)} results collected")
+
+    counts = queue.counts()
+    if counts.get(FAILED):
+        print(f"☠️ {counts[FAILED]} jobs failed every attempt; enqueue again to retry them")
+    queue.close()
+
+
+def main():
+    args, rest = parse_args()
+
+    classifier.use_paths(load_paths(args.config))
+    args.queue = args.queue or os.path.join(classifier.output_folder, QUEUE_NAME)
+
+    cargs = classifier.parse_args(rest)
+    try:
+        fields = classifier.parse_fields(cargs.fields) if cargs.fields else list(classifier.RESULT_COLUMNS)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+    if args.command == "status":
+        queue = open_queue(args)
+        print(queue.counts())
+        queue.close()
+        return
+
+    {"enqueue": enqueue, "work": work, "collect": collect}[args.command](args, cargs, fields)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import json
+import os
+import random
+import re
+import time
+
+from checkpoint import json_default
+
+# =========================
+# 🔁 ERROR CLASSES
+# =========================
+RATE_LIMIT = "rate_limit"
+TRANSPORT = "transport"
+VALIDATION = "validation"
+FATAL = "fatal"
+
+RESET_HEADERS = (
+    "retry-after",
+    "x-ratelimit-reset-requests",
+    "x-ratelimit-reset-tokens",
+)
+
+
+class ClassificationFailed(Exception):
+    """Raised once a review has exhausted the retries for its error class."""
+
+    def __init__(self, kind, attempts, cause):
+        super().__init__(f"{kind} after {attempts} attempts: {cause!r}")
+        self.kind = kind
+        self.attempts = attempts
+        self.cause = cause
+
+
+def _chain(exc):
+    while exc is not None:
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def _status_code(exc):
+    for e in _chain(exc):
+        code = getattr(e, "status_code", None)
+        if code is None:
+            code = getattr(getattr(e, "response", None), "status_code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def classify_error(exc):
+    names = {type(e).__name__ for e in _chain(exc)}
+
+    if "RateLimitError" in names or _status_code(exc) == 429:
+        return RATE_LIMIT
+    if names & {"ValidationError", "JSONDecodeError"}:
+        return VALIDATION
+    if names & {"APIConnectionError", "APITimeoutError", "Timeout", "TimeoutError",
+                "ConnectionError", "ConnectError", "ReadTimeout", "RemoteProtocolError"}:
+        return TRANSPORT
+
+    code = _status_code(exc)
+    if code is not None and code >= 500:
+        return TRANSPORT
+    if code is not None and 400 <= code < 500:
+        return FATAL
+
+    # instructor wraps transport errors too; only a bare one means bad output
+    if "InstructorRetryException" in names:
+        return VALIDATION
+
+    return TRANSPORT
+
+
+def parse_reset(value):
+    """Seconds from a reset header: '7', '7.66s', '2m59.56s', '120ms'."""
+    value = str(value).strip()
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    found = False
+    for amount, unit in re.findall(r"([\d.]+)\s*(ms|h|m|s)", value):
+        found = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+
+    return total if found else None
+
+
+def reset_delay(exc):
+    for e in _chain(exc):
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        if not headers:
+            continue
+
+        delays = [parse_reset(headers[h]) for h in RESET_HEADERS if headers.get(h) is not None]
+        delays = [d for d in delays if d is not None]
+        if delays:
+            return max(delays)
+
+    return None
+
+# =========================
+# ⏳ RETRY POLICY
+# =========================
+class RetryPolicy:
+    """Per-error-class retry budget with exponential backoff and full jitter.
+
+    Rate limits wait for the server's reset header when one is present;
+    validation failures are retried right away (the model just answered, so
+    the transport is healthy); fatal 4xx errors are never retried.
+    """
+
+    def __init__(self, base=1.0, cap=60.0, max_attempts=None):
+        self.base = base
+        self.cap = cap
+        self.max_attempts = max_attempts or {
+            RATE_LIMIT: 8,
+            TRANSPORT: 5,
+            VALIDATION: 3,
+            FATAL: 1,
+        }
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+    def next_delay(self, kind, attempt, exc):
+        """Seconds to wait before the next try, or None to give up.
+
+        attempt is the number of failed tries of this error class so far.
+        """
+        if attempt >= self.max_attempts.get(kind, 1):
+            return None
+
+        if kind == VALIDATION:
+            return 0.0
+
+        if kind == RATE_LIMIT:
+            delay = reset_delay(exc)
+            if delay is not None:
+                return delay + random.uniform(0, self.base)
+
+        return self.backoff(attempt - 1)
+
+# =========================
+# ☠️ DEAD-LETTER QUEUE
+# =========================
+class DeadLetterQueue:
+    """JSONL file of reviews that failed every retry, re-drivable later."""
+
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+
+    def append(self, entry, failure):
+        rec = {
+            **entry,
+            "error_class": failure.kind,
+            "attempts": failure.attempts,
+            "error": repr(failure.cause)[:500],
+            "failed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(rec, default=json_default, ensure_ascii=False) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def load(self):
+        return self._read(self.path)
+
+    def drain(self):
+        """Move every entry aside for re-driving and return them.
+
+        Entries left over from an interrupted re-drive are included; reviews
+        that fail again are appended to the live queue as usual.
+        """
+        pending = self.path + ".redriving"
+
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as src, open(pending, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+            os.remove(self.path)
+
+        return self._read(pending)
+
+    def done_draining(self):
+        if os.path.exists(self.path + ".redriving"):
+            os.remove(self.path + ".redriving")
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return []
+
+        entries = []
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
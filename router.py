@@ -0,0 +1,286 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from backends import FakeBackend, InstructorBackend
+from metrics import LATENCY_BUCKETS, METRICS, Histogram
+from retry_policy import FATAL, RATE_LIMIT, TRANSPORT, VALIDATION, classify_error, reset_delay
+
+# =========================
+# 🔀 MULTI-ENDPOINT ROUTER
+# =========================
+# A backend that spreads calls over a pool of provider / key / model
+# endpoints. Each call picks an endpoint at random with weight
+#
+#   weight x remaining rate budget / smoothed latency
+#
+# so fast endpoints with quota left take most of the traffic. A 429, 5xx or
+# connection error benches that endpoint for a while (a 429 for as long as
+# its reset header says) and the same request is sent to the next endpoint
+# right away. Only when every endpoint has failed or is benched does the
+# error reach classify_ticket's retry policy.
+#
+# The providers return no quota headers on successful instructor calls, so
+# the budget is tracked locally from each endpoint's configured rpm / tpm.
+#
+# Endpoints come from a JSON list (--endpoints):
+#
+#   [{"name": "groq-a", "model": "groq/openai/gpt-oss-120b", "api_key_env": "GROQ_API_KEY", "rpm": 30},
+#    {"name": "groq-b", "model": "groq/openai/gpt-oss-120b", "api_key_env": "GROQ_API_KEY_2", "rpm": 30},
+#    {"name": "local", "model": "openai/gpt-oss-120b", "base_url": "http://127.0.0.1:8000/v1"},
+#    {"name": "stand-in", "fake": {"latency_ms": 400, "rate_limit_rate": 0.1}}]
+
+LATENCY_PRIOR = 0.5      # seconds assumed for an endpoint not measured yet
+LATENCY_ALPHA = 0.2      # EWMA smoothing of observed latency
+MIN_LATENCY = 0.05
+FATAL_BENCH = 300.0      # bad key / unknown model: keep it out for 5 minutes
+TRANSPORT_BENCH_CAP = 30.0
+
+
+class NoEndpointAvailable(Exception):
+    """Every endpoint is benched; looks like a 429 so the retry policy waits it out."""
+
+    def __init__(self, wait):
+        super().__init__(f"all endpoints benched for {wait:.1f}s")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": f"{wait:.3f}"})
+
+
+class Endpoint:
+
+    def __init__(self, name, backend, weight=1.0, rpm=None, tpm=None):
+        self.name = name
+        self.backend = backend
+        self.weight = weight
+        self.rpm = rpm
+        self.tpm = tpm
+
+        self.window = deque()            # [time, tokens] of the last minute
+        self.latency = None              # EWMA seconds
+        self.benched_until = 0.0
+        self.consecutive_failures = 0
+
+        self.outcomes = {}
+        self.failovers = 0
+        self.tokens = 0
+        self.seconds = Histogram(LATENCY_BUCKETS)
+
+    def budget(self, now):
+        """Share of the per-minute request / token budget still unused (0..1)."""
+        while self.window and now - self.window[0][0] >= 60:
+            self.window.popleft()
+
+        share = 1.0
+        if self.rpm:
+            share = min(share, 1 - len(self.window) / self.rpm)
+        if self.tpm:
+            share = min(share, 1 - sum(t for _, t in self.window) / self.tpm)
+        return max(share, 0.0)
+
+    def ready_in(self, now):
+        """Seconds until this endpoint may take a call again (bench or full rate window)."""
+        wait = max(self.benched_until - now, 0.0)
+        if self.budget(now) > 0:
+            return wait
+
+        # oldest slots leave the window one by one until both budgets have room
+        requests, tokens = len(self.window), sum(t for _, t in self.window)
+        for started, used in self.window:
+            requests, tokens = requests - 1, tokens - used
+            if (not self.rpm or requests < self.rpm) and (not self.tpm or tokens < self.tpm):
+                return max(wait, started + 60 - now)
+        return max(wait, 60.0)
+
+    def score(self, now):
+        if now < self.benched_until:
+            return 0.0
+        return self.weight * self.budget(now) / max(self.latency or LATENCY_PRIOR, MIN_LATENCY)
+
+
+class RoutedBackend:
+    """Backend over several endpoints; same .client / .async_client shape as the others."""
+
+    def __init__(self, endpoints, seed=None):
+        if not endpoints:
+            raise ValueError("RoutedBackend needs at least one endpoint")
+        self.endpoints = endpoints
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=_RoutedCompletions(self, False)))
+        self.async_client = SimpleNamespace(chat=SimpleNamespace(completions=_RoutedCompletions(self, True)))
+
+    @classmethod
+    def from_config(cls, path, seed=None):
+        with open(path, encoding="utf-8") as fh:
+            specs = json.load(fh)
+        return cls([build_endpoint(spec, i) for i, spec in enumerate(specs)], seed)
+
+    # ---------- routing ----------
+
+    def pick(self, tried):
+        """(endpoint, budget slot) picked by weight among those not tried; None when none is usable."""
+        now = time.time()
+        with self.lock:
+            candidates = [e for e in self.endpoints if e.name not in tried]
+            scores = [e.score(now) for e in candidates]
+            if not any(scores):
+                return None
+            endpoint = self.rng.choices(candidates, weights=scores)[0]
+            slot = [now, 0]  # request counted now, tokens filled in on success
+            endpoint.window.append(slot)
+            return endpoint, slot
+
+    def wait_time(self):
+        """Seconds until the first endpoint is usable again; NoEndpointAvailable's retry-after."""
+        now = time.time()
+        with self.lock:
+            return max(min(e.ready_in(now) for e in self.endpoints), 0.5)
+
+    def succeeded(self, endpoint, slot, seconds, usage):
+        tokens = (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+        with self.lock:
+            endpoint.latency = seconds if endpoint.latency is None else (
+                LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * endpoint.latency
+            )
+            endpoint.consecutive_failures = 0
+            endpoint.tokens += tokens
+            endpoint.outcomes["ok"] = endpoint.outcomes.get("ok", 0) + 1
+            endpoint.seconds.observe(seconds)
+            slot[1] = tokens
+        METRICS.inc("llm_endpoint_calls_total", endpoint=endpoint.name, outcome="ok")
+        METRICS.observe("llm_endpoint_seconds", seconds, endpoint=endpoint.name)
+
+    def failed(self, endpoint, seconds, exc):
+        """Bench the endpoint as the error deserves; True if another endpoint should be tried."""
+        kind = classify_error(exc)
+        now = time.time()
+        with self.lock:
+            endpoint.consecutive_failures += 1
+            endpoint.outcomes[kind] = endpoint.outcomes.get(kind, 0) + 1
+            endpoint.seconds.observe(seconds)
+
+            if kind == RATE_LIMIT:
+                bench = reset_delay(exc) or min(TRANSPORT_BENCH_CAP, 2 ** (endpoint.consecutive_failures - 1))
+            elif kind == TRANSPORT:
+                bench = min(TRANSPORT_BENCH_CAP, 0.5 * 2 ** (endpoint.consecutive_failures - 1))
+            elif kind == FATAL:
+                bench = FATAL_BENCH
+            else:
+                bench = 0.0
+            endpoint.benched_until = max(endpoint.benched_until, now + bench)
+
+        METRICS.inc("llm_endpoint_calls_total", endpoint=endpoint.name, outcome=kind)
+        METRICS.observe("llm_endpoint_seconds", seconds, endpoint=endpoint.name)
+
+        # a malformed answer is the model's doing, not the endpoint's
+        return kind != VALIDATION
+
+    def failover(self, endpoint):
+        with self.lock:
+            endpoint.failovers += 1
+        METRICS.inc("llm_failovers_total", endpoint=endpoint.name)
+
+    # ---------- report ----------
+
+    def report(self):
+        """Per-endpoint stats, one dict each."""
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    "endpoint": e.name,
+                    "calls": sum(e.outcomes.values()),
+                    "outcomes": dict(e.outcomes),
+                    "failovers": e.failovers,
+                    "latency_ewma_s": None if e.latency is None else round(e.latency, 3),
+                    "latency_p95_s": None if not e.seconds.count else round(e.seconds.quantile(0.95), 3),
+                    "tokens": e.tokens,
+                    "budget_left": round(e.budget(now), 2),
+                    "benched_s": round(max(e.benched_until - now, 0.0), 1),
+                }
+                for e in self.endpoints
+            ]
+
+    def print_report(self):
+        print(f"\n{'endpoint':<16}{'calls':>7}{'ok':>7}{'failover':>9}{'ewma s':>8}{'p95 s':>8}{'tokens':>9}")
+        for r in self.report():
+            print(
+                f"{r['endpoint']:<16}{r['calls']:>7}{r['outcomes'].get('ok', 0):>7}{r['failovers']:>9}"
+                f"{r['latency_ewma_s'] if r['latency_ewma_s'] is not None else '-':>8}"
+                f"{r['latency_p95_s'] if r['latency_p95_s'] is not None else '-':>8}{r['tokens']:>9}"
+            )
+
+
+class _RoutedCompletions:
+
+    def __init__(self, router, is_async):
+        self.router = router
+        self.is_async = is_async
+
+    def create_with_completion(self, **kwargs):
+        if self.is_async:
+            return self._acreate(**kwargs)
+
+        tried, last_exc = set(), None
+        while (picked := self.router.pick(tried)) is not None:
+            endpoint, slot = picked
+            tried.add(endpoint.name)
+            start = time.perf_counter()
+            try:
+                resp, completion = endpoint.backend.client.chat.completions.create_with_completion(**kwargs)
+            except Exception as exc:
+                last_exc = exc
+                if not self.router.failed(endpoint, time.perf_counter() - start, exc):
+                    raise
+                self.router.failover(endpoint)
+                continue
+            self.router.succeeded(endpoint, slot, time.perf_counter() - start, getattr(completion, "usage", None))
+            return resp, completion
+
+        raise last_exc or NoEndpointAvailable(self.router.wait_time())
+
+    async def _acreate(self, **kwargs):
+        tried, last_exc = set(), None
+        while (picked := self.router.pick(tried)) is not None:
+            endpoint, slot = picked
+            tried.add(endpoint.name)
+            start = time.perf_counter()
+            try:
+                resp, completion = await endpoint.backend.async_client.chat.completions.create_with_completion(**kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                last_exc = exc
+                if not self.router.failed(endpoint, time.perf_counter() - start, exc):
+                    raise
+                self.router.failover(endpoint)
+                continue
+            self.router.succeeded(endpoint, slot, time.perf_counter() - start, getattr(completion, "usage", None))
+            return resp, completion
+
+        raise last_exc or NoEndpointAvailable(self.router.wait_time())
+
+    def create(self, **kwargs):
+        if self.is_async:
+            async def first():
+                return (await self._acreate(**kwargs))[0]
+            return first()
+        return self.create_with_completion(**kwargs)[0]
+
+
+def build_endpoint(spec, i=0):
+    """Endpoint from one config entry: fake, OpenAI-compatible base_url, or provider model."""
+    name = spec.get("name", f"endpoint-{i}")
+    limits = {"weight": spec.get("weight", 1.0), "rpm": spec.get("rpm"), "tpm": spec.get("tpm")}
+
+    if "fake" in spec:
+        return Endpoint(name, FakeBackend(**spec["fake"]), **limits)
+
+    api_key = os.getenv(spec["api_key_env"]) if spec.get("api_key_env") else spec.get("api_key")
+    backend = InstructorBackend(spec["model"], base_url=spec.get("base_url"), api_key=api_key)
+    return Endpoint(name, backend, **limits)
@@ -1,188 +1,163 @@
 import pandas as pd
 import os
-from glob import glob
-import re
+import argparse
+from functools import partial
+
+from cleaning import clean_frame, group_files_by_country, print_summary, run_clean_jobs
+from intermediate import LazyFrame
+from id_index import INDEX_NAME, MessageIdIndex, claim_outputs, drop_seen_ids, id_text
+from paths import PATHS, input_files
+from manifest import MANIFEST_NAME, Manifest, appended_mask, plan_groups, watermark
+from streaming import ExcelChunkWriter, clean_stream
 
 # =========================
 # 📁 INPUT & OUTPUT FOLDER
 # =========================
-input_folder = r"C:\Users\Moha8550\OneDrive - Lyca Group\Desktop\SocialMedia_datapreprocessing_folder\concatfiles"
-output_folder = r"C:\Users\Moha8550\OneDrive - Lyca Group\Desktop\SocialMedia_datapreprocessing_folder\countrywise_output"
-os.makedirs(output_folder, exist_ok=True)
+input_folder = PATHS["input"]
+output_folder = PATHS["cleaned"]
 
-# =========================
-# 🌍 COUNTRY MAP
-# =========================
-country_map = {
-    "BEL": "Belgium",
-    "FRA": "France",
-    "GER": "Germany",
-    "ITA": "Italy",
-    "NLD": "Netherlands",
-    "PRT": "Portugal",
-    "UGA": "Uganda",
-    "GBR": "UK"
-}
+CLEANED_COLUMNS = ['country','platform','Message','text','Link',
+                   'Publish Date','Message Id','Language','User Name','Gender']
 
-# =========================
-# 🌐 LANGUAGE MAP
-# =========================
-language_map = {
-    'Albanian':'albanian','English':'english',None:None,'Afrikaans':'afrikaans',
-    'Català - Catalan (beta)':'catalan','Deutsch - German':'german',
-    'Français - French':'french','বাংলা - Bengali':'bengali',
-    'Dansk - Danish':'danish','Hmong':'hmong','Gaeilge - Irish (beta)':'irish',
-    'Hausa':'hausa','Esperanto':'esperanto','Estonian':'estonian',
-    'Čeština - Czech':'czech','Belarusian':'belarusian',
-    'Azerbaijani':'azerbaijani','Bosnian':'bosnian',
-    'Haitian Creole':'haitiancreole','Bulgarian':'bulgarian',
-    'Galego - Galician (beta)':'galician','Nepali':'nepali',
-    'Português - Portuguese':'portuguese','nan':None,
-    'Italiano - Italian':'italian','Euskara - Basque (beta)':'basque',
-    'Tagalog':'tagalog','Croatian':'croatian',
-    'Bahasa Indonesia - Indonesian':'indonesian',
-    'Nyanja':'nyanja','Igbo':'igbo','العربية - Arabic':'arabic',
-    'Español - Spanish':'spanish','Nederlands - Dutch':'dutch',
-    'Corsican':'corsican','Türkçe - Turkish':'turkish',
-    'Sindhi':'sindhi','Polski - Polish':'polish',
-    'Maltese':'maltese','Latin':'latin','Welsh':'welsh',
-    'Cebuano':'cebuano','Română - Romanian':'romanian',
-    'Kazakh':'kazakh','Hawaiian':'hawaiian',
-    'Swahili':'swahili','Suomi - Finnish':'finnish',
-    'Русский - Russian':'russian','Macedonian':'macedonian',
-    'Luxembourgish':'luxembourgish',
-    'Magyar - Hungarian':'hungarian',
-    'Norsk - Norwegian':'norwegian',
-    'Yoruba':'yoruba','Somali':'somali',
-    'Latvian':'latvian','Lithuanian':'lithuanian',
-    'हिन्दी - Hindi':'hindi',
-    'Українська мова - Ukrainian':'ukrainian',
-    'Icelandic':'icelandic',
-    'Svenska - Swedish':'swedish'
-}
+def output_path(country):
+    return os.path.join(output_folder, f"{country}_cleaned.xlsx")
 
-# =========================
-# 😀 EMOJI PATTERN
-# =========================
-emoji_pattern = re.compile(
-    "[\U0001F600-\U0001F64F"
-    "\U0001F300-\U0001F5FF"
-    "\U0001F680-\U0001F6FF"
-    "\U0001F1E0-\U0001F1FF"
-    "\U00002700-\U000027BF"
-    "\U0001F900-\U0001F9FF"
-    "\U0001FA00-\U0001FAFF]+",
-    flags=re.UNICODE
-)
 
-# =========================
-# 🔍 PLATFORM FUNCTION
-# =========================
-def get_platform(media_type: str):
-    if not isinstance(media_type, str):
-        return "unknown"
-
-    m = media_type.strip().lower()
-
-    if "twitter" in m:
-        return "X"
-    elif "facebook" in m:
-        return "facebook"
-    elif "linkedin" in m:
-        return "linkedin"
-    elif "tiktok" in m:
-        return "tiktok"
-    elif "instagram" in m:
-        return "instagram"
-    elif "trustpilot" in m:
-        return "trustpilot"
-    else:
-        return "other"
+def message_ids(country):
+    return pd.read_excel(output_path(country), usecols=['Message Id'])['Message Id']
 
-# =========================
-# 🔤 SAFE CONCAT
-# =========================
-def safe_concat(*args):
-    return " ".join([str(a).strip() for a in args if pd.notna(a) and str(a).strip() != ""])
+
+def drop_messages(country, ids):
+    """Remove the rows with these Message Ids from the country's output."""
+    df = pd.read_excel(output_path(country))
+    df[~df['Message Id'].map(id_text).isin(ids)].to_excel(output_path(country), index=False)
 
 # =========================
-# 📄 READ ALL FILES
+# 🧹 ONE COUNTRY
 # =========================
-files = glob(f"{input_folder}\\*.xlsx")
-
-d2 = {}
-
-for file in files:
-
-    print(f"\nProcessing: {file}")
-
-    df = pd.read_excel(file)
-
-    for col in ['Title','Message','Description','Media Type']:
-        if col not in df.columns:
-            df[col] = ""
-
-    # 🌍 COUNTRY FROM FILENAME
-    filename = os.path.basename(file)
-    raw = filename.split("(")[0].strip()
-
-    if len(raw) == 3:
-        country = country_map.get(raw.upper(), raw)
-    else:
-        country = raw.title()
-
-    # 🔁 LINKEDIN FIX
-    df['Message'] = df.apply(
-        lambda x: x['Description']
-        if (
-            isinstance(x['Media Type'], str)
-            and x['Media Type'].strip().lower() == 'linkedin mentions'
-            and isinstance(x['Message'], str)
-            and x['Message'].strip().lower() == '(no comment)'
-            and pd.notna(x['Description'])
-            and str(x['Description']).strip() != ""
-        )
-        else x['Message'],
-        axis=1
-    )
-
-    # 📝 TEXT
-    df['text'] = df.apply(lambda x: safe_concat(x['Message'], x['Description'], x['Title']), axis=1)
+def clean_country(country, country_files, stream=False, chunk_size=50_000, since=None, index_path=None):
+    """Returns (LazyFrame of the output, {file: watermark}).
 
-    # 📅 DATE
-    df['Publish Date'] = pd.to_datetime(df['Publish Date'], dayfirst=True, errors='coerce')
+    since[country], when present, holds the previous watermark of each
+    changed file: only its appended rows are cleaned and merged into the
+    existing output.
+    """
+    plan = (since or {}).get(country)
 
-    # ❌ DUPLICATES
-    df = df.drop_duplicates('Message Id', keep='last')
+    if stream:
+        return stream_country(country, country_files, chunk_size, index_path), {}
 
-    # ❌ NULL MESSAGE
-    df = df[df.Message.notna()]
+    raw = {f: pd.read_excel(f) for f in country_files}
+    marks = {f: watermark(df) for f, df in raw.items()}
 
-    # 🌐 LANGUAGE STANDARDIZATION
-    df['Language'] = df['Language'].astype(str).str.strip()
-    df['Language'] = df['Language'].replace("nan", None)
-    df['Language'] = df['Language'].map(language_map).fillna(df['Language'])
-    df['Language'] = df['Language'].apply(lambda x: x.title() if isinstance(x,str) else x)
+    if plan is not None:
+        raw = {f: df[appended_mask(df, plan.get(f))] for f, df in raw.items()}
 
-    # 📏 LENGTH + EMOJI
-    df['msg_length'] = df['Message'].astype(str).apply(len)
-    df["has_emoji"] = df["Message"].astype(str).apply(lambda x: bool(emoji_pattern.search(x)))
-    df = df[~((df.msg_length == 1) & (df.has_emoji == False))]
+    df = pd.concat(raw.values(), ignore_index=True)
 
-    # 🟣 PLATFORM
-    df['platform'] = df['Media Type'].apply(get_platform)
+    # 🧹 LINKEDIN FIX, TEXT, DATE, DUPLICATES, LANGUAGE, EMOJI, PLATFORM
+    df = clean_frame(df, country, with_text=True)
 
-    # 🌍 INSERT COUNTRY
-    df.insert(0,'country',country)
+    # 🪪 DROP MENTIONS ALREADY IN ANOTHER COUNTRY'S OUTPUT (ANY FILE, ANY RUN)
+    if index_path is not None:
+        df = drop_seen_ids(df, country, index_path, rebuild=plan is None)
 
     # 🧾 FINAL
-    final_df = df[['country','platform','Message','text','Link',
-                   'Publish Date','Message Id','Language','User Name','Gender']]
+    final_df = df[CLEANED_COLUMNS]
+
+    # ➕ MERGE NEW ROWS INTO LAST RUN'S OUTPUT
+    if plan is not None:
+        previous = pd.read_excel(output_path(country))
+        final_df = pd.concat([previous, final_df], ignore_index=True).drop_duplicates('Message Id', keep='last')
+        print(f"➕ {country}: {len(df)} new rows merged into {len(previous)}")
+
+    final_df.to_excel(output_path(country),index=False)
+
+    # the parent only needs a handle: no frame is pickled back from the worker
+    return LazyFrame(pd.read_excel, output_path(country)), marks
+
+
+def stream_country(country, country_files, chunk_size, index_path=None):
+    """Bounded-memory variant: cleaned chunks are appended to the xlsx."""
+
+    writer = ExcelChunkWriter(output_path(country), CLEANED_COLUMNS)
+
+    if index_path is not None:
+        index = MessageIdIndex(index_path)
+        index.release(country)
+        index.close()
+
+    for df in clean_stream(country_files, country, chunk_size, with_text=True):
+
+        if index_path is not None:
+            df = drop_seen_ids(df, country, index_path)
+
+        writer.write(df[CLEANED_COLUMNS])
+
+    writer.close()
+
+    return LazyFrame(pd.read_excel, output_path(country))
+
+# =========================
+# 📄 READ ALL FILES
+# =========================
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Clean social media exports per country.")
+    parser.add_argument("--workers", type=int, default=1, help="parallel worker processes (1 = sequential)")
+    parser.add_argument("--stream", action="store_true", help="read workbooks in bounded-memory chunks")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="rows per chunk with --stream")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rebuild every country")
+    parser.add_argument("--no-id-index", action="store_true",
+                        help="keep mentions already written to another country's output")
+    args = parser.parse_args()
+
+    files = input_files(input_folder)
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    # 🧾 SKIP UNCHANGED EXPORTS, APPEND-ONLY UPDATES FOR CHANGED ONES
+    manifest = Manifest(os.path.join(output_folder, MANIFEST_NAME))
+    groups = group_files_by_country(files)
+    since, files, skipped = plan_groups(manifest, groups, lambda c: os.path.exists(output_path(c)), args.full)
+    if args.stream:
+        # streamed countries are always rewritten from all of their files
+        since = {}
+        files = [f for country, fs in groups.items() if country not in skipped for f in fs]
+    if skipped:
+        print(f"⏭️ Unchanged since last run: {', '.join(skipped)}")
+
+    d2 = {}
+
+    index_path = None if args.no_id_index else os.path.join(output_folder, INDEX_NAME)
+
+    # parallel workers would claim ids in whatever order they finish
+    parallel_ids = index_path is not None and args.workers > 1
+
+    results = run_clean_jobs(
+        partial(clean_country, stream=args.stream, chunk_size=args.chunk_size, since=since,
+                index_path=None if parallel_ids else index_path),
+        files, args.workers,
+    )
+
+    # 🪪 SHARED MESSAGE IDS GO TO THE SAME COUNTRY A SEQUENTIAL RUN PICKS
+    if parallel_ids:
+        cleaned = {country for country, _, _, _, error in results if error is None}
+        claim_outputs(index_path, [
+            (country, country not in since, partial(message_ids, country), partial(drop_messages, country))
+            for country in groups if country in cleaned
+        ])
 
-    d2[country] = final_df
+    for country, country_files, _, result, error in results:
+        if error is not None:
+            continue
+        handle, marks = result
+        d2[country] = handle
+        for f in country_files:
+            manifest.record(os.path.basename(f), f, marks.get(f))
 
-    final_df.to_excel(f"{output_folder}\\{country}_cleaned.xlsx",index=False)
+    manifest.save()
 
-    print(f"✅ {country} Done")
+    print_summary(results)
 
-print("\n🎉 All files processed successfully!")
\ No newline at end of file
+    print("\n🎉 All files processed successfully!")
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from cleaning import clean_frame
+
+# =========================
+# 🌊 STREAMING EXCEL READER
+# =========================
+# openpyxl read-only mode walks the sheet row by row, so peak memory is one
+# chunk of rows whatever the file size. The Message Id -> last position map
+# of the dedup pass lives in a scratch SQLite file, not in a dict, so it does
+# not grow with the number of unique ids either.
+
+BATCH = 900  # below SQLite's default bound-parameter limit
+
+
+def iter_sheet_rows(path):
+    """Yield the header, then every data row, of the first sheet."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in wb.worksheets[0].iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def iter_chunks(files, chunk_size=50_000, columns=None):
+    """Stream one or more workbooks as DataFrames of at most chunk_size rows.
+
+    Each chunk's index is the row's global position across all files, which
+    is what last_positions() keys on.
+    """
+    pos = 0
+
+    for path in files:
+        rows = iter_sheet_rows(path)
+        header = next(rows, None)
+        if header is None:
+            continue
+
+        header = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        keep = [i for i, h in enumerate(header) if columns is None or h in columns]
+        names = [header[i] for i in keep]
+
+        buf = []
+        for row in rows:
+            buf.append([row[i] if i < len(row) else None for i in keep])
+            if len(buf) == chunk_size:
+                yield pd.DataFrame(buf, columns=names, index=range(pos, pos + len(buf)))
+                pos += len(buf)
+                buf = []
+
+        if buf:
+            yield pd.DataFrame(buf, columns=names, index=range(pos, pos + len(buf)))
+            pos += len(buf)
+
+
+def id_key(message_id):
+    """Text key equal for ids drop_duplicates treats as equal; missing ids share one."""
+    if pd.isna(message_id):
+        return "na:"
+    if isinstance(message_id, float) and message_id.is_integer():
+        message_id = int(message_id)
+    return f"{type(message_id).__name__}:{message_id}"
+
+
+class LastPositions:
+    """On-disk Message Id -> position of its last occurrence (a SQLite B-tree)."""
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="last_positions_", suffix=".sqlite")
+        os.close(fd)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE last (message_id TEXT PRIMARY KEY, pos INTEGER NOT NULL) WITHOUT ROWID")
+
+    def update(self, keys, positions):
+        """Record a chunk in order, so the last occurrence wins."""
+        self.conn.executemany(
+            "INSERT INTO last (message_id, pos) VALUES (?, ?) "
+            "ON CONFLICT (message_id) DO UPDATE SET pos = excluded.pos",
+            zip(keys, positions),
+        )
+        self.conn.commit()
+
+    def lookup(self, keys):
+        """{key: last position} for the distinct keys of one chunk."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(keys), BATCH):
+            batch = keys[start:start + BATCH]
+            marks = ",".join("?" * len(batch))
+            found.update(self.conn.execute(f"SELECT message_id, pos FROM last WHERE message_id IN ({marks})", batch))
+        return found
+
+    def close(self):
+        self.conn.close()
+        os.remove(self.path)
+
+
+def chunk_keys(chunk):
+    ids = chunk["Message Id"] if "Message Id" in chunk.columns else pd.Series(None, index=chunk.index)
+    return [id_key(i) for i in ids]
+
+
+def last_positions(files, chunk_size=50_000):
+    """First pass: Message Id -> position of its last occurrence, as a LastPositions.
+
+    This is the incremental form of drop_duplicates('Message Id', keep='last');
+    missing ids share one key, exactly as drop_duplicates treats NaN. The
+    caller closes the returned index.
+    """
+    last = LastPositions()
+    try:
+        for chunk in iter_chunks(files, chunk_size, columns={"Message Id"}):
+            last.update(chunk_keys(chunk), [int(pos) for pos in chunk.index])
+    except BaseException:
+        last.close()
+        raise
+    return last
+
+
+def clean_stream(files, country, chunk_size=50_000, with_text=False):
+    """Yield cleaned chunks equivalent to clean_frame on the concatenated files."""
+    last = last_positions(files, chunk_size)
+
+    try:
+        for chunk in iter_chunks(files, chunk_size):
+            keys = chunk_keys(chunk)
+            positions = last.lookup(keys)
+            keep = [positions.get(key) == pos for pos, key in zip(chunk.index, keys)]
+
+            chunk = chunk[keep]
+            if chunk.empty:
+                continue
+
+            yield clean_frame(chunk.copy(), country, with_text=with_text)
+    finally:
+        last.close()
+
+# =========================
+# ✍️ STREAMING EXCEL WRITER
+# =========================
+class ExcelChunkWriter:
+    """Append DataFrame chunks to an .xlsx with openpyxl write-only mode."""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet()
+        self.ws.append(list(columns))
+        self.rows = 0
+
+    def write(self, df: pd.DataFrame):
+        for row in df.itertuples(index=False, name=None):
+            self.ws.append([None if _is_missing(v) else v for v in row])
+            self.rows += 1
+
+    def close(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.wb.save(self.path)
+
+
+def _is_missing(value):
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
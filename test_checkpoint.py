@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import classificationSocial as classifier
+from checkpoint import Checkpoint, apply_dtypes, row_key
+
+DTYPES = {"sentiment": ["negative", "neutral", "positive"], "sentiment_score": "float32"}
+
+
+def test_scores_leave_the_checkpoint_as_float64(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "c.jsonl"), dtypes=DTYPES)
+    checkpoint.append("id:1", 0, {"sentiment": "positive", "sentiment_score": 0.79})
+    checkpoint.append("id:2", 1, {"sentiment": "negative", "sentiment_score": 0.41})
+
+    assert checkpoint.record("id:1")["sentiment_score"] == 0.79
+    frame = checkpoint.to_frame()
+    assert frame["sentiment_score"].dtype == np.float64
+    assert frame["sentiment_score"].tolist() == [0.79, 0.41]
+
+
+def test_resume_merges_filled_in_fields(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    checkpoint = Checkpoint(path, dtypes=DTYPES)
+    checkpoint.append("id:1", 0, {"sentiment": "positive"})
+    checkpoint.append("id:1", 0, {"sentiment_score": 0.5})
+    checkpoint.close()
+
+    resumed = Checkpoint(path, resume=True, dtypes=DTYPES)
+    assert len(resumed) == 1
+    assert resumed.record("id:1") == {"sentiment": "positive", "sentiment_score": 0.5}
+
+
+def test_reread_output_keeps_exact_scores(data_root, tmp_path):
+    os.makedirs(data_root["classified"])
+    checkpoint = Checkpoint(str(tmp_path / "c.jsonl"), dtypes=classifier.RESULT_DTYPES)
+    checkpoint.append("id:1", 0, {"sentiment": "positive", "sentiment_score": 0.79})
+    checkpoint.close()
+
+    frame = classifier.write_output("Belgium", checkpoint).load()
+    assert frame["sentiment_score"].tolist() == [0.79]
+    assert isinstance(frame["sentiment"].dtype, pd.CategoricalDtype)
+
+
+def test_apply_dtypes_widens_floats():
+    df = apply_dtypes(pd.DataFrame({"sentiment_score": [np.float32(0.79)]}), DTYPES)
+    assert df["sentiment_score"].tolist() == [0.79]
+
+
+def test_row_key_is_stable_across_id_dtypes():
+    keys = {
+        row_key(pd.Series({"Message Id": 123}), 0),
+        row_key(pd.Series({"Message Id": 123.0}), 1),
+        row_key(pd.Series({"message_id": "123"}), 2),
+        row_key(pd.Series({"message_id": "123.0"}), 3),
+    }
+    assert keys == {"id:123"}
+    assert row_key(pd.Series({"Message Id": np.nan}), 7) == "row:7"
+
+
+def test_old_float_keys_are_migrated_on_load(tmp_path):
+    path = tmp_path / "c.jsonl"
+    path.write_text('{"_key": "id:123.0", "_pos": 0, "sentiment": "positive"}\n', encoding="utf-8")
+
+    checkpoint = Checkpoint(str(path), resume=True, dtypes=DTYPES)
+    assert checkpoint.done("id:123")
+    checkpoint.append("id:123", 0, {"sentiment_score": 0.5})
+    assert len(checkpoint) == 1
+    assert checkpoint.record("id:123.0") == {"sentiment": "positive", "sentiment_score": 0.5}
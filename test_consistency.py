@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import classificationSocial as classifier
+from consistency import check, repair_request
+from prompt_builder import reduced_model
+
+Insights = classifier.TrustpilotReviewInsights
+ScoreOnly = reduced_model(Insights, ["sentiment_score"])
+
+
+class RepairClient:
+    """Stands in for backend.client; answers every repair with repaired and records the fields asked."""
+
+    def __init__(self, **repaired):
+        self.repaired = repaired
+        self.asked = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create_with_completion(self, messages, response_model, **kwargs):
+        self.asked.append(tuple(response_model.model_fields))
+        return response_model(**self.repaired), SimpleNamespace(usage=None)
+
+
+def test_rules_spanning_stored_and_new_fields_are_checked():
+    stored = {"sentiment_label": "negative"}
+    assert check(ScoreOnly(sentiment_score=0.7)) == []
+    assert [(name, repair) for name, _, repair in check(ScoreOnly(sentiment_score=0.7), stored)] == [
+        ("score_sign", ("sentiment_score",)),
+    ]
+    assert check(ScoreOnly(sentiment_score=-0.7), stored) == []
+
+
+def test_only_fields_asked_for_now_are_repaired():
+    # praise_resolution repairs resolution_status, which is stored: re-ask the new field instead
+    issue_only = reduced_model(Insights, ["primary_issue_type"])(primary_issue_type="no_issue_pure_praise")
+    stored = {"resolution_status": "resolved", "sentiment_label": "positive"}
+    broken = check(issue_only, stored)
+    assert [(name, repair) for name, _, repair in broken] == [("praise_resolution", ("primary_issue_type",))]
+
+    messages, model, fields = repair_request(Insights, issue_only, "great", broken, stored)
+    assert fields == ("primary_issue_type",)
+    assert "resolution_status=resolved" in messages[1]["content"]
+
+
+def test_fill_in_answer_is_repaired_against_the_stored_row(monkeypatch):
+    client = RepairClient(sentiment_score=-0.5)
+    monkeypatch.setattr(classifier, "backend", SimpleNamespace(client=client))
+    monkeypatch.setattr(classifier, "REPAIR", True)
+
+    stored = classifier.stored_values({"sentiment": "negative", "churn_risk": None})
+    fixed = classifier.repair_ticket("awful", ScoreOnly(sentiment_score=0.7), stored)
+
+    assert client.asked == [("sentiment_score",)]
+    assert fixed.sentiment_score == -0.5
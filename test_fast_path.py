@@ -0,0 +1,18 @@
+from fast_path import NEGATIVE, NEUTRAL, POSITIVE, rule_classify
+
+
+def test_bare_tags_links_and_mentions_are_neutral():
+    assert rule_classify("#lycamobile") == NEUTRAL
+    assert rule_classify("@LycaMobileUK https://t.co/abc") == NEUTRAL
+
+
+def test_tags_carrying_a_verdict_go_to_the_model():
+    assert rule_classify("#scam") is None
+    assert rule_classify("#worstservice") is None
+    assert rule_classify("@lyca #BestNetwork") is None
+
+
+def test_short_lexical_messages_are_decided_locally():
+    assert rule_classify("thank you so much") == POSITIVE
+    assert rule_classify("scam") == NEGATIVE
+    assert rule_classify("my data stopped working after the top up yesterday evening") is None
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from hedging import DeadlineExceeded, HedgedBackend
+
+Insights = type("Insights", (), {})  # response model; only its name keys the latency samples
+
+
+class Slow:
+    """Backend stub: call n takes delays[n] seconds (the last delay repeats) and ignores its timeout."""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = 0
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=self))
+        self.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            create_with_completion=self.acreate,
+        )))
+
+    def _next(self):
+        n, self.calls = self.calls, self.calls + 1
+        return n, self.delays[min(n, len(self.delays) - 1)]
+
+    def create_with_completion(self, **kwargs):
+        n, delay = self._next()
+        time.sleep(delay)
+        return f"answer {n}", None
+
+    async def acreate(self, **kwargs):
+        n, delay = self._next()
+        await asyncio.sleep(delay)
+        return f"answer {n}", None
+
+
+def warmed(backend, **options):
+    """HedgedBackend whose p95 for the 'Insights' model is 10ms."""
+    hedged = HedgedBackend(backend, **options)
+    hedged.samples["Insights"] = [0.01] * 20
+    return hedged
+
+
+def test_hung_call_gives_up_at_the_deadline():
+    hedged = HedgedBackend(Slow(2.0), deadline=0.1)
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        hedged.client.chat.completions.create_with_completion(messages=[], response_model=Insights)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_hung_async_call_gives_up_at_the_deadline():
+    hedged = HedgedBackend(Slow(2.0), deadline=0.1)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(asyncio.wait_for(
+            hedged.async_client.chat.completions.create_with_completion(messages=[], response_model=Insights), 1.0,
+        ))
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    hedged = warmed(Slow(1.0, 0.0), deadline=5.0, hedge=True, budget=1.0)
+    start = time.perf_counter()
+    answer, _ = hedged.client.chat.completions.create_with_completion(messages=[], response_model=Insights)
+    assert answer == "answer 1"
+    assert hedged.hedges == 1
+    assert time.perf_counter() - start < 0.5
+
+
+def test_hedges_stay_within_the_budget():
+    hedged = warmed(Slow(0.05), deadline=5.0, hedge=True, budget=0.0)
+    hedged.client.chat.completions.create_with_completion(messages=[], response_model=Insights)
+    assert hedged.hedges == 0
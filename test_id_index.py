@@ -0,0 +1,44 @@
+import pandas as pd
+
+from id_index import MessageIdIndex, claim_outputs, drop_seen_ids, id_text
+
+
+def test_id_text_folds_int_float_and_text_ids():
+    assert id_text(123) == id_text(123.0) == id_text("123") == id_text("123.0") == "123"
+    assert id_text("abc.0") == "abc.0"
+
+
+def test_first_owner_keeps_an_id_across_runs(tmp_path):
+    path = str(tmp_path / "message_ids.sqlite")
+    belgium = pd.DataFrame({"Message Id": [1.0, 2.0, None]})
+    france = pd.DataFrame({"Message Id": ["2", "3"]})
+
+    assert len(drop_seen_ids(belgium, "Belgium", path)) == 3
+    assert drop_seen_ids(france, "France", path)["Message Id"].tolist() == ["3"]
+
+    # a rerun of Belgium keeps its own ids; a rebuild of France gives 3 up first
+    assert len(drop_seen_ids(belgium, "Belgium", path)) == 3
+    index = MessageIdIndex(path)
+    index.release("France")
+    assert index.claim(["3"], "Belgium") == {"3": "Belgium"}
+    index.close()
+
+
+def test_claim_outputs_follows_the_given_order(tmp_path):
+    path = str(tmp_path / "message_ids.sqlite")
+    outputs = {"Belgium": {"1", "2"}, "France": {"2", "3"}}
+    dropped = {}
+
+    def settle(order):
+        dropped.clear()
+        claim_outputs(path, [
+            (owner, True, lambda owner=owner: sorted(outputs[owner]), lambda ids, owner=owner: dropped.update({owner: ids}))
+            for owner in order
+        ])
+
+    settle(["Belgium", "France"])
+    assert dropped == {"France": {"2"}}
+
+    # rebuilding both in the same order gives the same owners again
+    settle(["Belgium", "France"])
+    assert dropped == {"France": {"2"}}
@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+
+import classificationSocial as classifier
+from conftest import FAKE, make_messages
+from intermediate import write_messages
+from manifest import MANIFEST_NAME, Manifest, appended_mask, watermark
+
+
+def manifest_fields(paths, name="Belgium.parquet"):
+    manifest = Manifest(os.path.join(paths["classified"], MANIFEST_NAME))
+    return manifest.check(name, os.path.join(paths["message_only"], "parquet"))[1]["fields"]
+
+
+def test_appended_mask_follows_the_watermark():
+    old = make_messages(5)
+    grown = make_messages(8)
+    assert appended_mask(grown, watermark(old, "created_date", "message_id"), "created_date", "message_id").tolist() == (
+        [False] * 5 + [True] * 3
+    )
+
+
+def test_fields_run_after_append_does_not_vouch_for_other_fields(data_root, capsys):
+    parquet = os.path.join(data_root["message_only"], "parquet")
+
+    write_messages(make_messages(20), parquet)
+    classifier.main(["--full", "--fields", "sentiment", *FAKE])
+    assert "sentiment_label" in manifest_fields(data_root)
+
+    # the cleaner appends 5 rows, then a different field is asked for
+    write_messages(make_messages(25), parquet)
+    classifier.main(["--fields", "churn_risk", *FAKE])
+    assert manifest_fields(data_root) == ["churn_risk"]
+
+    # sentiment is asked for again: the new rows must get it, not be skipped
+    capsys.readouterr()
+    classifier.main(["--fields", "sentiment", *FAKE])
+    assert "unchanged since last run" not in capsys.readouterr().out
+
+    out = pd.read_excel(classifier.output_path("Belgium"))
+    assert len(out) == 25
+    assert out["sentiment"].notna().all()
+    assert out["churn_risk"].notna().all()
+    assert set(manifest_fields(data_root)) >= {"sentiment_label", "churn_risk"}
+
+
+def test_unchanged_input_with_the_same_fields_is_skipped(data_root, capsys):
+    write_messages(make_messages(10), os.path.join(data_root["message_only"], "parquet"))
+    classifier.main(["--fields", "sentiment", *FAKE])
+
+    capsys.readouterr()
+    classifier.main(["--fields", "sentiment", *FAKE])
+    assert "Belgium.parquet unchanged since last run" in capsys.readouterr().out
@@ -0,0 +1,45 @@
+import os
+import queue
+
+import classificationSocial as classifier
+import pipeline
+from checkpoint import Checkpoint
+from conftest import make_messages
+from intermediate import write_messages
+from manifest import MANIFEST_NAME, UNCHANGED, Manifest, content_hash, fingerprint
+
+
+def run_write_stage(paths, jobs_for):
+    manifests = (
+        Manifest(os.path.join(paths["message_only"], MANIFEST_NAME)),
+        Manifest(os.path.join(paths["classified"], MANIFEST_NAME)),
+    )
+    jobs = queue.Queue()
+    for job in jobs_for:
+        jobs.put(job)
+    jobs.put(None)
+
+    d2_llm, errors = {}, []
+    groups = {country: [] for country, *_ in jobs_for}
+    pipeline.write_stage(jobs, ["sentiment_label"], groups, *manifests, paths["classified"], d2_llm, errors)
+    return manifests[1], d2_llm, errors
+
+
+def test_missing_path_fingerprints_as_empty(tmp_path):
+    missing = str(tmp_path / "country=France")
+    assert fingerprint(missing) == {"size": 0, "mtime": 0.0}
+    assert content_hash(missing) == content_hash(str(tmp_path / "also-missing"))
+
+
+def test_country_with_every_row_dropped_is_recorded(data_root):
+    # Belgium has rows; France lost all of its rows to the id index, so it has no partition
+    write_messages(make_messages(3), classifier.PARQUET_INPUT)
+    empty = Checkpoint(classifier.checkpoint_path("France.parquet"), dtypes=classifier.RESULT_DTYPES)
+
+    manifest, d2_llm, errors = run_write_stage(data_root, [("France", empty, set(), 0.0)])
+
+    assert errors == []
+    assert "France" in d2_llm
+    status, entry = manifest.check("France.parquet", os.path.join(classifier.PARQUET_INPUT, "country=France"))
+    assert status == UNCHANGED
+    assert entry["rows"] == 0
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from backends import FakeBackend
+from retry_policy import RATE_LIMIT, classify_error, reset_delay
+from router import Endpoint, NoEndpointAvailable, RoutedBackend
+
+
+class Answer(BaseModel):
+    label: str
+
+
+def call(router, i):
+    return router.client.chat.completions.create_with_completion(
+        messages=[{"role": "user", "content": f"review {i}"}], response_model=Answer,
+    )
+
+
+def test_full_rate_windows_wait_for_the_oldest_slot():
+    router = RoutedBackend([
+        Endpoint("a", FakeBackend(latency_ms=0, latency_dist="fixed"), rpm=2),
+        Endpoint("b", FakeBackend(latency_ms=0, latency_dist="fixed"), rpm=2),
+    ], seed=0)
+
+    for i in range(4):
+        call(router, i)
+
+    with pytest.raises(NoEndpointAvailable) as caught:
+        call(router, 4)
+
+    # neither endpoint is benched; both are out of requests until their
+    # first slot leaves the one-minute window
+    assert classify_error(caught.value) == RATE_LIMIT
+    assert 55 < reset_delay(caught.value) <= 60
+
+
+def test_wait_time_is_the_earliest_ready_endpoint():
+    now = time.time()
+    full = Endpoint("full", FakeBackend(), rpm=1)
+    full.window.append([now - 50, 0])
+    benched = Endpoint("benched", FakeBackend())
+    benched.benched_until = now + 20
+
+    router = RoutedBackend([full, benched])
+    assert 9 < router.wait_time() <= 10
+
+    benched.benched_until = now + 30
+    full.tpm, full.rpm = 100, None
+    full.window.extend([[now - 40, 60], [now - 5, 60]])
+    # 120 of 100 tokens: the slot at -50 (0 tokens) leaves first, then -40 frees room
+    assert 19 < router.wait_time() <= 20
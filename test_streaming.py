@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+from cleaning import clean_frame
+from streaming import clean_stream, iter_chunks, last_positions
+
+
+def write_workbook(path, frame):
+    frame.to_excel(path, index=False)
+    return path
+
+
+def export(ids):
+    return pd.DataFrame({
+        "Message Id": ids,
+        "Message": [f"message {i}" for i in range(len(ids))],
+        "Publish Date": "01/02/2026",
+        "Language": "en",
+        "Media Type": "Twitter",
+    })
+
+
+def test_last_positions_keeps_the_last_occurrence_on_disk(tmp_path):
+    first = write_workbook(str(tmp_path / "a.xlsx"), pd.DataFrame({"Message Id": [1, 2, None, 1]}))
+    second = write_workbook(str(tmp_path / "b.xlsx"), pd.DataFrame({"Message Id": [2.0, "1", None]}))
+
+    last = last_positions([first, second], chunk_size=2)
+    try:
+        # 2.0 is the same id as 2 for drop_duplicates; "1" is not 1
+        assert last.lookup(["int:1", "int:2", "str:1", "na:"]) == {"int:1": 3, "int:2": 4, "str:1": 5, "na:": 6}
+    finally:
+        last.close()
+    assert not os.path.exists(last.path)
+
+
+def test_stream_matches_clean_frame_on_the_concatenated_files(tmp_path):
+    files = [
+        write_workbook(str(tmp_path / "BEL(1).xlsx"), export([5, 6, 5, None, 7])),
+        write_workbook(str(tmp_path / "BEL(2).xlsx"), export([None, 6, 8])),
+    ]
+
+    streamed = pd.concat(clean_stream(files, "Belgium", chunk_size=2))
+    whole = clean_frame(pd.concat(iter_chunks(files)), "Belgium")
+
+    pd.testing.assert_frame_equal(streamed, whole)
@@ -0,0 +1,66 @@
+import time
+
+from work_queue import DONE, FAILED, QUEUED, WorkQueue
+
+
+def job(key, fields=("sentiment_label",)):
+    return ("Belgium.parquet", key, "Belgium", int(key[-1]), f"message {key}", {"message_id": key}, fields)
+
+
+def open_queue(tmp_path, **options):
+    return WorkQueue(str(tmp_path / "work_queue.sqlite"), **options)
+
+
+def test_expired_lease_is_requeued_and_the_late_result_dropped(tmp_path):
+    queue = open_queue(tmp_path, lease_seconds=0.05)
+    queue.enqueue([job("id:1")])
+
+    [first] = queue.lease("worker-a")
+    time.sleep(0.1)  # worker-a stalls past its lease
+    [again] = queue.lease("worker-b")
+    assert again["key"] == first["key"]
+
+    assert queue.complete("worker-b", "Belgium.parquet", "id:1", 1, {"sentiment": "positive"})
+    assert not queue.complete("worker-a", "Belgium.parquet", "id:1", 1, {"sentiment": "negative"})
+
+    assert queue.results("Belgium.parquet") == [("id:1", 1, {"sentiment": "positive"})]
+    assert queue.counts() == {DONE: 1, "results": 1}
+
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    queue = open_queue(tmp_path, lease_seconds=0.2)
+    queue.enqueue([job("id:1")])
+
+    queue.lease("worker-a")
+    time.sleep(0.15)
+    assert queue.heartbeat("worker-a") == 1
+    time.sleep(0.1)
+    assert queue.lease("worker-b") == []
+    assert queue.complete("worker-a", "Belgium.parquet", "id:1", 1, {})
+
+
+def test_each_job_is_leased_once_and_failures_stop_after_max_attempts(tmp_path):
+    queue = open_queue(tmp_path, max_attempts=2)
+    queue.enqueue([job(f"id:{i}") for i in range(4)])
+
+    a = queue.lease("worker-a", limit=3)
+    b = queue.lease("worker-b", limit=3)
+    assert len(a) == 3 and len(b) == 1
+    assert {j["key"] for j in a} | {j["key"] for j in b} == {f"id:{i}" for i in range(4)}
+
+    assert queue.fail("worker-b", "Belgium.parquet", b[0]["key"], "boom")
+    [retry] = queue.lease("worker-b")
+    assert queue.fail("worker-b", "Belgium.parquet", retry["key"], "boom")
+    assert queue.counts()[FAILED] == 1
+
+
+def test_enqueue_skips_live_jobs_and_requeues_done_ones_for_new_fields(tmp_path):
+    queue = open_queue(tmp_path)
+    assert queue.enqueue([job("id:1")]) == 1
+    assert queue.enqueue([job("id:1")]) == 0
+
+    queue.lease("worker-a")
+    queue.complete("worker-a", "Belgium.parquet", "id:1", 1, {})
+    assert queue.enqueue([job("id:1")]) == 0
+    assert queue.enqueue([job("id:1", fields=("churn_risk",))]) == 1
+    assert queue.counts()[QUEUED] == 1
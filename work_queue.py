@@ -0,0 +1,226 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+from checkpoint import json_default
+
+# =========================
+# 📬 LEASED WORK QUEUE
+# =========================
+# Per-message classification jobs in one SQLite file that any number of
+# worker processes share. A worker leases a few jobs for lease_seconds,
+# heartbeats while it works, and completes each job by inserting its result
+# row. A lease that runs out (worker killed, host lost) is handed to the
+# next worker that asks.
+#
+# Exactly once: results has one row per (source_file, job key), and a result
+# is only accepted from the worker that still holds the lease, in the same
+# transaction that marks the job done. A worker whose lease expired and was
+# re-leased gets False back and its late result is dropped.
+#
+# WAL needs shared memory, so workers on several hosts (one file on a shared
+# volume) open the queue with shared=True, which uses a rollback journal.
+
+QUEUE_NAME = "work_queue.sqlite"
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class WorkQueue:
+
+    def __init__(self, path, lease_seconds=120, max_attempts=3, shared=False):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        self.conn = sqlite3.connect(path, timeout=120, isolation_level=None)
+        self.conn.execute(f"PRAGMA journal_mode={'DELETE' if shared else 'WAL'}")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                   source_file TEXT NOT NULL,
+                   job_key TEXT NOT NULL,
+                   country TEXT NOT NULL,
+                   pos INTEGER NOT NULL,
+                   message TEXT NOT NULL,
+                   row TEXT NOT NULL,
+                   fields TEXT NOT NULL,
+                   status TEXT NOT NULL,
+                   lease_owner TEXT,
+                   lease_expires REAL,
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   error TEXT,
+                   enqueued_at REAL NOT NULL,
+                   PRIMARY KEY (source_file, job_key)
+               )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs(status, lease_expires)")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                   source_file TEXT NOT NULL,
+                   job_key TEXT NOT NULL,
+                   pos INTEGER NOT NULL,
+                   result TEXT NOT NULL,
+                   worker TEXT NOT NULL,
+                   finished_at REAL NOT NULL,
+                   collected INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (source_file, job_key)
+               ) WITHOUT ROWID"""
+        )
+
+    def _write(self, func):
+        """Run func inside one BEGIN IMMEDIATE transaction."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            out = func()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return out
+
+    # ---------- producer ----------
+
+    def enqueue(self, jobs):
+        """Add (source_file, key, country, pos, message, row, fields) jobs.
+
+        Jobs already queued or leased are left alone; failed ones, and done
+        ones asked for other fields, are queued again. Returns how many were
+        added.
+        """
+        now = time.time()
+        rows = [
+            (source_file, key, country, pos, message,
+             json.dumps(dict(row), default=json_default, ensure_ascii=False), json.dumps(list(fields)), now)
+            for source_file, key, country, pos, message, row, fields in jobs
+        ]
+
+        def add():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"""INSERT INTO jobs (source_file, job_key, country, pos, message, row, fields, status, enqueued_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, '{QUEUED}', ?)
+                    ON CONFLICT (source_file, job_key) DO UPDATE SET
+                        fields = excluded.fields, row = excluded.row, message = excluded.message,
+                        status = '{QUEUED}', attempts = 0, error = NULL, lease_owner = NULL
+                    WHERE jobs.status = '{FAILED}'
+                       OR (jobs.status = '{DONE}' AND jobs.fields != excluded.fields)""",
+                rows,
+            )
+            return self.conn.total_changes - before
+
+        return self._write(add)
+
+    # ---------- worker ----------
+
+    def _requeue_expired(self, now):
+        return self.conn.execute(
+            f"""UPDATE jobs SET status = '{QUEUED}', lease_owner = NULL
+                WHERE status = '{LEASED}' AND lease_expires < ?""",
+            (now,),
+        ).rowcount
+
+    def requeue_expired(self):
+        return self._write(lambda: self._requeue_expired(time.time()))
+
+    def lease(self, worker, limit=1):
+        """Lease up to limit queued jobs (expired leases first go back in the queue).
+
+        Returns dicts with source_file, key, country, pos, message, row, fields.
+        """
+        def take():
+            now = time.time()
+            self._requeue_expired(now)
+            found = self.conn.execute(
+                f"""SELECT source_file, job_key, country, pos, message, row, fields FROM jobs
+                    WHERE status = '{QUEUED}' ORDER BY rowid LIMIT ?""",
+                (limit,),
+            ).fetchall()
+            self.conn.executemany(
+                f"""UPDATE jobs SET status = '{LEASED}', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                    WHERE source_file = ? AND job_key = ?""",
+                [(worker, now + self.lease_seconds, f[0], f[1]) for f in found],
+            )
+            return found
+
+        return [
+            {
+                "source_file": source_file, "key": key, "country": country, "pos": pos,
+                "message": message, "row": json.loads(row), "fields": tuple(json.loads(fields)),
+            }
+            for source_file, key, country, pos, message, row, fields in self._write(take)
+        ]
+
+    def heartbeat(self, worker):
+        """Extend every lease worker still holds; returns how many."""
+        return self._write(lambda: self.conn.execute(
+            f"UPDATE jobs SET lease_expires = ? WHERE status = '{LEASED}' AND lease_owner = ?",
+            (time.time() + self.lease_seconds, worker),
+        ).rowcount)
+
+    def complete(self, worker, source_file, key, pos, result):
+        """Store the job's result if worker still holds its lease; returns whether it did."""
+        def finish():
+            owned = self.conn.execute(
+                f"""UPDATE jobs SET status = '{DONE}', lease_owner = NULL, error = NULL
+                    WHERE source_file = ? AND job_key = ? AND status = '{LEASED}' AND lease_owner = ?""",
+                (source_file, key, worker),
+            ).rowcount
+            if owned:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO results (source_file, job_key, pos, result, worker, finished_at, collected) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                    (source_file, key, pos, json.dumps(result, default=json_default, ensure_ascii=False),
+                     worker, time.time()),
+                )
+            return bool(owned)
+
+        return self._write(finish)
+
+    def fail(self, worker, source_file, key, error):
+        """Give a leased job back; after max_attempts leases it stays failed."""
+        return self._write(lambda: self.conn.execute(
+            f"""UPDATE jobs SET error = ?, lease_owner = NULL,
+                    status = CASE WHEN attempts >= ? THEN '{FAILED}' ELSE '{QUEUED}' END
+                WHERE source_file = ? AND job_key = ? AND status = '{LEASED}' AND lease_owner = ?""",
+            (str(error)[:500], self.max_attempts, source_file, key, worker),
+        ).rowcount > 0)
+
+    # ---------- collector ----------
+
+    def results(self, source_file):
+        """(key, pos, result) of source_file's finished jobs not collected yet."""
+        found = self.conn.execute(
+            "SELECT job_key, pos, result FROM results WHERE source_file = ? AND NOT collected ORDER BY pos",
+            (source_file,),
+        ).fetchall()
+        return [(key, pos, json.loads(result)) for key, pos, result in found]
+
+    def mark_collected(self, source_file, keys):
+        self._write(lambda: self.conn.executemany(
+            "UPDATE results SET collected = 1 WHERE source_file = ? AND job_key = ?",
+            [(source_file, key) for key in keys],
+        ))
+
+    def source_files(self):
+        """Files with results not collected yet."""
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT source_file FROM results WHERE NOT collected")]
+
+    def counts(self):
+        """{status: jobs} plus the number of stored results."""
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        counts["results"] = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return counts
+
+    def close(self):
+        self.conn.close()